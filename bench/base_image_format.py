@@ -0,0 +1,67 @@
+"""
+Benchmark the base-image storage formats.
+
+Usage: python bench/base_image_format.py [background.png sprite.png]
+
+Builds one base image the way pre-generation does (sprite over background,
+then the output and thumb levels), stores every level in each format of
+src.core.base_image_format, and reports write time, load time (to the RGBA
+image the renderer uses) and size on disk per level.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.config import CANVAS_SIZE, SPRITE_OFFSET
+from src.core import base_image_format
+from src.core.image_cache import LEVELS, THUMBNAIL_SIZE
+from src.core.image_processor import ImageProcessor
+from src.utils.resource_utils import get_resource_path
+
+ROUNDS = 10
+
+
+def timed(fn, rounds=ROUNDS):
+    fn()  # Warm the page cache and Pillow's plugins
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - t0) * 1000 / rounds
+
+
+def main():
+    if len(sys.argv) > 2:
+        bg_path, sprite_path = sys.argv[1:3]
+    else:
+        bg_path = get_resource_path(os.path.join("resources", "background", "c1.png"))
+        sprite_path = get_resource_path(os.path.join("resources", "char", "sherri", "sherri (1).png"))
+    base = Image.open(bg_path).convert("RGBA")
+    sprite = Image.open(sprite_path).convert("RGBA")
+    base.paste(sprite, SPRITE_OFFSET, sprite)
+
+    sizes = {"full": CANVAS_SIZE, "output": ImageProcessor.compressed_size(*CANVAS_SIZE), "thumb": THUMBNAIL_SIZE}
+    levels = {}
+    image = base.convert("RGB")
+    for level in LEVELS:
+        if image.size != sizes[level]:
+            image = image.resize(sizes[level], Image.Resampling.LANCZOS)
+        levels[level] = image
+
+    print(f"{'level':<8}{'format':<8}{'write':>10}{'load':>10}{'size':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for level, image in levels.items():
+            for fmt in base_image_format.FORMATS:
+                path = os.path.join(tmp, level + base_image_format.extension(fmt))
+                t_write = timed(lambda: base_image_format.save(image, path, fmt, level), rounds=3)
+                t_load = timed(lambda: base_image_format.load(path))
+                size = os.path.getsize(path) / 1024
+                print(f"{level:<8}{fmt:<8}{t_write:>7.1f} ms{t_load:>7.1f} ms{size:>8.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
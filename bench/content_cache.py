@@ -0,0 +1,64 @@
+"""
+Benchmark repeated image pastes with and without the content cache.
+
+Usage: python bench/content_cache.py
+
+Pastes a clipboard-style PNG (opened from its bytes, as the clipboard
+readers return it) onto an output-size base image, as a send does, with
+the balanced preset: once cold, then again from a fresh Image object.
+"""
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.config import CANVAS_SIZE
+from src.core.content_cache import content_cache
+from src.core.image_processor import ImageProcessor
+from src.core.layout import LayoutTemplate
+from src.core.quality import QualityPreset
+
+ROUNDS = 5
+
+
+def encoded(size, mode):
+    image = Image.radial_gradient("L").resize(size).convert(mode)
+    buf = io.BytesIO()
+    image.save(buf, "PNG")
+    return buf.getvalue()
+
+
+def main():
+    base = Image.new("RGBA", ImageProcessor.compressed_size(*CANVAS_SIZE), (40, 40, 60, 255))
+    layout = LayoutTemplate.compile("sherri", "c1").scaled(base.width / CANVAS_SIZE[0])
+    options = {k: v for k, v in layout.image_options().items() if k != "color"}
+    options.update(compress=False, allow_upscale=True, quality=QualityPreset.get("balanced"))
+
+    print(f"{'content':<22}{'cold':>10}{'cached':>10}")
+    for name, size, mode in (("sticker 512x512", (512, 512), "RGBA"), ("screenshot 1920x1080", (1920, 1080), "RGB"),
+                             ("photo 4000x3000", (4000, 3000), "RGB")):
+        data = encoded(size, mode)
+
+        def paste():
+            return ImageProcessor.paste_image(base, content_image=Image.open(io.BytesIO(data)), **options)
+
+        times = {}
+        for cached in (False, True):
+            content_cache.enabled = cached
+            content_cache.clear()
+            paste()
+            t0 = time.perf_counter()
+            for _ in range(ROUNDS):
+                if not cached:
+                    content_cache.clear()
+                paste()
+            times[cached] = (time.perf_counter() - t0) * 1000 / ROUNDS
+        print(f"{name:<22}{times[False]:>7.0f} ms{times[True]:>7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
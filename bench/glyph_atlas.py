@@ -0,0 +1,70 @@
+"""
+Benchmark the glyph atlas against plain ImageDraw.text.
+
+Usage: python bench/glyph_atlas.py [font.ttf]
+
+Draws typical chat lines at the output-size font sizes onto a transparent
+layer, the way ImageProcessor.draw_text does, and reports the time per line.
+The atlas only caches fonts loaded from a file, so when font.ttf (or the
+bundled font) does not exist, Pillow's default font is saved to a temporary
+file and loaded from there.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFont
+
+from src.core.glyph_atlas import GlyphAtlas
+from src.utils.resource_utils import get_resource_path
+
+LINES = [
+    "你说得对，但是这件事情我们明天再讨论吧",
+    "【证言】那天晚上我一直待在自己的房间里",
+    "That is not what I said at all, you know.",
+    "哈哈哈哈哈哈哈哈哈哈",
+]
+SIZES = (32, 48, 68)
+ROUNDS = 20
+
+
+def bench(draw_line, font):
+    layer = Image.new("RGBA", (1200, 100), (0, 0, 0, 0))
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        for line in LINES:
+            draw_line(layer, line, font)
+    return (time.perf_counter() - t0) * 1000 / (ROUNDS * len(LINES))
+
+
+def main():
+    font_path = sys.argv[1] if len(sys.argv) > 1 else get_resource_path(os.path.join("resources", "fonts", "font3.ttf"))
+    if not os.path.exists(font_path):
+        font_path = os.path.join(tempfile.mkdtemp(), "default.ttf")
+        with open(font_path, "wb") as f:
+            f.write(ImageFont.load_default(12).path.getvalue())
+    atlas = GlyphAtlas()
+
+    def plain(layer, line, font):
+        ImageDraw.Draw(layer).text((10, 10), line, font=font, fill=(255, 255, 255))
+
+    def cached(layer, line, font):
+        if not atlas.draw(layer, (10, 10), line, font, (255, 255, 255)):
+            plain(layer, line, font)
+
+    print(f"font: {font_path}")
+    print(f"{'size':>6}{'ImageDraw.text':>18}{'atlas (warm)':>16}{'speedup':>10}")
+    for size in SIZES:
+        font = ImageFont.truetype(font_path, size)
+        cached(Image.new("RGBA", (1200, 100)), "".join(LINES), font)  # warm the atlas
+        t_plain = bench(plain, font)
+        t_atlas = bench(cached, font)
+        print(f"{size:>6}{t_plain:>15.3f} ms{t_atlas:>13.3f} ms{t_plain / t_atlas:>9.1f}x")
+    print(f"glyphs cached: {len(atlas._glyphs)}, hits: {atlas.hits}, misses: {atlas.misses}")
+
+
+if __name__ == "__main__":
+    main()
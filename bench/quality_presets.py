@@ -0,0 +1,80 @@
+"""
+Benchmark the render quality presets.
+
+Usage: python bench/quality_presets.py [font.ttf]
+
+Renders the jobs a send produces (a long message, and a large clipboard
+image) onto an output-size base image with every preset in
+config.QUALITY_PRESETS, plus a full-size text render downscaled by
+compress_image. Reports the time per render, the PNG size and the PSNR
+against the best preset (inf = identical pixels).
+"""
+import io
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops
+
+from src.config import CANVAS_SIZE, QUALITY_PRESETS, SPRITE_OFFSET
+from src.core.image_processor import ImageProcessor
+from src.core.layout import LayoutTemplate
+from src.core.quality import QualityPreset
+from src.utils.resource_utils import get_resource_path
+
+TEXT = "【证言】那天晚上我一直待在自己的房间里，哪里都没有去。你说得对，但是这件事情我们明天再讨论吧。" * 2
+ROUNDS = 5
+
+
+def psnr(a: Image.Image, b: Image.Image) -> float:
+    hist = ImageChops.difference(a.convert("RGB"), b.convert("RGB")).histogram()
+    squared = sum(count * (i % 256) ** 2 for i, count in enumerate(hist))
+    mse = squared / (a.width * a.height * 3)
+    return float("inf") if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def timed(render):
+    render()  # Warm fonts, layouts and name plates
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        data = render()
+    return (time.perf_counter() - t0) * 1000 / ROUNDS, data
+
+
+def main():
+    character = "sherri"
+    font = sys.argv[1] if len(sys.argv) > 1 else None
+    full = Image.open(get_resource_path(os.path.join("resources", "background", "c1.png"))).convert("RGBA")
+    sprite = Image.open(get_resource_path(os.path.join("resources", "char", character, f"{character} (1).png"))).convert("RGBA")
+    full.paste(sprite, SPRITE_OFFSET, sprite)
+    output = full.resize(ImageProcessor.compressed_size(*CANVAS_SIZE), Image.Resampling.LANCZOS)
+    photo = full.convert("RGB").resize((4000, 1303), Image.Resampling.BICUBIC)
+
+    def jobs(preset):
+        layout = LayoutTemplate.compile(character, "c1")
+        small = layout.scaled(output.width / CANVAS_SIZE[0])
+        text_options = dict(small.text_options(), compress=False, quality=preset)
+        image_options = {k: v for k, v in small.image_options().items() if k != "color"}
+        image_options.update(compress=False, quality=preset)
+        if font:
+            text_options["font_path"] = image_options["font_path"] = font
+        return {
+            "text": lambda: ImageProcessor.draw_text(output, text=TEXT, **text_options),
+            "image": lambda: ImageProcessor.paste_image(output, content_image=photo, **image_options),
+            "text (full size)": lambda: ImageProcessor.draw_text(full, text=TEXT, **dict(layout.text_options(), quality=preset)),
+        }
+
+    reference = {name: Image.open(io.BytesIO(render())) for name, render in jobs(QualityPreset.get("best")).items()}
+    print(f"{'job':<18}{'preset':<10}{'time':>10}{'png':>10}{'psnr':>9}")
+    for name in reference:
+        for preset_name in QUALITY_PRESETS:
+            ms, data = timed(jobs(QualityPreset.get(preset_name))[name])
+            quality = psnr(Image.open(io.BytesIO(data)), reference[name])
+            print(f"{name:<18}{preset_name:<10}{ms:>7.0f} ms{len(data) / 1024:>7.0f} KB{quality:>7.1f} dB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Measure memory churn of renders.
+
+Usage: python bench/render_allocations.py [rounds] [blocks]
+
+Renders what a send produces (a message and a clipboard image on an
+output-size base image, and a message on a full-size one that is then
+compressed) repeatedly, and reports per render: time, the peak RSS above
+the steady state (Linux; reset through /proc/self/clear_refs), image
+buffers freshly allocated by Pillow, and garbage collections. The stage
+breakdown of one render of each kind is printed from the render profiler
+(--profile-render in the app). blocks is the number of freed image buffers
+Pillow keeps for reuse, IMAGE_BLOCKS_MAX by default as in the app (0 to
+compare against Pillow's default of freeing them).
+"""
+import gc
+import io
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.config import CANVAS_SIZE, IMAGE_BLOCKS_MAX
+from src.core.content_cache import content_cache
+from src.core.image_processor import ImageProcessor
+from src.core.layout import LayoutTemplate
+from src.core.quality import QualityPreset
+from src.utils.render_profile import render_profiler
+
+TEXT = "【证言】那天晚上我一直待在自己的房间里，哪里都没有去。"
+
+
+def rss_kb(field: str):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    Image.core.set_blocks_max(int(sys.argv[2]) if len(sys.argv) > 2 else IMAGE_BLOCKS_MAX)
+    full = Image.new("RGBA", CANVAS_SIZE, (40, 40, 60, 255))
+    output = full.resize(ImageProcessor.compressed_size(*CANVAS_SIZE))
+    layout = LayoutTemplate.compile("sherri", "c1")
+    small = layout.scaled(output.width / CANVAS_SIZE[0])
+    quality = QualityPreset.get("balanced")
+    photo = io.BytesIO()
+    Image.radial_gradient("L").resize((1920, 1080)).convert("RGB").save(photo, "PNG")
+    content_cache.enabled = False  # Measure the resize of every paste
+
+    image_options = {k: v for k, v in small.image_options().items() if k != "color"}
+    jobs = {
+        "text (output)": lambda: ImageProcessor.draw_text(output, text=TEXT, **dict(small.text_options(), compress=False, quality=quality)),
+        "image (output)": lambda: ImageProcessor.paste_image(output, content_image=Image.open(io.BytesIO(photo.getvalue())),
+                                                             **dict(image_options, compress=False, quality=quality)),
+        "text (full)": lambda: ImageProcessor.draw_text(full, text=TEXT, **dict(layout.text_options(), quality=quality)),
+    }
+
+    print(f"{'render':<16}{'time':>10}{'peak RSS':>11}{'new bufs':>10}{'GC/100':>8}")
+    for name, render in jobs.items():
+        render()  # Warm fonts, layouts and name plates
+        gc.collect()
+        stats = Image.core.get_stats()
+        collections = sum(g["collections"] for g in gc.get_stats())
+        peaks, t = [], 0.0
+        for _ in range(rounds):
+            steady = rss_kb("VmRSS")
+            has_peak = reset_peak_rss()
+            t0 = time.perf_counter()
+            render()
+            t += time.perf_counter() - t0
+            if has_peak and steady is not None:
+                peaks.append(rss_kb("VmHWM") - steady)
+        new = (Image.core.get_stats()["allocated_blocks"] - stats["allocated_blocks"]) / rounds
+        runs = (sum(g["collections"] for g in gc.get_stats()) - collections) * 100 / rounds
+        peak = f"{sorted(peaks)[len(peaks) // 2] / 1024:>8.1f} MB" if peaks else f"{'n/a':>11}"
+        print(f"{name:<16}{t * 1000 / rounds:>7.1f} ms{peak}{new:>10.1f}{runs:>8.1f}")
+
+    render_profiler.enable()
+    for render in jobs.values():
+        render()
+        print(render_profiler.report())
+    render_profiler.disable()
+
+
+if __name__ == "__main__":
+    main()
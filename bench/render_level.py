@@ -0,0 +1,97 @@
+"""
+Compare sends rendered from the output level with the full-resolution path.
+
+Usage: python bench/render_level.py [font.ttf]
+
+Builds the full and output levels of one base image the way pre-generation
+stores them (JPEG), then renders a message and a clipboard image both ways:
+at output size from the output level (the default), and at full resolution
+from the full level, downscaled by compress_image afterwards (what sends did
+before the pyramid, SEND_RENDER_LEVEL = "full"). Reports the time per render
+of each path and the PSNR of the output-level image against the full path.
+"""
+import io
+import math
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops
+
+from src.config import CANVAS_SIZE, QUALITY_PRESET, SPRITE_OFFSET
+from src.core import base_image_format
+from src.core.image_processor import ImageProcessor
+from src.core.layout import LayoutTemplate
+from src.core.quality import QualityPreset
+from src.utils.resource_utils import get_resource_path
+
+TEXTS = {
+    "short text": "【证言】那天晚上我一直待在自己的房间里。",
+    "long text": "【证言】那天晚上我一直待在自己的房间里，哪里都没有去。你说得对，但是这件事情我们明天再讨论吧。" * 2,
+}
+ROUNDS = 5
+
+
+def psnr(a: Image.Image, b: Image.Image) -> float:
+    hist = ImageChops.difference(a.convert("RGB"), b.convert("RGB")).histogram()
+    squared = sum(count * (i % 256) ** 2 for i, count in enumerate(hist))
+    mse = squared / (a.width * a.height * 3)
+    return float("inf") if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def stored(image: Image.Image, level: str) -> Image.Image:
+    """image after a round trip through its level's storage format."""
+    buf = io.BytesIO()
+    image.convert("RGB").save(buf, "JPEG", quality=base_image_format.JPEG_QUALITY.get(level, base_image_format.JPEG_DEFAULT_QUALITY))
+    return Image.open(buf).convert("RGBA")
+
+
+def timed(render):
+    render()  # Warm fonts, layouts and name plates
+    t0 = time.perf_counter()
+    for _ in range(ROUNDS):
+        data = render()
+    return (time.perf_counter() - t0) * 1000 / ROUNDS, data
+
+
+def main():
+    character = "sherri"
+    font = sys.argv[1] if len(sys.argv) > 1 else None
+    composed = Image.open(get_resource_path(os.path.join("resources", "background", "c1.png"))).convert("RGBA")
+    sprite = Image.open(get_resource_path(os.path.join("resources", "char", character, f"{character} (1).png"))).convert("RGBA")
+    composed.paste(sprite, SPRITE_OFFSET, sprite)
+    full = stored(composed, "full")
+    output = stored(composed.resize(ImageProcessor.compressed_size(*CANVAS_SIZE), Image.Resampling.LANCZOS), "output")
+    photo = composed.convert("RGB").resize((1920, 1080), Image.Resampling.BICUBIC)
+    quality = QualityPreset.get(QUALITY_PRESET)
+
+    layout = LayoutTemplate.compile(character, "c1")
+    small = layout.scaled(output.width / CANVAS_SIZE[0])
+    text_options = {"full": dict(layout.text_options(), compress=True), "output": dict(small.text_options(), compress=False)}
+    image_options = {
+        "full": dict(layout.image_options(), compress=True, allow_upscale=True),
+        "output": dict(small.image_options(), compress=False, allow_upscale=True),
+    }
+    for options in (*text_options.values(), *image_options.values()):
+        options["quality"] = quality
+        if font:
+            options["font_path"] = font
+    bases = {"full": full, "output": output}
+
+    jobs = {name: {level: (lambda level=level, text=text: ImageProcessor.draw_text(bases[level], text=text, **text_options[level]))
+                   for level in bases} for name, text in TEXTS.items()}
+    jobs["image"] = {level: (lambda level=level: ImageProcessor.paste_image(bases[level], content_image=photo, **image_options[level]))
+                     for level in bases}
+
+    print(f"{'job':<12}{'full + compress':>17}{'output level':>15}{'psnr':>10}")
+    for name, renders in jobs.items():
+        full_ms, full_png = timed(renders["full"])
+        output_ms, output_png = timed(renders["output"])
+        quality_db = psnr(Image.open(io.BytesIO(output_png)), Image.open(io.BytesIO(full_png)))
+        print(f"{name:<12}{full_ms:>14.0f} ms{output_ms:>12.0f} ms{quality_db:>7.1f} dB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Replay a recorded session headless and report per-send latency.
+
+Usage: python bench/replay_session.py [session.jsonl] [--data-dir DIR] [--operation-timeout S] [--realtime]
+
+Record a session with `python src/main.py --record session.jsonl`. Without
+one, a built-in session is replayed: short and long messages (the long one
+is paginated), a clipboard image and a character switch. Base images are
+pre-generated into --data-dir first (a temporary folder by default, so
+they are built again on every run). clear commands are not replayed.
+"""
+import argparse
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import IMAGE_BLOCKS_MAX
+from src.utils.session import SessionReplayer, load_session
+
+MESSAGES = [
+    "早上好！",
+    "【证言】那天晚上我一直待在自己的房间里，哪里都没有去。",
+    "你说得对，但是这件事情我们明天再讨论吧。" * 3,
+    "这句话很长，需要分成好几张图片才能看清楚。" * 150,
+]
+
+
+def sample_session():
+    from PIL import Image
+    import base64
+    import io
+
+    photo = io.BytesIO()
+    Image.radial_gradient("L").resize((1600, 900)).convert("RGB").save(photo, "PNG")
+    photo = base64.b64encode(photo.getvalue()).decode("ascii")
+
+    events = [{"t": 0.0, "event": "start", "seed": 1}]
+    for i in range(3):
+        for text in MESSAGES:
+            events.append({"t": 0.0, "event": "clipboard", "text": text, "image": None})
+        events.append({"t": 0.0, "event": "clipboard", "text": "", "image": photo})
+    events.append({"t": 0.0, "event": "hotkey", "action": "switch_expression", "args": [1]})
+    events += [{"t": 0.0, "event": "clipboard", "text": text, "image": None} for text in MESSAGES]
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("session", nargs="?", default=None)
+    parser.add_argument("--data-dir", default=None)
+    parser.add_argument("--operation-timeout", type=float, default=0.0)
+    parser.add_argument("--realtime", action="store_true")
+    args = parser.parse_args()
+    # As main does at startup
+    os.environ.setdefault("PILLOW_BLOCKS_MAX", str(IMAGE_BLOCKS_MAX))
+
+    events = load_session(args.session) if args.session else sample_session()
+    replayer = SessionReplayer(events, data_dir=args.data_dir, operation_timeout=args.operation_timeout, realtime=args.realtime)
+    print(replayer.replay().summary())
+
+
+if __name__ == "__main__":
+    main()
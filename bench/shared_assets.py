@@ -0,0 +1,86 @@
+"""
+Measure worker memory with and without the shared asset store.
+
+Usage: python bench/shared_assets.py [character] [max workers]
+
+Starts 1, 2, 4 ... spawn worker processes that each composite the
+character's full grid (every background with every sprite) through a
+SpriteCompositor holding all sources, the way a multi-process pre-generation
+would. Workers either decode their own copies, or attach to sources the main
+process published to a SharedAssetStore. Once every worker has composited
+its grid, each reports its PSS (proportional set size, so pages shared by
+several processes are split between them); the table shows the total over
+the workers and the main process. Linux only (reads /proc/self/smaps_rollup).
+"""
+import glob
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import SPRITE_OFFSET
+from src.core.compositor import SpriteCompositor
+from src.core.shared_assets import SharedAssetStore
+from src.utils.resource_utils import get_resource_path
+
+
+def pss_mb() -> float:
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def worker(backgrounds, sprites, shared, barrier, results):
+    compositor = SpriteCompositor(max_backgrounds=len(backgrounds), max_sprites=len(sprites), shared=shared)
+    for background in backgrounds:
+        for sprite in sprites:
+            compositor.compose(background, sprite, SPRITE_OFFSET)
+    barrier.wait()  # Every worker holds its sources now
+    results.put(pss_mb())
+    barrier.wait()  # Stay alive until all have measured
+    compositor.close()
+
+
+def run(ctx, workers, backgrounds, sprites, shared):
+    barrier = ctx.Barrier(workers + 1)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(backgrounds, sprites, shared, barrier, results)) for _ in range(workers)]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    barrier.wait()
+    elapsed = time.perf_counter() - t0
+    total = sum(results.get() for _ in procs) + pss_mb()
+    barrier.wait()
+    for p in procs:
+        p.join()
+    return total, elapsed
+
+
+def main():
+    character = sys.argv[1] if len(sys.argv) > 1 else "sherri"
+    max_workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    backgrounds = sorted(glob.glob(get_resource_path(os.path.join("resources", "background", "*.png"))))
+    sprites = sorted(glob.glob(get_resource_path(os.path.join("resources", "char", character, "*.png"))))
+    ctx = multiprocessing.get_context("spawn")
+    counts = [2 ** i for i in range(max_workers.bit_length()) if 2 ** i <= max_workers]
+
+    # Private runs first, so the main process has not decoded anything yet
+    private = {n: run(ctx, n, backgrounds, sprites, None) for n in counts}
+    with SharedAssetStore() as store:
+        SpriteCompositor(max_backgrounds=len(backgrounds), max_sprites=len(sprites)).publish(
+            store, [(path, "") for path in backgrounds], [(path, "") for path in sprites])
+        shared = {n: run(ctx, n, backgrounds, sprites, store.index) for n in counts}
+        print(f"{len(sprites)} sprites x {len(backgrounds)} backgrounds; shared blocks: {store.nbytes / 2 ** 20:.0f} MB")
+
+    print(f"{'workers':>8}{'private decode':>18}{'shared store':>16}")
+    for n in counts:
+        print(f"{n:>8}{private[n][0]:>12.0f} MB {private[n][1]:>3.0f}s{shared[n][0]:>10.0f} MB {shared[n][1]:>3.0f}s")
+
+
+if __name__ == "__main__":
+    main()
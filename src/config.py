@@ -1,19 +1,19 @@
 # Character Configuration Dictionary
 CHARACTERS = {
-    "ema": {"emotion_count": 8, "font": "font3.ttf"},     # 樱羽艾玛
-    "hiro": {"emotion_count": 6, "font": "font3.ttf"},    # 二阶堂希罗
-    "sherri": {"emotion_count": 7, "font": "font3.ttf"},  # 橘雪莉
-    "hanna": {"emotion_count": 5, "font": "font3.ttf"},   # 远野汉娜
-    "anan": {"emotion_count": 9, "font": "font3.ttf"},    # 夏目安安
-    "yuki" : {"emotion_count": 18, "font": "font3.ttf"},
-    "meruru": {"emotion_count": 6, "font": "font3.ttf"},   # 冰上梅露露
-    "noa": {"emotion_count": 6, "font": "font3.ttf"},     # 城崎诺亚
-    "reia": {"emotion_count": 7, "font": "font3.ttf"},    # 莲见蕾雅
-    "miria": {"emotion_count": 4, "font": "font3.ttf"},   # 佐伯米莉亚
-    "nanoka": {"emotion_count": 5, "font": "font3.ttf"},  # 黑部奈叶香
-    "mago": {"emotion_count": 5, "font": "font3.ttf"},   # 宝生玛格
-    "alisa": {"emotion_count": 6, "font": "font3.ttf"},   # 紫藤亚里沙
-    "coco": {"emotion_count": 5, "font": "font3.ttf"}
+    "ema": {"font": "font3.ttf"},     # 樱羽艾玛
+    "hiro": {"font": "font3.ttf"},    # 二阶堂希罗
+    "sherri": {"font": "font3.ttf"},  # 橘雪莉
+    "hanna": {"font": "font3.ttf"},   # 远野汉娜
+    "anan": {"font": "font3.ttf", "bracket_color": (159, 145, 251)},    # 夏目安安
+    "yuki" : {"font": "font3.ttf"},
+    "meruru": {"font": "font3.ttf"},   # 冰上梅露露
+    "noa": {"font": "font3.ttf"},     # 城崎诺亚
+    "reia": {"font": "font3.ttf"},    # 莲见蕾雅
+    "miria": {"font": "font3.ttf"},   # 佐伯米莉亚
+    "nanoka": {"font": "font3.ttf"},  # 黑部奈叶香
+    "mago": {"font": "font3.ttf"},   # 宝生玛格
+    "alisa": {"font": "font3.ttf"},   # 紫藤亚里沙
+    "coco": {"font": "font3.ttf"}
 }
 
 # Text Configuration Dictionary
@@ -109,3 +109,50 @@ MAHOSHOJO_POSITION = [728, 355]
 MAHOSHOJO_OVER = [2339, 800]
 
 OPERATION_TIMEOUT = 0.08 # Seconds
+
+TOOL_VERSION = "0.2.0"
+SPRITE_OFFSET = (0, 134)
+CANVAS_SIZE = (2560, 834) # Size of the backgrounds, i.e. the full-resolution level
+CACHE_BUDGET_MB = 256 # Disk budget for pre-generated images, 0 = unlimited
+BASE_IMAGE_FORMAT = "jpg" # Storage of pre-generated images: jpg / png / raw (see src/core/base_image_format.py)
+# Base-image level sends are drawn on. "output" draws at the final size, about
+# 1.8x faster; "full" draws at full resolution and downscales the result, which
+# is how sends looked before the pyramid (text can wrap and size differently;
+# see bench/README.md). --render-level overrides it.
+SEND_RENDER_LEVEL = "output"
+
+# Default layout, in full-resolution (CANVAS_SIZE) coordinates. Any key can be
+# overridden per character in CHARACTERS, or per background in BACKGROUND_LAYOUTS.
+LAYOUT_DEFAULTS = {
+    "text_box": (tuple(MAHOSHOJO_POSITION), tuple(MAHOSHOJO_OVER)),
+    "sprite_offset": SPRITE_OFFSET,
+    "text_color": (255, 255, 255),
+    "bracket_color": (137, 177, 251),
+    "max_font_height": 145,
+    "text_shadow": 4, # Drop shadow offset of the dialogue text
+    "name_shadow": 2, # Drop shadow offset of the name plate
+    "image_padding": 12,
+}
+# Per-background overrides, keyed by background name, e.g. {"c3": {"sprite_offset": (0, 120)}}
+BACKGROUND_LAYOUTS = {}
+
+# Render quality presets (see bench/README.md for timings). resample is a
+# Pillow filter name; reducing_gap enables reduce() before resampling for
+# large downscales (None = single pass); png_compress_level is the zlib
+# effort of the sent PNG (0-9).
+QUALITY_PRESETS = {
+    "fast": {"resample": "bilinear", "reducing_gap": 2.0, "png_compress_level": 1, "shadows": False, "emoji": False},
+    "balanced": {"resample": "lanczos", "reducing_gap": 3.0, "png_compress_level": 3, "shadows": True, "emoji": True},
+    "best": {"resample": "lanczos", "reducing_gap": None, "png_compress_level": 6, "shadows": True, "emoji": True},
+}
+QUALITY_PRESET = "balanced" # Default preset of a session
+
+# Text that would need a smaller font than this (layout units, like
+# max_font_height) is split into several images instead, up to MAX_TEXT_PAGES
+MIN_FONT_HEIGHT = 64
+MAX_TEXT_PAGES = 6
+
+# Freed image buffers Pillow keeps for the next render to reuse instead of
+# allocating new ones (0 frees them at once). Set at startup by main
+# (--image-blocks); PILLOW_BLOCKS_MAX overrides
+IMAGE_BLOCKS_MAX = 1
@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict, List, Optional
+
+from src.utils.platform_utils import PlatformUtils
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "assets.json"
+INDEX_SCHEMA = 1
+# Seconds between polls of the resource folders while watching
+POLL_INTERVAL = 2.0
+# Nice increment of the watcher thread, like the generation worker's
+WATCH_NICE = 10
+
+CHAR_DIR = "char"
+BACKGROUND_DIR = "background"
+
+
+class AssetRegistry:
+    """
+    Index of the character sprites and backgrounds under the resources folder.
+
+    Keys are paths relative to the resources folder's parent, with forward
+    slashes (``resources/char/anan/anan (1).png``). Every entry stores the
+    file's mtime and byte size; its pixel size, alpha bounding box and content
+    hash are filled in on demand (or by a detailed refresh) and kept until the
+    file changes. The index is persisted, so a restart only re-stats files.
+
+    refresh() rescans the folders and tells subscribers which keys were added,
+    changed or removed; watch() polls for changes in the background. Polls
+    only stat files: a changed file is read again when its details are next
+    asked for, which for base images is while planning on the (low-priority,
+    paused during sends) generation worker.
+    """
+
+    def __init__(self, resources_root: str, index_path: Optional[str] = None):
+        self.root = os.path.normpath(resources_root)
+        self.index_path = index_path
+        self._prefix = os.path.basename(self.root)
+        self._lock = threading.RLock()
+        self._index: Dict[str, Dict] = {}
+        self._dirty = False
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self._load()
+        self.refresh(details=False)
+
+    def _load(self):
+        if not self.index_path or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Asset index unreadable, rescanning: {e}")
+            return
+        if data.get("schema") == INDEX_SCHEMA:
+            self._index = data.get("assets", {})
+
+    def save(self):
+        """Write the index atomically if it changed."""
+        with self._lock:
+            if not self.index_path or not self._dirty:
+                return
+            tmp_path = self.index_path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"schema": INDEX_SCHEMA, "assets": self._index}, f, ensure_ascii=False)
+                os.replace(tmp_path, self.index_path)
+                self._dirty = False
+            except OSError as e:
+                logger.error(f"Failed to write asset index: {e}")
+
+    def key(self, *parts: str) -> str:
+        return "/".join((self._prefix,) + parts)
+
+    def path(self, key: str) -> str:
+        return os.path.join(os.path.dirname(self.root), *key.split("/"))
+
+    def _list(self) -> Dict[str, tuple]:
+        """(mtime, bytes) of every sprite and background on disk."""
+        found = {}
+        folders = [(BACKGROUND_DIR,)]
+        char_root = os.path.join(self.root, CHAR_DIR)
+        if os.path.isdir(char_root):
+            folders += [(CHAR_DIR, e.name) for e in os.scandir(char_root) if e.is_dir()]
+        for parts in folders:
+            folder = os.path.join(self.root, *parts)
+            if not os.path.isdir(folder):
+                continue
+            for entry in os.scandir(folder):
+                if entry.is_file() and entry.name.lower().endswith(".png"):
+                    st = entry.stat()
+                    found[self.key(*parts, entry.name)] = (st.st_mtime, st.st_size)
+        return found
+
+    def refresh(self, details: bool = True) -> List[str]:
+        """
+        Rescan the resource folders. Returns the keys that were added, changed
+        or removed, after notifying subscribers of them. With details, sizes,
+        alpha boxes and hashes of the new or changed files are computed now;
+        otherwise on first use (info()).
+        """
+        found = self._list()
+        changed = []
+        with self._lock:
+            for key in list(self._index):
+                if key not in found:
+                    del self._index[key]
+                    changed.append(key)
+            for key, (mtime, nbytes) in found.items():
+                entry = self._index.get(key)
+                if entry and entry["mtime"] == mtime and entry["bytes"] == nbytes:
+                    continue
+                self._index[key] = {"mtime": mtime, "bytes": nbytes}
+                changed.append(key)
+            if changed:
+                self._dirty = True
+
+        if details:
+            for key in changed:
+                if key in found:
+                    self.info(key)
+        self.save()
+
+        if changed:
+            for callback in list(self._listeners):
+                try:
+                    callback(sorted(changed))
+                except Exception as e:
+                    logger.error(f"Asset change handler failed: {e}", exc_info=True)
+        return sorted(changed)
+
+    def info(self, key: str) -> Optional[Dict]:
+        """Index entry of key, with size, bbox and hash; None if missing."""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+            if "hash" in entry:
+                return entry
+            mtime = entry["mtime"]
+
+        described = self._describe(self.path(key))
+        if described is None:
+            return None
+        with self._lock:
+            entry = self._index.get(key)
+            # Only keep the details if the file did not change meanwhile
+            if entry is not None and entry["mtime"] == mtime:
+                entry.update(described)
+                self._dirty = True
+            return entry
+
+    @staticmethod
+    def _describe(path: str) -> Optional[Dict]:
+        from PIL import Image
+
+        h = hashlib.sha1()
+        try:
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+            with Image.open(path) as im:
+                size = list(im.size)
+                bbox = None
+                if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+                    bbox = im.convert("RGBA").getchannel("A").getbbox()
+        except OSError as e:
+            logger.warning(f"Cannot read asset {path}: {e}")
+            return None
+        return {"size": size, "bbox": list(bbox) if bbox else None, "hash": h.hexdigest()}
+
+    def asset_hash(self, key: str) -> Optional[str]:
+        entry = self.info(key)
+        return entry["hash"] if entry else None
+
+    def characters(self) -> List[str]:
+        prefix = self.key(CHAR_DIR) + "/"
+        with self._lock:
+            return sorted({k[len(prefix):].split("/", 1)[0] for k in self._index if k.startswith(prefix)})
+
+    def sprite_key(self, character: str, emotion: int) -> str:
+        return self.key(CHAR_DIR, character, f"{character} ({emotion}).png")
+
+    def background_key(self, name: str) -> str:
+        return self.key(BACKGROUND_DIR, f"{name}.png")
+
+    def emotion_count(self, character: str) -> int:
+        """Number of sprites character (1).png, character (2).png, ... with no gaps."""
+        count = 0
+        with self._lock:
+            while self.sprite_key(character, count + 1) in self._index:
+                count += 1
+        return count
+
+    def backgrounds(self) -> List[str]:
+        prefix = self.key(BACKGROUND_DIR) + "/"
+        with self._lock:
+            names = [k[len(prefix):-len(".png")] for k in self._index if k.startswith(prefix)]
+
+        def order(name):
+            digits = re.sub(r"\D", "", name)
+            return (int(digits) if digits else 0, name)
+        return sorted(names, key=order)
+
+    @staticmethod
+    def character_of(key: str) -> Optional[str]:
+        """Character a sprite key belongs to; None for backgrounds."""
+        parts = key.split("/")
+        if len(parts) == 4 and parts[1] == CHAR_DIR:
+            return parts[2]
+        return None
+
+    def subscribe(self, callback: Callable[[List[str]], None]):
+        """callback(keys) is called with the keys changed by every refresh."""
+        self._listeners.append(callback)
+
+    def watch(self, interval: float = POLL_INTERVAL):
+        """Poll the resource folders for changes (mtime and size) on a low-priority daemon thread."""
+        if self._watcher is not None:
+            return
+        self._stop.clear()
+
+        def run():
+            PlatformUtils.lower_thread_priority(WATCH_NICE)
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh(details=False)
+                except Exception as e:
+                    logger.error(f"Asset scan failed: {e}", exc_info=True)
+
+        self._watcher = threading.Thread(target=run, name="asset-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        self._stop.set()
+        self._watcher = None
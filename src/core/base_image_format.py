@@ -0,0 +1,98 @@
+import os
+import struct
+from typing import Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+# Storage formats for pre-generated base images. Measured with
+# bench/base_image_format.py on a 1200x390 output-level image:
+#   jpg  110 KB,  4.7 ms to load (decode + RGBA convert), lossy
+#   png  855 KB, 30 ms, lossless
+#   raw  1.8 MB, 0.2 ms, lossless
+# JPEG stays the default: loads are cached by the render engine, so a few ms
+# per first use matter less than fitting 8-16x more images in the budget.
+FORMATS: Dict[str, Dict] = {
+    "jpg": {"ext": ".jpg", "lossless": False},
+    "png": {"ext": ".png", "lossless": True},    # RGBA, fast zlib level
+    "raw": {"ext": ".rgba", "lossless": True},   # Header + RGBA pixels, nothing to decode
+}
+
+PNG_COMPRESS_LEVEL = 1
+JPEG_QUALITY = {"full": 75}  # Per level; others use JPEG_DEFAULT_QUALITY
+JPEG_DEFAULT_QUALITY = 90
+
+# Raw files: magic, header version, width, height; then width*height*4 RGBA bytes
+RAW_MAGIC = b"MBIR"
+RAW_VERSION = 1
+_RAW_HEADER = struct.Struct("<4sHII")
+
+
+def extension(fmt: str) -> str:
+    return FORMATS[fmt]["ext"]
+
+
+def format_of(path: str) -> str:
+    """Storage format of a base image file, from its extension."""
+    ext = os.path.splitext(path)[1].lower()
+    for name, spec in FORMATS.items():
+        if spec["ext"] == ext:
+            return name
+    raise ValueError(f"Unknown base image format: {path}")
+
+
+def open_image(path: str) -> "Image.Image":
+    """
+    Open an image for reading, like Image.open but also for raw base images.
+    Other files open lazily, so callers can still draft() or thumbnail() them.
+    """
+    from PIL import Image
+
+    if os.path.splitext(path)[1].lower() == FORMATS["raw"]["ext"]:
+        return load(path)
+    return Image.open(path)
+
+
+def _as_mode(image: "Image.Image", mode: str) -> "Image.Image":
+    return image if image.mode == mode else image.convert(mode)
+
+
+def save(image: "Image.Image", path: str, fmt: str, level: str = "full"):
+    """Write image (RGB or RGBA) to path in the given storage format."""
+    if fmt == "jpg":
+        _as_mode(image, "RGB").save(path, format="JPEG", quality=JPEG_QUALITY.get(level, JPEG_DEFAULT_QUALITY))
+    elif fmt == "png":
+        # Stored as RGBA so loading needs no conversion
+        _as_mode(image, "RGBA").save(path, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+    elif fmt == "raw":
+        rgba = _as_mode(image, "RGBA")
+        with open(path, "wb") as f:
+            f.write(_RAW_HEADER.pack(RAW_MAGIC, RAW_VERSION, rgba.width, rgba.height))
+            f.write(rgba.tobytes())
+    else:
+        raise ValueError(f"Unknown base image format: {fmt}")
+
+
+def load(path: str) -> "Image.Image":
+    """
+    Read a base image as RGBA. PNG and raw files are stored as RGBA, so they
+    come back without a conversion copy; JPEG still needs one.
+    """
+    from PIL import Image
+
+    if format_of(path) == "raw":
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, width, height = _RAW_HEADER.unpack_from(data)
+        if magic != RAW_MAGIC or version != RAW_VERSION or len(data) != _RAW_HEADER.size + width * height * 4:
+            raise OSError(f"Corrupt raw base image: {path}")
+        # Shares the file buffer: no decode and no copy
+        return Image.frombuffer("RGBA", (width, height), memoryview(data)[_RAW_HEADER.size:], "raw", "RGBA", 0, 1)
+
+    im = Image.open(path)
+    if im.mode == "RGBA":
+        # Loading closes the file Pillow opened
+        im.load()
+        return im
+    with im:
+        return im.convert("RGBA")
@@ -0,0 +1,123 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+    from src.core.shared_assets import SharedAssetStore, SharedIndex
+
+logger = logging.getLogger(__name__)
+
+# Decoded sources kept between images of a pre-generation job. Jobs visit
+# the grid background by background, so one background at a time is enough;
+# a character's sprites are small (700x700) and all stay.
+MAX_BACKGROUNDS = 2
+MAX_SPRITES = 64
+
+
+class SpriteCompositor:
+    """
+    Composites character sprites onto backgrounds for pre-generation.
+
+    Decoding the 2560x834 background PNG dominates a base-image build, far
+    ahead of the paste itself, so decoded sources are cached by (path, content
+    hash) for the length of a job instead of being re-read for every
+    emotion. Sprites are cropped to their opaque bounding box once, and the
+    composite is made directly on an RGB copy of the background, which gives
+    the same pixels as compositing in RGBA and converting afterwards.
+
+    For multi-process rendering, one process publish()es the decoded sources
+    to a SharedAssetStore and workers pass its index as shared: sources found
+    there are used in place instead of being decoded again per worker.
+    """
+
+    def __init__(self, max_backgrounds: int = MAX_BACKGROUNDS, max_sprites: int = MAX_SPRITES, shared: Optional["SharedIndex"] = None):
+        self.max_backgrounds = max_backgrounds
+        self.max_sprites = max_sprites
+        self._lock = threading.Lock()
+        self._backgrounds: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+        self._sprites: "OrderedDict[tuple, Tuple[Image.Image, Tuple[int, int]]]" = OrderedDict()
+        self._shared = None
+        if shared:
+            from src.core.shared_assets import SharedAssetView
+            self._shared = SharedAssetView(shared)
+
+    @staticmethod
+    def _shared_key(kind: str, path: str, content_hash: str) -> str:
+        return f"{kind}:{content_hash}:{path}"
+
+    def _cached(self, cache: OrderedDict, limit: int, key: tuple, load):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+                return value
+        value = load()
+        with self._lock:
+            cache[key] = value
+            while len(cache) > limit:
+                cache.popitem(last=False)
+        return value
+
+    def background(self, path: str, content_hash: str = "") -> "Image.Image":
+        """Decoded RGB background (RGBX when shared); shared, do not modify."""
+        from PIL import Image
+
+        if self._shared is not None:
+            found = self._shared.get(self._shared_key("bg", path, content_hash))
+            if found is not None:
+                return found[0]
+
+        def load():
+            with Image.open(path) as im:
+                return im.convert("RGB")
+        return self._cached(self._backgrounds, self.max_backgrounds, (path, content_hash), load)
+
+    def sprite(self, path: str, content_hash: str = "") -> Tuple["Image.Image", Tuple[int, int]]:
+        """(RGBA sprite cropped to its opaque box, offset of the box); shared, do not modify."""
+        from PIL import Image
+
+        if self._shared is not None:
+            found = self._shared.get(self._shared_key("sprite", path, content_hash))
+            if found is not None:
+                return found[0], tuple(found[1])
+
+        def load():
+            with Image.open(path) as im:
+                rgba = im.convert("RGBA")
+            bbox = rgba.getchannel("A").getbbox()
+            if bbox is None:
+                return rgba.crop((0, 0, 0, 0)), (0, 0)
+            return rgba.crop(bbox), bbox[:2]
+        return self._cached(self._sprites, self.max_sprites, (path, content_hash), load)
+
+    def compose(self, background_path: str, sprite_path: str, offset: Tuple[int, int],
+                background_hash: str = "", sprite_hash: str = "") -> "Image.Image":
+        """New RGB image of the sprite pasted onto the background at offset."""
+        background = self.background(background_path, background_hash)
+        # Converting a shared RGBX view copies it just like copy() would
+        result = background.copy() if background.mode == "RGB" else background.convert("RGB")
+        sprite, (dx, dy) = self.sprite(sprite_path, sprite_hash)
+        if sprite.width and sprite.height:
+            result.paste(sprite, (offset[0] + dx, offset[1] + dy), sprite)
+        return result
+
+    def publish(self, store: "SharedAssetStore", backgrounds: Iterable[Tuple[str, str]] = (), sprites: Iterable[Tuple[str, str]] = ()):
+        """Decode (path, content hash) sources into store for worker processes."""
+        for path, content_hash in backgrounds:
+            store.put(self._shared_key("bg", path, content_hash), self.background(path, content_hash))
+        for path, content_hash in sprites:
+            sprite, offset = self.sprite(path, content_hash)
+            store.put(self._shared_key("sprite", path, content_hash), sprite, offset)
+
+    def clear(self):
+        with self._lock:
+            self._backgrounds.clear()
+            self._sprites.clear()
+
+    def close(self):
+        """Drop cached sources and detach from shared memory."""
+        self.clear()
+        if self._shared is not None:
+            self._shared.close()
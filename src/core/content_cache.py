@@ -0,0 +1,123 @@
+import io
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Memory for resized content images; a sticker at output size is well under 1 MB
+MAX_CONTENT_CACHE_BYTES = 64 * 1024 * 1024
+# Decoded images are hashed a band of rows at a time, so hashing a huge
+# image never copies more than this much of its pixels at once
+DIGEST_CHUNK_BYTES = 4 * 1024 * 1024
+
+
+def content_digest(image: "Image.Image") -> str:
+    """
+    Fast hash of a content image.
+
+    Images still backed by their in-memory file (what the clipboard readers
+    return) hash the encoded bytes, so a repeated paste is recognized without
+    decoding it; decoded images hash their pixels, in bands of rows.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{image.mode} {image.size}".encode("ascii"))
+    fp = getattr(image, "fp", None)
+    if isinstance(fp, io.BytesIO) and getattr(image, "tile", None):
+        with fp.getbuffer() as data:
+            h.update(b"file")
+            h.update(data)
+    else:
+        h.update(b"pixels")
+        width, height = image.size
+        rows = max(1, DIGEST_CHUNK_BYTES // max(1, width * len(image.getbands())))
+        if rows >= height:
+            h.update(image.tobytes())
+        else:
+            for top in range(0, height, rows):
+                h.update(image.crop((0, top, width, min(height, top + rows))).tobytes())
+    return h.hexdigest()
+
+
+class ContentCache:
+    """
+    LRU of resized content images, keyed by content digest and target.
+
+    paste_image stores what it would paste (the content resized to its box
+    at output resolution), so pasting the same screenshot or sticker again
+    costs only the paste and the PNG encode. Cached images are shared
+    between render threads and never modified. Bounded by pixel memory.
+    """
+
+    def __init__(self, max_bytes: int = MAX_CONTENT_CACHE_BYTES):
+        self.enabled = True
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._images: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _size(image: "Image.Image") -> int:
+        return image.width * image.height * len(image.getbands())
+
+    def get(self, key: tuple) -> Optional["Image.Image"]:
+        with self._lock:
+            image = self._images.get(key)
+            if image is None:
+                self.misses += 1
+                return None
+            self._images.move_to_end(key)
+            self.hits += 1
+            return image
+
+    def put(self, key: tuple, image: "Image.Image"):
+        size = self._size(image)
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._images.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size(old)
+            self._images[key] = image
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._images.popitem(last=False)
+                self._bytes -= self._size(evicted)
+
+    def resized(self, image: "Image.Image", size: Tuple[int, int], resample, reducing_gap, resize) -> "Image.Image":
+        """
+        image resized to size by resize(image, size, resample, reducing_gap),
+        cached. Images already at size are not cached: that would keep the
+        caller's image (and the file behind it) alive for nothing saved.
+        """
+        if not self.enabled or image.size == tuple(size):
+            return resize(image, size, resample, reducing_gap)
+        key = (content_digest(image), tuple(size), int(resample), reducing_gap)
+        cached = self.get(key)
+        if cached is None:
+            cached = resize(image, size, resample, reducing_gap)
+            if cached is image:
+                return cached
+            cached.load()
+            self.put(key, cached)
+        return cached
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._images.clear()
+            self._bytes = 0
+
+
+# Shared by all render threads; set enabled = False to resize every paste
+content_cache = ContentCache()
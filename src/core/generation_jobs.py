@@ -0,0 +1,269 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.utils.platform_utils import PlatformUtils
+
+logger = logging.getLogger(__name__)
+
+# Flush progress (manifest) after this many images
+FLUSH_EVERY = 16
+
+# Queue priorities, lowest first
+PRIORITY_URGENT = 0  # The image the next send will use
+PRIORITY_FOCUSED = 1  # Everything else for the selected character
+PRIORITY_OTHER = 2
+
+# Seconds without a foreground render before background work resumes, so a
+# burst of sends is not interleaved with base-image builds
+RESUME_DELAY = 0.3
+# Nice increment of the worker thread where per-thread priorities exist
+BACKGROUND_NICE = 10
+
+_PLAN = "plan"
+_FINISH = "finish"
+
+
+class GenerationJob:
+    """Pre-generation of one character's base images."""
+
+    def __init__(self, character: str):
+        self.character = character
+        self.state = "queued"  # queued / running / done / cancelled / failed
+        self.pending: Dict[int, Any] = {}
+        self.total = 0
+        self.done = 0
+        self.stale = False  # Re-plan once the current plan has drained
+        self.created = time.time()
+        self.finished: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.state in ("queued", "running")
+
+    def status(self) -> Dict:
+        return {"character": self.character, "state": self.state, "done": self.done, "total": self.total}
+
+
+class GenerationManager:
+    """
+    Runs base-image pre-generation as at most one job per character.
+
+    Images are built one at a time on a single worker thread, so two writers
+    can never produce the same file. Work is pulled from a priority queue: the
+    image the next send will use first, then the rest of the selected
+    character, then anything else. Moving to another character cancels the
+    jobs of the others; images already built stay in the manifest.
+
+    The worker runs at lowered thread priority and holds off while any
+    foreground() block is active (and for resume_delay seconds after), so
+    warm-up never competes with a send. An image already being built is
+    finished first; no new one is started.
+
+    The application supplies three callbacks:
+      plan(character) -> {img_num: payload} of images that are missing or stale
+      build(character, img_num, payload) builds and records one image
+      flush(character, final) persists progress (final=True when a job ends)
+    """
+
+    def __init__(self, plan: Callable[[str], Dict[int, Any]], build: Callable[[str, int, Any], None], flush: Callable[[str, bool], None],
+                 resume_delay: float = RESUME_DELAY, background: bool = True):
+        self._plan = plan
+        self._build = build
+        self._flush = flush
+        self._cond = threading.Condition()
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._jobs: Dict[str, GenerationJob] = {}
+        self._urgent: Dict[str, set] = {}
+        self._focus: Optional[str] = None
+        self._busy = False
+        self._current: Optional[GenerationJob] = None  # Job the worker is building for
+        self._thread: Optional[threading.Thread] = None
+        self.resume_delay = resume_delay
+        self.background = background
+        self._foreground = 0
+        self._foreground_end = 0.0
+
+    def _push(self, priority: int, job: GenerationJob, item):
+        heapq.heappush(self._queue, (priority, next(self._seq), job, item))
+        self._cond.notify_all()
+
+    def _priority(self, job: GenerationJob) -> int:
+        return PRIORITY_FOCUSED if job.character == self._focus else PRIORITY_OTHER
+
+    def submit(self, character: str, first: Iterable[int] = ()) -> GenerationJob:
+        """
+        Queue pre-generation for character, unless a job for it is already
+        queued or running (that job re-plans once it drains instead). first
+        lists image numbers to build before the rest.
+        """
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="generation", daemon=True)
+                self._thread.start()
+
+            self._urgent.setdefault(character, set()).update(first)
+            job = self._jobs.get(character)
+            if job is not None and job.active:
+                job.stale = True
+                for img_num in first:
+                    if img_num in job.pending:
+                        self._push(PRIORITY_URGENT, job, img_num)
+                return job
+
+            job = GenerationJob(character)
+            self._jobs[character] = job
+            self._push(self._priority(job), job, _PLAN)
+            return job
+
+    def prioritize(self, character: str, img_num: int):
+        """Build img_num of character next, if it is still pending."""
+        with self._cond:
+            self._urgent.setdefault(character, set()).add(img_num)
+            job = self._jobs.get(character)
+            if job is not None and job.active and img_num in job.pending:
+                self._push(PRIORITY_URGENT, job, img_num)
+
+    def focus(self, character: str):
+        """Select character; jobs of every other character are cancelled."""
+        with self._cond:
+            self._focus = character
+            for job in self._jobs.values():
+                if job.character != character and job.active:
+                    self._cancel(job)
+
+    def cancel(self, characters: Optional[Iterable[str]] = None):
+        """Cancel the jobs of characters (all jobs if None)."""
+        selected = set(characters) if characters is not None else None
+        with self._cond:
+            for job in self._jobs.values():
+                if job.active and (selected is None or job.character in selected):
+                    self._cancel(job)
+
+    def _cancel(self, job: GenerationJob):
+        job.state = "cancelled"
+        job.pending.clear()
+        self._urgent.pop(job.character, None)
+        self._push(PRIORITY_URGENT, job, _FINISH)
+
+    @contextmanager
+    def foreground(self):
+        """Pause background generation for the duration of the block."""
+        with self._cond:
+            self._foreground += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._foreground -= 1
+                self._foreground_end = time.monotonic()
+                self._cond.notify_all()
+
+    def _hold_off(self) -> float:
+        """Seconds to keep pausing for foreground work; 0 once idle."""
+        if self._foreground:
+            return self.resume_delay
+        return max(0.0, self._foreground_end + self.resume_delay - time.monotonic())
+
+    def status(self) -> List[Dict]:
+        with self._cond:
+            return [job.status() for job in sorted(self._jobs.values(), key=lambda j: j.created)]
+
+    def wait(self, characters: Optional[Iterable[str]] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the jobs of characters (all jobs if None) have ended and
+        the worker is no longer writing for them; returns False on timeout.
+        """
+        if characters is None:
+            def idle():
+                return not self._busy and not self._queue and not any(j.active for j in self._jobs.values())
+        else:
+            selected = set(characters)
+
+            def idle():
+                jobs = [j for j in self._jobs.values() if j.character in selected]
+                return not any(j.active for j in jobs) and (self._current is None or self._current.character not in selected)
+        with self._cond:
+            return self._cond.wait_for(idle, timeout)
+
+    def _run(self):
+        if self.background and not PlatformUtils.lower_thread_priority(BACKGROUND_NICE):
+            logger.debug("Generation worker runs at normal priority")
+        while True:
+            with self._cond:
+                while True:
+                    self._cond.wait_for(lambda: self._queue)
+                    delay = self._hold_off()
+                    if not delay:
+                        break
+                    self._cond.wait(delay)
+                priority, _, job, item = heapq.heappop(self._queue)
+                self._busy = True
+                self._current = job
+                if item == _FINISH:
+                    pass
+                elif not job.active or (item != _PLAN and item not in job.pending):
+                    # Cancelled, or a duplicate entry of an image already built
+                    self._busy = False
+                    self._current = None
+                    self._cond.notify_all()
+                    continue
+                else:
+                    job.state = "running"
+                    payload = job.pending.pop(item, None) if item != _PLAN else None
+
+            try:
+                if item == _FINISH:
+                    self._flush(job.character, True)
+                elif item == _PLAN:
+                    self._expand(job)
+                else:
+                    self._build(job.character, item, payload)
+                    job.done += 1
+                    if job.done % FLUSH_EVERY == 0:
+                        self._flush(job.character, False)
+            except Exception as e:
+                logger.error(f"Generation job for {job.character} failed: {e}", exc_info=True)
+                with self._cond:
+                    if job.active:
+                        job.state = "failed"
+                        job.pending.clear()
+                        self._push(PRIORITY_URGENT, job, _FINISH)
+
+            with self._cond:
+                if item == _FINISH:
+                    job.finished = time.time()
+                elif job.state == "running" and not job.pending:
+                    if job.stale:
+                        job.stale = False
+                        self._push(self._priority(job), job, _PLAN)
+                    else:
+                        job.state = "done"
+                        self._urgent.pop(job.character, None)
+                        self._push(PRIORITY_URGENT, job, _FINISH)
+                        if job.total:
+                            logger.info("加载完成")
+                self._busy = False
+                self._current = None
+                self._cond.notify_all()
+
+    def _expand(self, job: GenerationJob):
+        """Plan job and queue its images (outside the lock: planning hashes assets)."""
+        pending = self._plan(job.character)
+        with self._cond:
+            if not job.active:
+                return
+            job.pending.update(pending)
+            job.total = job.done + len(job.pending)
+            urgent = self._urgent.get(job.character, set())
+            base = self._priority(job)
+            # Keep the plan's order: it lets build() reuse decoded sources
+            for img_num in job.pending:
+                self._push(PRIORITY_URGENT if img_num in urgent else base, job, img_num)
+            if pending:
+                logger.info(f"正在加载角色资源: {job.character} ({len(pending)} images)...")
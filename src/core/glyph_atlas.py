@@ -0,0 +1,191 @@
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image, ImageFont
+
+logger = logging.getLogger(__name__)
+
+# Rasterized glyph masks to keep; CJK chat text reuses a few hundred glyphs
+MAX_GLYPHS = 4096
+# Kerned advances to keep before the pair table is reset
+MAX_PAIRS = 16384
+
+
+def _is_simple(ch: str) -> bool:
+    """True if ch renders as one glyph with no shaping (no marks, emoji, RTL...)."""
+    if ch in "\n\r\t" or ord(ch) >= 0x10000 or unicodedata.combining(ch):
+        return False
+    if unicodedata.category(ch) in ("Mn", "Me", "Cf", "Cs", "Co", "So", "Sk"):
+        return False
+    return unicodedata.bidirectional(ch) not in ("R", "AL", "AN", "RLE", "RLO", "RLI")
+
+
+class GlyphAtlas:
+    """
+    LRU of rasterized glyph masks keyed by (font file, size, character).
+
+    draw() lays a run out glyph by glyph the way Pillow's basic layout does
+    (kerned 26.6 advances, pixel-rounded pen positions), merges the cached
+    masks into one run mask the way FreeType bitmaps are blended (a + b - ab,
+    the paste of full coverage through each mask) and pastes the fill color
+    through it. The first run drawn with each font and size is also drawn
+    with ImageDraw.text and compared; a font whose run differs is left to
+    ImageDraw.text from then on, so the atlas is only used where it matched.
+    Runs that need real shaping (marks, emoji, RTL, the raqm layout engine),
+    fonts not loaded from a file and fractional positions return False and
+    are drawn by the caller.
+    """
+
+    def __init__(self, max_glyphs: int = MAX_GLYPHS):
+        self.enabled = True
+        self.max_glyphs = max_glyphs
+        self._lock = threading.Lock()
+        self._glyphs: "OrderedDict[tuple, Tuple[Optional[Image.Image], Tuple[int, int]]]" = OrderedDict()
+        self._advances: Dict[tuple, float] = {}
+        # Font key -> whether its first run matched ImageDraw.text
+        self._verified: Dict[tuple, bool] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _font_key(font: "ImageFont.FreeTypeFont") -> Optional[tuple]:
+        """Key of a font loaded from a file; None for in-memory fonts, which have no stable identity."""
+        path = getattr(font, "path", None)
+        if not isinstance(path, str):
+            return None
+        return (path, font.size, getattr(font, "index", 0))
+
+    def supports(self, text: str, font) -> bool:
+        from PIL import ImageFont
+
+        if not self.enabled or not text or not isinstance(font, ImageFont.FreeTypeFont):
+            return False
+        if font.layout_engine != ImageFont.Layout.BASIC:
+            return False
+        key = self._font_key(font)
+        if key is None:
+            return False
+        with self._lock:
+            if self._verified.get(key) is False:
+                return False
+        return all(_is_simple(ch) for ch in text)
+
+    def glyph(self, font: "ImageFont.FreeTypeFont", ch: str) -> Tuple[Optional["Image.Image"], Tuple[int, int]]:
+        """(mask, offset) of one glyph drawn at the origin; mask is None for blank glyphs."""
+        key = self._font_key(font) + (ch,)
+        with self._lock:
+            cached = self._glyphs.get(key)
+            if cached is not None:
+                self._glyphs.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        from PIL import Image, ImageDraw
+
+        left, top, right, bottom = font.getbbox(ch)
+        mask = None
+        if right > left and bottom > top:
+            mask = Image.new("L", (right - left, bottom - top), 0)
+            ImageDraw.Draw(mask).text((-left, -top), ch, font=font, fill=255)
+        entry = (mask, (left, top))
+
+        with self._lock:
+            self._glyphs[key] = entry
+            while len(self._glyphs) > self.max_glyphs:
+                self._glyphs.popitem(last=False)
+        return entry
+
+    def _advance(self, font: "ImageFont.FreeTypeFont", ch: str, next_ch: Optional[str]) -> float:
+        """Advance of ch, including kerning against next_ch."""
+        key = self._font_key(font) + (ch, next_ch)
+        with self._lock:
+            advance = self._advances.get(key)
+        if advance is None:
+            if next_ch is None:
+                advance = font.getlength(ch)
+            else:
+                advance = font.getlength(ch + next_ch) - font.getlength(next_ch)
+            with self._lock:
+                if len(self._advances) >= MAX_PAIRS:
+                    self._advances.clear()
+                self._advances[key] = advance
+        return advance
+
+    def draw(self, image: "Image.Image", xy: Tuple[int, int], text: str, font, fill) -> bool:
+        """
+        Draw text at xy (top-left anchor, like ImageDraw.text) from cached
+        glyphs. Returns False without drawing if the run is not supported.
+        """
+        # ImageDraw.text renders fractional positions with a sub-pixel shift
+        if not self.supports(text, font) or any(int(v) != v for v in xy):
+            return False
+
+        from PIL import Image
+
+        placed = []
+        pen = 0.0
+        for i, ch in enumerate(text):
+            mask, (ox, oy) = self.glyph(font, ch)
+            if mask is not None:
+                # Pillow rounds the 26.6 pen position to whole pixels per glyph
+                px = int(pen * 64 + 32) >> 6
+                placed.append((mask, px + ox, oy))
+            pen += self._advance(font, ch, text[i + 1] if i + 1 < len(text) else None)
+
+        if not placed:
+            return True
+        left = min(x for _, x, _ in placed)
+        top = min(y for _, _, y in placed)
+        right = max(x + m.width for m, x, _ in placed)
+        bottom = max(y + m.height for m, _, y in placed)
+
+        run_mask = Image.new("L", (right - left, bottom - top), 0)
+        for mask, x, y in placed:
+            box = (x - left, y - top, x - left + mask.width, y - top + mask.height)
+            run_mask.paste(255, box, mask)
+
+        key = self._font_key(font)
+        with self._lock:
+            verified = self._verified.get(key)
+        if verified is None:
+            verified = self._matches(run_mask, (left, top), text, font)
+            with self._lock:
+                self._verified[key] = verified
+            if not verified:
+                logger.debug(f"Glyph atlas differs from ImageDraw.text for {key}; not used for this font.")
+                return False
+
+        if isinstance(fill, tuple) and image.mode == "RGBA" and len(fill) == 3:
+            fill = fill + (255,)
+        image.paste(fill, (int(xy[0]) + left, int(xy[1]) + top), run_mask)
+        return True
+
+    @staticmethod
+    def _matches(run_mask: "Image.Image", offset: Tuple[int, int], text: str, font) -> bool:
+        """Whether run_mask, placed at offset, is the coverage ImageDraw.text draws for text."""
+        from PIL import Image, ImageChops, ImageDraw
+
+        left, top, right, bottom = font.getbbox(text)
+        left, top = min(left, offset[0]), min(top, offset[1])
+        right = max(right, offset[0] + run_mask.width)
+        bottom = max(bottom, offset[1] + run_mask.height)
+        expected = Image.new("L", (right - left, bottom - top), 0)
+        ImageDraw.Draw(expected).text((-left, -top), text, font=font, fill=255)
+        actual = Image.new("L", expected.size, 0)
+        actual.paste(run_mask, (offset[0] - left, offset[1] - top))
+        return ImageChops.difference(expected, actual).getbbox() is None
+
+    def clear(self):
+        with self._lock:
+            self._glyphs.clear()
+            self._advances.clear()
+            self._verified.clear()
+
+
+# Shared by all render threads; set enabled = False to always use ImageDraw.text
+glyph_atlas = GlyphAtlas()
@@ -0,0 +1,301 @@
+import os
+import re
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, TYPE_CHECKING
+
+from src.core import base_image_format
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_SCHEMA = 1
+
+# Pyramid levels stored for every base image, largest first
+LEVELS = ("full", "output", "thumb")
+# Size of thumb-level images and contact-sheet tiles; the aspect matches the
+# 2560x834 base images
+THUMBNAIL_SIZE = (320, 104)
+MAX_THUMBNAILS = 256
+# Names of generated files: "name (n).ext", other levels "name (n).level.ext"
+_GENERATED_NAME = re.compile(
+    r"^(?P<character>.+) \((?P<num>\d+)\)(?:\.(?:%s))?(?P<ext>%s)$" % (
+        "|".join(LEVELS[1:]),
+        "|".join(re.escape(spec["ext"]) for spec in base_image_format.FORMATS.values()),
+    ),
+    re.IGNORECASE,
+)
+
+
+class BaseImageCache:
+    """
+    Manifest-backed store for pre-generated base images.
+
+    Every generated image is recorded together with the hashes of the assets it
+    was built from, the generation parameters and the tool version, so callers
+    can regenerate only the entries that are missing or stale.
+
+    Entries also remember their size on disk and when they were last used. With
+    a byte budget set, ``enforce_budget`` evicts the least recently used images
+    across all characters until the folder fits again.
+
+    Each base image is stored as a pyramid of LEVELS: full resolution, the
+    final output size and a thumbnail. An entry covers all of its levels.
+    Files are written in image_format (see base_image_format.FORMATS); entries
+    stored in another format are never fresh and age out through eviction.
+    """
+
+    def __init__(self, folder: str, tool_version: str, budget_bytes: int = 0, image_format: str = "jpg"):
+        if image_format not in base_image_format.FORMATS:
+            raise ValueError(f"Unknown base image format: {image_format}")
+        self.folder = folder
+        self.image_format = image_format
+        self.tool_version = tool_version
+        self.budget_bytes = budget_bytes
+        self.manifest_path = os.path.join(folder, MANIFEST_NAME)
+        self._lock = threading.RLock()
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = False
+        self._thumbnails: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifest unreadable, starting fresh: {e}")
+            return
+        if data.get("schema") != MANIFEST_SCHEMA:
+            logger.info("Manifest schema changed, starting fresh.")
+            return
+        # Manifests written before the asset registry also hold an "assets"
+        # section of source hashes; it is dropped on the next save
+        self._entries = data.get("entries", {})
+
+    def save(self):
+        """Write the manifest atomically if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "schema": MANIFEST_SCHEMA,
+                "entries": self._entries,
+            }
+            tmp_path = self.manifest_path + ".tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+                os.replace(tmp_path, self.manifest_path)
+                self._dirty = False
+            except OSError as e:
+                logger.error(f"Failed to write manifest: {e}")
+
+    @staticmethod
+    def image_name(character: str, img_num: int, level: str = "full", image_format: str = "jpg") -> str:
+        ext = base_image_format.extension(image_format)
+        if level == "full":
+            return f"{character} ({img_num}){ext}"
+        return f"{character} ({img_num}).{level}{ext}"
+
+    def image_path(self, character: str, img_num: int, level: str = "full") -> str:
+        return os.path.join(self.folder, self.image_name(character, img_num, level, self.image_format))
+
+    def _level_paths(self, name: str) -> List[str]:
+        """Paths of every pyramid level of the entry stored under name."""
+        stem, ext = os.path.splitext(name)
+        return [os.path.join(self.folder, name)] + [
+            os.path.join(self.folder, f"{stem}.{level}{ext}") for level in LEVELS[1:]
+        ]
+
+    @staticmethod
+    def best_level(size, level_sizes: Dict[str, tuple]) -> str:
+        """
+        Return the smallest level whose dimensions cover size (width, height).
+        level_sizes maps level names to their (width, height).
+        """
+        for level in reversed(LEVELS):
+            w, h = level_sizes[level]
+            if w >= size[0] and h >= size[1]:
+                return level
+        return LEVELS[0]
+
+    def is_fresh(self, character: str, img_num: int, sources: Dict[str, str], params: Dict) -> bool:
+        """Whether the stored image exists and was built from the same inputs."""
+        name = self.image_name(character, img_num, image_format=self.image_format)
+        with self._lock:
+            entry = self._entries.get(name)
+        if entry is None:
+            return False
+        if not all(os.path.exists(path) for path in self._level_paths(name)):
+            return False
+        return (
+            entry.get("sources") == sources
+            and entry.get("params") == params
+            and entry.get("version") == self.tool_version
+        )
+
+    def record(self, character: str, img_num: int, sources: Dict[str, str], params: Dict):
+        name = self.image_name(character, img_num, image_format=self.image_format)
+        size = 0
+        for path in self._level_paths(name):
+            try:
+                size += os.path.getsize(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._entries[name] = {
+                "character": character,
+                "img_num": img_num,
+                "sources": sources,
+                "params": params,
+                "version": self.tool_version,
+                "size": size,
+                "last_used": time.time(),
+            }
+            self._dirty = True
+
+    def touch(self, character: str, img_num: int):
+        """Mark an image as used so eviction keeps it around longer."""
+        name = self.image_name(character, img_num, image_format=self.image_format)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry["last_used"] = time.time()
+                self._dirty = True
+
+    def usage(self) -> Dict[str, int]:
+        """Return the total cached bytes and image count."""
+        with self._lock:
+            total = sum(e.get("size", 0) for e in self._entries.values())
+            return {"bytes": total, "images": len(self._entries), "budget": self.budget_bytes}
+
+    def enforce_budget(self, protect: Iterable[str] = ()) -> int:
+        """
+        Evict least recently used images until the cache fits the byte budget.
+
+        Characters in ``protect`` (typically the selected one and the one being
+        generated) are never evicted. Returns the number of files removed.
+        """
+        if self.budget_bytes <= 0:
+            return 0
+        protected = set(protect)
+        removed = 0
+        with self._lock:
+            total = sum(e.get("size", 0) for e in self._entries.values())
+            if total <= self.budget_bytes:
+                return 0
+            candidates = sorted(
+                (item for item in self._entries.items() if item[1]["character"] not in protected),
+                key=lambda item: item[1].get("last_used", 0),
+            )
+            for name, entry in candidates:
+                if total <= self.budget_bytes:
+                    break
+                try:
+                    for path in self._level_paths(name):
+                        if os.path.exists(path):
+                            os.remove(path)
+                except OSError as e:
+                    logger.warning(f"Failed to evict {name}: {e}")
+                    continue
+                total -= entry.get("size", 0)
+                del self._entries[name]
+                removed += 1
+            if removed:
+                self._dirty = True
+        if removed:
+            logger.info(f"Evicted {removed} cached images to stay within budget.")
+            self.save()
+        return removed
+
+    def thumbnail(self, character: str, img_num: int) -> Optional["Image.Image"]:
+        """
+        Return a THUMBNAIL_SIZE thumbnail of a generated image, or None if it
+        does not exist yet. The thumb level is used when present, otherwise
+        the full image is reduced. Thumbnails are kept in a bounded in-memory
+        LRU keyed by file and mtime, so regenerated images are picked up.
+        """
+        key = None
+        for level in ("thumb", "full"):
+            path = self.image_path(character, img_num, level)
+            try:
+                key = (path, os.stat(path).st_mtime_ns)
+                break
+            except OSError:
+                continue
+        if key is None:
+            return None
+        with self._lock:
+            thumb = self._thumbnails.get(key)
+            if thumb is not None:
+                self._thumbnails.move_to_end(key)
+                return thumb
+
+        from PIL import Image
+        try:
+            with base_image_format.open_image(path) as im:
+                # JPEG decodes straight at a reduced scale
+                im.draft("RGB", THUMBNAIL_SIZE)
+                im.thumbnail(THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
+                thumb = im.convert("RGB")
+        except OSError:
+            return None
+
+        with self._lock:
+            self._thumbnails[key] = thumb
+            while len(self._thumbnails) > MAX_THUMBNAILS:
+                self._thumbnails.popitem(last=False)
+        return thumb
+
+    def characters(self) -> List[str]:
+        with self._lock:
+            return sorted({e["character"] for e in self._entries.values()})
+
+    def clear(self, characters: Optional[Iterable[str]] = None) -> int:
+        """
+        Delete generated images and their manifest entries.
+
+        With ``characters`` given only those characters are removed; otherwise
+        every generated image in the folder is deleted. Generated images are
+        the files named like image_name() in any storage format, so switching
+        formats leaves nothing behind; other files in the folder are left
+        alone. Returns the number of files removed.
+        """
+        selected = set(characters) if characters is not None else None
+        removed = 0
+        with self._lock:
+            for filename in os.listdir(self.folder):
+                match = _GENERATED_NAME.match(filename)
+                if match is None:
+                    continue
+                if selected is not None:
+                    # Level files ("name (n).thumb.jpg") belong to the full-size entry
+                    entry = self._entries.get(f"{match['character']} ({match['num']}){match['ext']}")
+                    owner = entry["character"] if entry else match["character"]
+                    if owner not in selected:
+                        continue
+                try:
+                    os.remove(os.path.join(self.folder, filename))
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Failed to remove {filename}: {e}")
+
+            stale = [
+                name for name, entry in self._entries.items()
+                if selected is None or entry["character"] in selected
+            ]
+            for name in stale:
+                del self._entries[name]
+            if stale:
+                self._dirty = True
+        self.save()
+        return removed
@@ -1,28 +1,86 @@
 import os
 import io
+import re
+import itertools
 import logging
-from typing import Tuple, Union, Literal, Optional, List, Dict
+import threading
+from functools import lru_cache
+from typing import Tuple, Union, Literal, Optional, List, Dict, NamedTuple
 from PIL import Image, ImageDraw, ImageFont
 
+from src.config import MAX_TEXT_PAGES
+from src.core.content_cache import content_cache
+from src.core.glyph_atlas import glyph_atlas
+from src.core.quality import QualityPreset
+from src.utils.render_profile import render_profiler
+
 try:
     from pilmoji import Pilmoji
+    from pilmoji.helpers import getsize as pilmoji_getsize, to_nodes, NodeType
     PILMOJI_AVAILABLE = True
 except ImportError:
     PILMOJI_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
+# Clipboard images larger than this many pixels are box-reduced as far as
+# the target size allows before the final resample
+MAX_CONTENT_PIXELS = 100_000_000
+# Content images are always reduced in steps, at most this far from the target
+CONTENT_REDUCING_GAP = 3.0
+
+# Used when a render names no preset: the original full-quality pipeline
+DEFAULT_QUALITY = QualityPreset.get("best")
+
 Align = Literal["left", "center", "right"]
 VAlign = Literal["top", "middle", "bottom"]
 
+# (origin, shadow, layer) of a pre-rendered character name plate
+NamePlate = Tuple[Tuple[int, int], Image.Image, Image.Image]
+
+# Per-thread draw context: FreeType faces are not safe to share across threads
+_draw_context = threading.local()
+
+# Full-size canvases each render thread keeps for reuse (e.g. the output and
+# the full-resolution level)
+CANVASES_PER_THREAD = 2
+
+# How many fitted text layouts to remember
+TEXT_LAYOUT_CACHE_SIZE = 128
+
+
+_OPEN_BRACKETS = ("[", "【")
+_CLOSE_BRACKETS = ("]", "】")
+_BRACKET_SPLIT = re.compile(r"([\[\]【】])")
+
+# A styled run: (x offset within the line, text, bracket-highlighted)
+Run = Tuple[int, str, bool]
+
+# Where text may be split into pages: line breaks, and sentence ends with any
+# closing quotes (a period only when followed by whitespace, not in "3.14")
+_SENTENCE_END = re.compile(r"\n+|[。！？!?…]+[”」』）)\"']*|\.(?=\s)")
+
+
+class TextLayout(NamedTuple):
+    """
+    Fitted text: font size, wrapped lines, their pixel widths and their
+    pre-measured styled runs. Runs store a highlight flag rather than a color,
+    so one layout serves every character.
+    """
+    font_size: int
+    lines: Tuple[str, ...]
+    widths: Tuple[int, ...]
+    line_height: int
+    block_height: int
+    runs: Tuple[Tuple[Run, ...], ...] = ()
+
 class ImageProcessor:
     def __init__(self):
         pass
 
     @staticmethod
-    def compress_image(image: Image.Image, max_width: int = 1200, max_height: int = 800, resize_ratio: float = 0.7) -> Image.Image:
-        """Compress image size."""
-        width, height = image.size
+    def compressed_size(width: int, height: int, max_width: int = 1200, max_height: int = 800, resize_ratio: float = 0.7) -> Tuple[int, int]:
+        """Return the size compress_image will produce for an image of this size."""
         new_width = int(width * resize_ratio)
         new_height = int(height * resize_ratio)
 
@@ -34,7 +92,103 @@ class ImageProcessor:
             ratio = max_height / new_height
             new_height, new_width = max_height, int(new_width * ratio)
 
-        return image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+        return new_width, new_height
+
+    @staticmethod
+    def compress_image(image: Image.Image, max_width: int = 1200, max_height: int = 800, resize_ratio: float = 0.7,
+                       resample: Image.Resampling = Image.Resampling.LANCZOS, reducing_gap: Optional[float] = None) -> Image.Image:
+        """Compress image size."""
+        new_size = ImageProcessor.compressed_size(*image.size, max_width, max_height, resize_ratio)
+        return image.resize(new_size, resample, reducing_gap=reducing_gap)
+
+    @staticmethod
+    def make_contact_sheet(
+        tiles: List[Optional[Image.Image]],
+        columns: int,
+        tile_size: Tuple[int, int],
+        highlight: Optional[int] = None,
+        spacing: int = 4,
+    ) -> Image.Image:
+        """
+        Tile thumbnails into a numbered grid. Missing tiles are drawn as gray
+        placeholders and the highlighted tile gets a yellow frame.
+        """
+        tw, th = tile_size
+        columns = max(1, columns)
+        rows = max(1, (len(tiles) + columns - 1) // columns)
+        sheet = Image.new("RGB", (columns * (tw + spacing) + spacing, rows * (th + spacing) + spacing), (24, 24, 24))
+        draw = ImageDraw.Draw(sheet)
+        font = ImageFont.load_default()
+
+        for i, tile in enumerate(tiles):
+            x = spacing + (i % columns) * (tw + spacing)
+            y = spacing + (i // columns) * (th + spacing)
+            if tile is None:
+                draw.rectangle((x, y, x + tw - 1, y + th - 1), fill=(64, 64, 64))
+            else:
+                sheet.paste(tile, (x + (tw - tile.width) // 2, y + (th - tile.height) // 2))
+
+            label = str(i + 1)
+            lw = int(draw.textlength(label, font=font))
+            draw.rectangle((x, y, x + lw + 7, y + 15), fill=(0, 0, 0))
+            draw.text((x + 4, y + 2), label, fill=(255, 255, 255), font=font)
+            if i == highlight:
+                draw.rectangle((x - 2, y - 2, x + tw + 1, y + th + 1), outline=(255, 200, 0), width=3)
+        return sheet
+
+    @staticmethod
+    def _canvas(image_source: Union[str, Image.Image]) -> Image.Image:
+        """
+        Writable RGBA copy of image_source to render on.
+
+        Decoded sources are copied into a canvas from the calling thread's
+        draw context, reused by its next render of the same size, instead of
+        allocating (and faulting in) a new full-size buffer for every send.
+        The canvas is only valid until that thread's next render.
+        """
+        if not isinstance(image_source, Image.Image):
+            return Image.open(image_source).convert("RGBA")
+        canvases = getattr(_draw_context, "canvases", None)
+        if canvases is None:
+            canvases = _draw_context.canvases = {}
+        canvas = canvases.pop(image_source.size, None)
+        if canvas is None:
+            if len(canvases) >= CANVASES_PER_THREAD:
+                del canvases[next(iter(canvases))]
+            canvas = Image.new("RGBA", image_source.size)
+        canvases[image_source.size] = canvas
+        # Converts like convert("RGBA") when the source is not RGBA
+        canvas.paste(image_source, (0, 0))
+        return canvas
+
+    @staticmethod
+    def _encode_png(image: Image.Image, compress_level: int) -> bytes:
+        buf = io.BytesIO()
+        image.save(buf, "png", compress_level=compress_level)
+        return buf.getvalue()
+
+    @staticmethod
+    def _fit_content(content_image: Image.Image, size: Tuple[int, int], resample: Image.Resampling = Image.Resampling.LANCZOS,
+                     reducing_gap: float = CONTENT_REDUCING_GAP) -> Image.Image:
+        """
+        Resize a (possibly huge) content image to size with a single resample.
+
+        JPEG sources are decoded at a reduced DCT scale via draft() before the
+        full decode. Inputs over MAX_CONTENT_PIXELS (already decoded ones
+        too, such as screenshots) are reduce()d by the largest integer factor
+        that keeps them at or above size; the resize then box-reduces what is
+        left down to reducing_gap times size before its single final pass.
+        """
+        # No-op for formats without draft support or images already loaded
+        content_image.draft(None, size)
+        cw, ch = content_image.size
+        if (cw, ch) == size:
+            return content_image
+        if cw * ch > MAX_CONTENT_PIXELS:
+            factor = min(cw // size[0], ch // size[1])
+            if factor > 1:
+                content_image = content_image.reduce(factor)
+        return content_image.resize(size, resample, reducing_gap=reducing_gap)
 
     @staticmethod
     def paste_image(
@@ -50,29 +204,44 @@ class ImageProcessor:
         max_image_size: Tuple[Optional[int], Optional[int]] = (None, None),
         role_name: str = "unknown",
         text_configs_dict: Optional[Dict] = None,
-        font_path: Optional[str] = None
+        font_path: Optional[str] = None,
+        layout_scale: float = 1.0,
+        compress: bool = True,
+        name_plate: Optional[NamePlate] = None,
+        name_shadow: int = 2,
+        quality: Optional[QualityPreset] = None,
     ) -> bytes:
         """
         Paste an image into a specified rectangle, scaling to fit.
+
+        The result is composed at compress_image's output resolution; the
+        character name is drawn beneath the pasted content.
+
+        Coordinates are given in layout (full-resolution) space; layout_scale
+        is the size of image_source relative to that space, e.g. when passing
+        an output-size base image with compress=False. name_plate is a
+        pre-rendered plate from render_name_plate, used instead of drawing one.
+        quality selects resampling, encoder effort and shadows (default: best).
         """
         if not isinstance(content_image, Image.Image):
             raise TypeError("content_image must be PIL.Image.Image")
+        quality = quality or DEFAULT_QUALITY
+        stages = render_profiler.begin("paste_image")
 
-        if isinstance(image_source, Image.Image):
-            img = image_source.copy()
-        else:
-            img = Image.open(image_source).convert("RGBA")
+        img = ImageProcessor._canvas(image_source)
+        stages.mark("base")
 
         # Load overlay if provided
         img_overlay = None
         if image_overlay is not None:
             if isinstance(image_overlay, Image.Image):
-                img_overlay = image_overlay.copy()
+                img_overlay = image_overlay  # Only read from
             elif isinstance(image_overlay, str) and os.path.isfile(image_overlay):
                 img_overlay = Image.open(image_overlay).convert("RGBA")
 
-        x1, y1 = top_left
-        x2, y2 = bottom_right
+        x1, y1 = ImageProcessor._scale_point(top_left, layout_scale)
+        x2, y2 = ImageProcessor._scale_point(bottom_right, layout_scale)
+        padding = int(round(padding * layout_scale))
         if not (x2 > x1 and y2 > y1):
             raise ValueError("Invalid paste area.")
 
@@ -100,8 +269,6 @@ class ImageProcessor:
         new_w = max(1, int(round(cw * scale)))
         new_h = max(1, int(round(ch * scale)))
 
-        resized = content_image.resize((new_w, new_h), Image.Resampling.LANCZOS)
-
         # Calculate position
         if align == "left":
             paste_x = x1 + padding
@@ -117,25 +284,42 @@ class ImageProcessor:
         else: # middle
             paste_y = y1 + padding + (region_h - new_h) // 2
 
+        # Draw character name first, at base resolution, so it matches draw_text
+        ImageProcessor._draw_character_name(img, role_name, text_configs_dict, font_path, layout_scale, name_plate, name_shadow, quality.shadows)
+        stages.mark("name plate")
+
+        # Compose at output resolution: the content is resampled once, straight
+        # to its final on-screen size, instead of to canvas size and then again
+        # by compress_image.
+        full_w, full_h = img.size
+        if compress:
+            img = ImageProcessor.compress_image(img, resample=quality.resampling, reducing_gap=quality.reducing_gap)
+        stages.mark("compress")
+        sx, sy = img.width / full_w, img.height / full_h
+        out_w = max(1, int(round(new_w * sx)))
+        out_h = max(1, int(round(new_h * sy)))
+        gap = min(CONTENT_REDUCING_GAP, quality.reducing_gap or CONTENT_REDUCING_GAP)
+        # Pasting the same image into the same box again reuses the resize
+        resized = content_cache.resized(content_image, (out_w, out_h), quality.resampling, gap, ImageProcessor._fit_content)
+        paste_pos = (int(round(paste_x * sx)), int(round(paste_y * sy)))
+        stages.mark("fit content")
+
         # Paste content
         if resized.mode == 'RGBA':
-            img.paste(resized, (paste_x, paste_y), resized)
+            img.paste(resized, paste_pos, resized)
         else:
-            img.paste(resized, (paste_x, paste_y))
+            img.paste(resized, paste_pos)
 
         # Paste overlay
         if img_overlay:
+            img_overlay = img_overlay.resize(img.size, quality.resampling, reducing_gap=quality.reducing_gap)
             img.paste(img_overlay, (0, 0), img_overlay)
+        stages.mark("paste")
 
-        # Draw character name if configured
-        if text_configs_dict and role_name in text_configs_dict:
-            ImageProcessor._draw_character_name(img, role_name, text_configs_dict, font_path)
-
-        img = ImageProcessor.compress_image(img)
-        
-        buf = io.BytesIO()
-        img.save(buf, "png")
-        return buf.getvalue()
+        png = ImageProcessor._encode_png(img, quality.png_compress_level)
+        stages.mark("encode")
+        stages.end()
+        return png
 
     @staticmethod
     def draw_text(
@@ -153,128 +337,56 @@ class ImageProcessor:
         image_overlay: Union[str, Image.Image, None] = None,
         role_name: str = "unknown",
         text_configs_dict: Optional[Dict] = None,
+        layout_scale: float = 1.0,
+        compress: bool = True,
+        name_plate: Optional[NamePlate] = None,
+        shadow: int = 4,
+        name_shadow: int = 2,
+        quality: Optional[QualityPreset] = None,
+        min_font_height: Optional[int] = None,
     ) -> bytes:
         """
         Draw text into a specified rectangle, auto-sizing font.
+
+        Coordinates, max_font_height and min_font_height are given in layout
+        (full-resolution) space; layout_scale is the size of image_source
+        relative to it. Text that does not fit at min_font_height overflows
+        the region; split it with paginate_text first.
+        name_plate is a pre-rendered plate from render_name_plate. quality
+        selects resampling, encoder effort, shadows and emoji (default: best).
         """
-        if isinstance(image_source, Image.Image):
-            img = image_source.copy()
-        else:
-            img = Image.open(image_source).convert("RGBA")
+        quality = quality or DEFAULT_QUALITY
+        stages = render_profiler.begin("draw_text")
+        img = ImageProcessor._canvas(image_source)
+        stages.mark("base")
 
         # Load overlay
         img_overlay = None
         if image_overlay is not None:
             if isinstance(image_overlay, Image.Image):
-                img_overlay = image_overlay.copy()
+                img_overlay = image_overlay  # Only read from
             elif isinstance(image_overlay, str) and os.path.isfile(image_overlay):
                 img_overlay = Image.open(image_overlay).convert("RGBA")
 
-        x1, y1 = top_left
-        x2, y2 = bottom_right
+        x1, y1 = ImageProcessor._scale_point(top_left, layout_scale)
+        x2, y2 = ImageProcessor._scale_point(bottom_right, layout_scale)
+        if max_font_height:
+            max_font_height = max(1, int(round(max_font_height * layout_scale)))
+        if min_font_height:
+            min_font_height = max(1, int(round(min_font_height * layout_scale)))
         region_w = x2 - x1
         region_h = y2 - y1
 
         if region_w <= 0 or region_h <= 0:
              raise ValueError("Invalid text area.")
 
-        # Helper to load font
-        def _load_font(size: int) -> ImageFont.FreeTypeFont:
-            if font_path and os.path.exists(font_path):
-                return ImageFont.truetype(font_path, size=size)
-            try:
-                # Try to find a default font or use a fallback
-                return ImageFont.truetype("arial.ttf", size=size)
-            except Exception:
-                return ImageFont.load_default() # type: ignore
-
-        # Helper to measure text
-        def _get_text_size(text_segment: str, font) -> Tuple[int, int]:
-            if PILMOJI_AVAILABLE:
-                with Pilmoji(img) as pilmoji:
-                    return pilmoji.getsize(text_segment, font=font)
-            else:
-                draw = ImageDraw.Draw(img)
-                return (int(draw.textlength(text_segment, font=font)), int(font.size)) # Approximate height
-
-        # Wrap lines logic
-        def _wrap_lines(txt: str, font, max_w: int) -> List[str]:
-            lines = []
-            for para in txt.splitlines() or [""]:
-                has_space = " " in para
-                units = para.split(" ") if has_space else list(para)
-                buf = ""
-                
-                def unit_join(a, b):
-                    return (a + " " + b) if has_space and a else (a + b)
-
-                for u in units:
-                    trial = unit_join(buf, u)
-                    w, _ = _get_text_size(trial, font)
-                    if w <= max_w:
-                        buf = trial
-                    else:
-                        if buf:
-                            lines.append(buf)
-                        
-                        # If single unit is too long, split it char by char
-                        if has_space and len(u) > 1:
-                            tmp = ""
-                            for ch in u:
-                                tmp_w, _ = _get_text_size(tmp + ch, font)
-                                if tmp_w <= max_w:
-                                    tmp += ch
-                                else:
-                                    if tmp: lines.append(tmp)
-                                    tmp = ch
-                            buf = tmp
-                        else:
-                            # Single char too wide? Just put it (or split if we supported that)
-                            w_u, _ = _get_text_size(u, font)
-                            if w_u <= max_w:
-                                buf = u
-                            else:
-                                lines.append(u)
-                                buf = ""
-                if buf:
-                    lines.append(buf)
-                if para == "" and (not lines or lines[-1] != ""):
-                    lines.append("")
-            return lines
-
-        def _measure_block(lines: List[str], font):
-            ascent, descent = font.getmetrics()
-            line_h = int((ascent + descent) * (1 + line_spacing))
-            max_w = 0
-            for ln in lines:
-                w, _ = _get_text_size(ln, font)
-                max_w = max(max_w, w)
-            total_h = max(line_h * len(lines), 1)
-            return max_w, total_h, line_h
-
-        # Binary search for font size
-        hi = min(region_h, max_font_height) if max_font_height else region_h
-        lo = 1
-        best_size = 1
-        best_lines = []
-        best_line_h = 1
-        best_block_h = 1
-
-        while lo <= hi:
-            mid = (lo + hi) // 2
-            font_main = _load_font(mid)
-            lines = _wrap_lines(text, font_main, region_w)
-            w, h, lh = _measure_block(lines, font_main)
-            if w <= region_w and h <= region_h:
-                best_size = mid
-                best_lines = lines
-                best_line_h = lh
-                best_block_h = h
-                lo = mid + 1
-            else:
-                hi = mid - 1
-        
-        font_main = _load_font(best_size)
+        # Fit the text to the region; the result is cached across base images
+        text_layout = ImageProcessor.fit_text(text, (region_w, region_h), font_path, line_spacing, max_font_height, min_font_height)
+        best_size = text_layout.font_size
+        best_line_h = text_layout.line_height
+        best_block_h = text_layout.block_height
+        font_main = ImageProcessor.load_font(font_path, best_size)
+        stages.mark("layout")
 
         # Calculate Y start
         if valign == "top":
@@ -284,104 +396,484 @@ class ImageProcessor:
         else:
             y_start = y1 + (region_h - best_block_h) // 2
 
-        # Draw text
+        # Draw text once into a transparent layer around the text region; the
+        # shadow is derived from the layer's coverage instead of a second pass.
+        shadow_offset = ImageProcessor._shadow_offset(shadow, layout_scale)
+        margin = best_size // 2 + max(shadow_offset)
+        lx, ly = max(0, x1 - margin), max(0, y1 - margin)
+        layer_w = min(img.width, x2 + margin) - lx
+        layer_h = min(img.height, y2 + margin) - ly
+        layer = Image.new("RGBA", (layer_w, layer_h), (0, 0, 0, 0))
+
         y = y_start
-        in_bracket = False
         
         # Prepare drawer
-        if PILMOJI_AVAILABLE:
-            pilmoji = Pilmoji(img)
+        use_pilmoji = PILMOJI_AVAILABLE and quality.emoji
+        if use_pilmoji:
+            drawer = Pilmoji(layer)
         else:
-            draw = ImageDraw.Draw(img)
+            drawer = ImageDraw.Draw(layer)
 
-        for ln in best_lines:
-            w, _ = _get_text_size(ln, font_main)
-            
+        # Runs are pre-measured by fit_text, so this is a pure blit
+        for line_runs, w in zip(text_layout.runs, text_layout.widths):
             if align == "left":
                 x = x1
             elif align == "right":
                 x = x2 - w
             else:
                 x = x1 + (region_w - w) // 2
-            
-            segments, in_bracket = ImageProcessor._parse_color_segments(ln, in_bracket, color, bracket_color)
-            
-            for seg_text, seg_color in segments:
-                if not seg_text: continue
-                
-                if PILMOJI_AVAILABLE:
-                    # Shadow
-                    pilmoji.text((x+4, y+4), seg_text, font=font_main, fill=(0,0,0))
-                    # Main text
-                    pilmoji.text((x, y), seg_text, font=font_main, fill=seg_color)
-                    seg_w, _ = pilmoji.getsize(seg_text, font=font_main)
-                    x += seg_w
-                else:
-                    draw.text((x+4, y+4), seg_text, font=font_main, fill=(0,0,0))
-                    draw.text((x, y), seg_text, font=font_main, fill=seg_color)
-                    x += int(draw.textlength(seg_text, font=font_main))
+
+            for dx, seg_text, highlighted in line_runs:
+                fill = bracket_color if highlighted else color
+                pos = (x + dx - lx, y - ly)
+                # Plain runs come from the glyph atlas; emoji and shaped text go through the drawer
+                if ImageProcessor._is_plain_text(seg_text) and glyph_atlas.draw(layer, pos, seg_text, font_main, fill):
+                    continue
+                drawer.text(pos, seg_text, font=font_main, fill=fill)
             
             y += best_line_h
 
+        if use_pilmoji:
+            drawer.close()
+
+        if quality.shadows:
+            ImageProcessor._composite_with_shadow(img, layer, (lx, ly), shadow_offset)
+        else:
+            img.alpha_composite(layer, (lx, ly))
+        stages.mark("text")
+
         # Paste overlay
         if img_overlay:
             img.paste(img_overlay, (0, 0), img_overlay)
 
         # Draw character name
-        if text_configs_dict and role_name in text_configs_dict:
-            ImageProcessor._draw_character_name(img, role_name, text_configs_dict, font_path)
+        ImageProcessor._draw_character_name(img, role_name, text_configs_dict, font_path, layout_scale, name_plate, name_shadow, quality.shadows)
+        stages.mark("name plate")
 
-        img = ImageProcessor.compress_image(img)
-        
-        buf = io.BytesIO()
-        img.save(buf, "png")
-        return buf.getvalue()
+        if compress:
+            img = ImageProcessor.compress_image(img, resample=quality.resampling, reducing_gap=quality.reducing_gap)
+        stages.mark("compress")
+
+        png = ImageProcessor._encode_png(img, quality.png_compress_level)
+        stages.mark("encode")
+        stages.end()
+        return png
 
     @staticmethod
-    def _parse_color_segments(text: str, in_bracket: bool, default_color: Tuple[int, int, int], bracket_color: Tuple[int, int, int]) -> Tuple[List[Tuple[str, Tuple[int, int, int]]], bool]:
+    def _bracket_segments(text: str, in_bracket: bool) -> Tuple[List[Tuple[str, bool]], bool]:
+        """
+        Split a line into (text, highlighted) segments. Brackets and the text
+        inside them are highlighted; in_bracket carries the state across lines.
+        """
         segs = []
-        buf = ""
-        for ch in text:
-            if ch in ("[", "【"):
-                if buf:
-                    segs.append((buf, bracket_color if in_bracket else default_color))
-                    buf = ""
-                segs.append((ch, bracket_color))
+        parts = _BRACKET_SPLIT.split(text)
+        for k, part in enumerate(parts):
+            if not part:
+                continue
+            if part in _OPEN_BRACKETS:
+                segs.append((part, True))
                 in_bracket = True
-            elif ch in ("]", "】"):
-                if buf:
-                    segs.append((buf, bracket_color))
-                    buf = ""
-                segs.append((ch, bracket_color))
+            elif part in _CLOSE_BRACKETS:
+                segs.append((part, True))
                 in_bracket = False
             else:
-                buf += ch
-        if buf:
-            segs.append((buf, bracket_color if in_bracket else default_color))
+                # Text right before a closing bracket counts as inside it
+                closes = k + 1 < len(parts) and parts[k + 1] in _CLOSE_BRACKETS
+                segs.append((part, in_bracket or closes))
         return segs, in_bracket
 
     @staticmethod
-    def _draw_character_name(img: Image.Image, role_name: str, text_configs_dict: Dict, font_path: Optional[str]):
-        draw = ImageDraw.Draw(img)
-        shadow_offset = (2, 2)
-        shadow_color = (0, 0, 0)
-        
-        for config in text_configs_dict[role_name]:
-            char_text = config["text"]
-            position = config["position"]
-            font_color = config["font_color"]
-            font_size = config["font_size"]
-            
-            # Use provided font path or fallback
+    def _scale_point(point: Tuple[int, int], scale: float) -> Tuple[int, int]:
+        if scale == 1.0:
+            return int(point[0]), int(point[1])
+        return int(round(point[0] * scale)), int(round(point[1] * scale))
+
+    @staticmethod
+    def _shadow_offset(offset: int, scale: float) -> Tuple[int, int]:
+        scaled = max(1, int(round(offset * scale)))
+        return scaled, scaled
+
+    @staticmethod
+    def _composite_with_shadow(img: Image.Image, layer: Image.Image, origin: Tuple[int, int], shadow_offset: Tuple[int, int], shadow_color: Tuple[int, int, int] = (0, 0, 0)):
+        """
+        Composite a text layer onto img with a drop shadow.
+
+        The shadow is the layer's alpha coverage shifted by shadow_offset and
+        filled with shadow_color, so glyphs are only rasterized once.
+        """
+        shadow = ImageProcessor._shadow_layer(layer, shadow_offset, shadow_color)
+        img.alpha_composite(shadow, origin)
+        img.alpha_composite(layer, origin)
+
+    @staticmethod
+    def _shadow_layer(layer: Image.Image, shadow_offset: Tuple[int, int], shadow_color: Tuple[int, int, int]) -> Image.Image:
+        shadow_mask = Image.new("L", layer.size, 0)
+        shadow_mask.paste(layer.getchannel("A"), shadow_offset)
+        shadow = Image.new("RGBA", layer.size, shadow_color + (0,))
+        shadow.putalpha(shadow_mask)
+        return shadow
+
+    @staticmethod
+    def fit_text(text: str, region_size: Tuple[int, int], font_path: Optional[str], line_spacing: float = 0.15, max_font_height: Optional[int] = None,
+                 min_font_height: Optional[int] = None) -> "TextLayout":
+        """
+        Find the largest font size at which text fits region_size, and wrap it.
+
+        The search never goes below min_font_height; text that does not fit
+        even then is laid out at that size and overflows.
+
+        The result only depends on the arguments (not on the base image or the
+        character), so it is cached: re-sending the same text on another base
+        image skips fitting entirely.
+        """
+        return _fit_text(text, tuple(region_size), font_path, line_spacing, max_font_height, min_font_height)
+
+    @staticmethod
+    def paginate_text(
+        text: str,
+        top_left: Tuple[int, int],
+        bottom_right: Tuple[int, int],
+        min_font_height: int,
+        font_path: Optional[str] = None,
+        line_spacing: float = 0.15,
+        layout_scale: float = 1.0,
+        max_pages: int = MAX_TEXT_PAGES,
+    ) -> List[str]:
+        """
+        Split text into pages that each fit the region at min_font_height or
+        larger, breaking between sentences and lines where possible.
+
+        Arguments are in draw_text's layout space. Text is never changed
+        within a page, and whitespace is only stripped where a page ends or
+        begins inside the text (text that fits comes back as it is); at most
+        max_pages are returned, the last one ending in
+        an ellipsis if text had to be dropped. Only as much text as max_pages
+        can hold is ever wrapped, so long input costs no more than that.
+        """
+        x1, y1 = ImageProcessor._scale_point(top_left, layout_scale)
+        x2, y2 = ImageProcessor._scale_point(bottom_right, layout_scale)
+        if not (x2 > x1 and y2 > y1):
+            raise ValueError("Invalid text area.")
+        size = max(1, int(round(min_font_height * layout_scale)))
+        return list(_paginate_text(text, (x2 - x1, y2 - y1), font_path, line_spacing, size, max_pages))
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _is_plain_text(text_segment: str) -> bool:
+        """True if pilmoji would draw text_segment as plain text (no emoji)."""
+        if not PILMOJI_AVAILABLE:
+            return True
+        return all(node.type is NodeType.text for line in to_nodes(text_segment) for node in line)
+
+    @staticmethod
+    def _text_size(text_segment: str, font) -> Tuple[int, int]:
+        if PILMOJI_AVAILABLE:
+            return pilmoji_getsize(text_segment, font=font)
+        draw = getattr(_draw_context, "measure", None)
+        if draw is None:
+            draw = _draw_context.measure = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+        return (int(draw.textlength(text_segment, font=font)), int(font.size)) # Approximate height
+
+    @staticmethod
+    def _wrap_lines(txt: str, font, max_w: int, widths: Optional[Dict[str, int]] = None) -> List[str]:
+        """
+        Greedily wrap txt to max_w: words when a paragraph has spaces, else
+        characters; a word wider than a line is broken between characters.
+
+        Widths grow with every unit added to a line, so the break is found by
+        galloping over the number of units instead of measuring every prefix.
+        widths, if given, memoizes measurements (of this font) across calls.
+        """
+        lines = []
+        for para in txt.splitlines() or [""]:
+            has_space = " " in para
+            units = para.split(" ") if has_space else list(para)
+            joiner = " " if has_space else ""
+            if ImageProcessor._is_plain_text(para):
+                # What pilmoji would measure, without re-parsing every prefix
+                def measure(segment):
+                    return int(font.getlength(segment))
+            else:
+                def measure(segment):
+                    return ImageProcessor._text_size(segment, font)[0]
+            if widths is not None:
+                def measure(segment, measure=measure):
+                    w = widths.get(segment)
+                    if w is None:
+                        w = widths[segment] = measure(segment)
+                    return w
+
+            head = ""  # Start of the line carried over from a broken word
+            i, n = 0, len(units)
+            while i < n:
+                def line(k):
+                    # Empty units (repeated spaces) are dropped at the start of a line
+                    return joiner.join(itertools.dropwhile(lambda u: not u, [head] + units[i:i + k]))
+
+                # Largest k with line(k) fitting: gallop, then bisect
+                lo, step, rest = 0, 1, n - i
+                hi = rest + 1
+                while lo < rest:
+                    k = min(lo + step, rest)
+                    if measure(line(k)) > max_w:
+                        hi = k
+                        break
+                    lo, step = k, step * 2
+                while hi - lo > 1:
+                    mid = (lo + hi) // 2
+                    if measure(line(mid)) <= max_w:
+                        lo = mid
+                    else:
+                        hi = mid
+                buf = line(lo)
+                i += lo
+                if i == n:
+                    head = buf
+                    break
+
+                if buf:
+                    lines.append(buf)
+                u = units[i]
+                i += 1
+                if has_space and len(u) > 1:
+                    # Too long for the rest of the line: split it char by char
+                    tmp = ""
+                    for ch in u:
+                        if measure(tmp + ch) <= max_w:
+                            tmp += ch
+                        else:
+                            if tmp: lines.append(tmp)
+                            tmp = ch
+                    head = tmp
+                elif measure(u) <= max_w:
+                    head = u
+                else:
+                    # Single char too wide? Just put it on its own line
+                    lines.append(u)
+                    head = ""
+            if head:
+                lines.append(head)
+            if para == "" and (not lines or lines[-1] != ""):
+                lines.append("")
+        return lines
+
+    @staticmethod
+    def load_font(font_path: Optional[str], size: int) -> ImageFont.FreeTypeFont:
+        """
+        Load a font, falling back to arial and then Pillow's default font.
+
+        Fonts are cached in the calling thread's draw context, so each render
+        thread owns its FreeType faces.
+        """
+        fonts = getattr(_draw_context, "fonts", None)
+        if fonts is None:
+            fonts = _draw_context.fonts = {}
+        key = (font_path, size)
+        font = fonts.get(key)
+        if font is None:
             try:
                 if font_path and os.path.exists(font_path):
-                    char_font = ImageFont.truetype(font_path, font_size)
+                    font = ImageFont.truetype(font_path, size=size)
                 else:
-                    char_font = ImageFont.truetype("arial.ttf", font_size)
+                    # Try to find a default font or use a fallback
+                    font = ImageFont.truetype("arial.ttf", size=size)
             except Exception:
-                char_font = ImageFont.load_default()
+                font = ImageFont.load_default() # type: ignore
+            fonts[key] = font
+        return font
 
-            shadow_position = (position[0] + shadow_offset[0], position[1] + shadow_offset[1])
-            
-            draw.text(shadow_position, char_text, fill=shadow_color, font=char_font)
-            draw.text(position, char_text, fill=font_color, font=char_font)
+    @staticmethod
+    def render_name_plate(role_name: str, text_configs_dict: Optional[Dict], font_path: Optional[str], layout_scale: float = 1.0, shadow: int = 2) -> Optional[NamePlate]:
+        """
+        Render a character's name plate once, as a glyph layer and its shadow.
+
+        The result does not depend on the base image, so it can be cached and
+        composited onto any number of renders.
+        """
+        if not text_configs_dict or role_name not in text_configs_dict:
+            return None
+
+        shadow_offset = ImageProcessor._shadow_offset(shadow, layout_scale)
+        shadow_color = (0, 0, 0)
+
+        glyphs = []
+        left, top, right, bottom = None, None, None, None
+        for config in text_configs_dict[role_name]:
+            char_text = config["text"]
+            if not char_text:
+                continue
+            position = ImageProcessor._scale_point(config["position"], layout_scale)
+            font_color = config["font_color"]
+            font_size = max(1, int(round(config["font_size"] * layout_scale)))
+            char_font = ImageProcessor.load_font(font_path, font_size)
+
+            bx1, by1, bx2, by2 = char_font.getbbox(char_text)
+            bx1, by1 = position[0] + bx1, position[1] + by1
+            bx2, by2 = position[0] + bx2, position[1] + by2
+            if left is None:
+                left, top, right, bottom = bx1, by1, bx2, by2
+            else:
+                left, top = min(left, bx1), min(top, by1)
+                right, bottom = max(right, bx2), max(bottom, by2)
+            glyphs.append((char_text, position, font_color, char_font))
+
+        if not glyphs:
+            return None
+
+        # One layer spanning the whole name plate, drawn once and shadowed by mask
+        lx, ly = max(0, int(left)), max(0, int(top))
+        rx = int(right) + shadow_offset[0] + 1
+        ry = int(bottom) + shadow_offset[1] + 1
+        if rx <= lx or ry <= ly:
+            return None
+        layer = Image.new("RGBA", (rx - lx, ry - ly), (0, 0, 0, 0))
+        draw = ImageDraw.Draw(layer)
+        for char_text, position, font_color, char_font in glyphs:
+            pos = (position[0] - lx, position[1] - ly)
+            if not glyph_atlas.draw(layer, pos, char_text, char_font, font_color):
+                draw.text(pos, char_text, fill=font_color, font=char_font)
+
+        shadow = ImageProcessor._shadow_layer(layer, shadow_offset, shadow_color)
+        return (lx, ly), shadow, layer
+
+    @staticmethod
+    def _draw_character_name(img: Image.Image, role_name: str, text_configs_dict: Optional[Dict], font_path: Optional[str], layout_scale: float = 1.0, name_plate: Optional[NamePlate] = None, name_shadow: int = 2, shadows: bool = True):
+        if name_plate is None:
+            name_plate = ImageProcessor.render_name_plate(role_name, text_configs_dict, font_path, layout_scale, name_shadow)
+        if name_plate is None:
+            return
+        origin, shadow, layer = name_plate
+        if origin[0] >= img.width or origin[1] >= img.height:
+            return
+        if shadows:
+            img.alpha_composite(shadow, origin)
+        img.alpha_composite(layer, origin)
+
+
+@lru_cache(maxsize=TEXT_LAYOUT_CACHE_SIZE)
+def _fit_text(text: str, region_size: Tuple[int, int], font_path: Optional[str], line_spacing: float, max_font_height: Optional[int],
+              min_font_height: Optional[int] = None) -> TextLayout:
+    region_w, region_h = region_size
+
+    def _measure_block(lines: List[str], font):
+        ascent, descent = font.getmetrics()
+        line_h = int((ascent + descent) * (1 + line_spacing))
+        widths = [ImageProcessor._text_size(ln, font)[0] for ln in lines]
+        total_h = max(line_h * len(lines), 1)
+        return max(widths, default=0), total_h, line_h, widths
+
+    # Binary search for font size
+    hi = min(region_h, max_font_height) if max_font_height else region_h
+    lo = floor = max(1, min(min_font_height or 1, hi))
+    best = None
+
+    while lo <= hi:
+        mid = (lo + hi) // 2
+        font_main = ImageProcessor.load_font(font_path, mid)
+        lines = ImageProcessor._wrap_lines(text, font_main, region_w)
+        w, h, lh, widths = _measure_block(lines, font_main)
+        if w <= region_w and h <= region_h:
+            best = TextLayout(mid, tuple(lines), tuple(widths), lh, h)
+            lo = mid + 1
+        else:
+            hi = mid - 1
+
+    if best is None:
+        if min_font_height:
+            # Nothing fits: lay out at the minimum size and let it overflow
+            font_main = ImageProcessor.load_font(font_path, floor)
+            lines = ImageProcessor._wrap_lines(text, font_main, region_w)
+            _, h, lh, widths = _measure_block(lines, font_main)
+            best = TextLayout(floor, tuple(lines), tuple(widths), lh, h)
+        else:
+            best = TextLayout(1, (), (), 1, 1)
+
+    # Split the chosen lines into styled runs, carrying bracket state across lines
+    font_main = ImageProcessor.load_font(font_path, best.font_size)
+    runs = []
+    in_bracket = False
+    for ln in best.lines:
+        segments, in_bracket = ImageProcessor._bracket_segments(ln, in_bracket)
+        line_runs = []
+        dx = 0
+        for seg_text, highlighted in segments:
+            line_runs.append((dx, seg_text, highlighted))
+            dx += ImageProcessor._text_size(seg_text, font_main)[0]
+        runs.append(tuple(line_runs))
+    return best._replace(runs=tuple(runs))
+
+
+@lru_cache(maxsize=TEXT_LAYOUT_CACHE_SIZE)
+def _paginate_text(text: str, region_size: Tuple[int, int], font_path: Optional[str], line_spacing: float, font_size: int, max_pages: int) -> Tuple[str, ...]:
+    if not text.strip():
+        # Nothing but whitespace: leave it to the caller as it was
+        return (text,)
+    region_w, region_h = region_size
+    font = ImageProcessor.load_font(font_path, font_size)
+    ascent, descent = font.getmetrics()
+    line_h = int((ascent + descent) * (1 + line_spacing))
+    capacity = max(1, region_h // line_h)
+
+    # Pages grow a sentence at a time and are re-wrapped each time; all but
+    # the last lines measure the same strings again, so remember the widths
+    widths: Dict[str, int] = {}
+
+    def fits(page: str) -> bool:
+        lines = ImageProcessor._wrap_lines(page, font, region_w, widths)
+        return len(lines) <= capacity and all(
+            (widths[ln] if ln in widths else ImageProcessor._text_size(ln, font)[0]) <= region_w for ln in lines)
+
+    # No glyph is narrower than about a quarter em, so this is more than
+    # max_pages can ever hold; the rest is never wrapped
+    budget = max_pages * capacity * (region_w * 4 // font_size + 1)
+    truncated = len(text) > budget
+    text = text[:budget]
+
+    # Candidate pieces: sentences and lines, each with its terminator
+    pieces, start = [], 0
+    for m in _SENTENCE_END.finditer(text):
+        pieces.append(text[start:m.end()])
+        start = m.end()
+    if start < len(text):
+        pieces.append(text[start:])
+
+    pages: List[str] = []
+    current = ""
+    for piece in pieces:
+        if len(pages) >= max_pages:
+            truncated = True
+            break
+        if fits(current + piece):
+            current += piece
+            continue
+        if current.strip():
+            pages.append(current)
+        current = ""
+        if fits(piece):
+            current = piece
+            continue
+        # A sentence longer than a page: break it between wrapped lines
+        joiner = " " if " " in piece.strip() else ""
+        lines = ImageProcessor._wrap_lines(piece.strip(), font, region_w, widths)
+        for i in range(0, len(lines), capacity):
+            chunk = joiner.join(lines[i:i + capacity])
+            if i + capacity < len(lines):
+                pages.append(chunk)
+            else:
+                current = chunk + (joiner or "")
+    if current.strip():
+        pages.append(current)
+
+    if len(pages) > max_pages:
+        pages, truncated = pages[:max_pages], True
+    # Strip only where the text was split, so text that fits comes back unchanged
+    for i in range(len(pages)):
+        if i:
+            pages[i] = pages[i].lstrip()
+        if i < len(pages) - 1 or truncated:
+            pages[i] = pages[i].rstrip()
+    if truncated:
+        logger.warning(f"Text too long for {max_pages} pages; the rest was dropped.")
+        if fits(pages[-1] + "…"):
+            pages[-1] += "…"
+    return tuple(pages)
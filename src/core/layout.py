@@ -0,0 +1,126 @@
+import os
+import hashlib
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from src.config import CHARACTERS, TEXT_CONFIGS, LAYOUT_DEFAULTS, BACKGROUND_LAYOUTS
+from src.utils.resource_utils import get_resource_path
+
+Point = Tuple[int, int]
+Color = Tuple[int, int, int]
+
+
+class NameGlyph(NamedTuple):
+    text: str
+    position: Point
+    color: Color
+    size: int
+
+
+class LayoutTemplate(NamedTuple):
+    """
+    Everything needed to lay out one character on one background: geometry,
+    colors and fonts, compiled once from config.py.
+
+    Geometry is kept in full-resolution layout coordinates; scale is the size
+    of the target image relative to them (see scaled()). plate_key is a hash
+    of the fields the name plate depends on, its cache key.
+    """
+    character: str
+    background: Optional[str]
+    text_box: Tuple[Point, Point]
+    sprite_offset: Point
+    text_color: Color
+    bracket_color: Color
+    max_font_height: int
+    text_shadow: int
+    name_shadow: int
+    image_padding: int
+    name_plate: Tuple[NameGlyph, ...]
+    font: Optional[str]
+    scale: float = 1.0
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def compile(character: str, background: Optional[str] = None) -> "LayoutTemplate":
+        spec = dict(LAYOUT_DEFAULTS)
+        char_config = CHARACTERS.get(character, {})
+        spec.update({k: v for k, v in char_config.items() if k in LAYOUT_DEFAULTS})
+        if background:
+            spec.update(BACKGROUND_LAYOUTS.get(background, {}))
+
+        (x1, y1), (x2, y2) = spec["text_box"]
+        name_plate = tuple(
+            NameGlyph(cfg["text"], tuple(cfg["position"]), tuple(cfg["font_color"]), cfg["font_size"])
+            for cfg in TEXT_CONFIGS.get(character, [])
+            if cfg["text"]
+        )
+        return LayoutTemplate(
+            character=character,
+            background=background,
+            text_box=((x1, y1), (x2, y2)),
+            sprite_offset=tuple(spec["sprite_offset"]),
+            text_color=tuple(spec["text_color"]),
+            bracket_color=tuple(spec["bracket_color"]),
+            max_font_height=spec["max_font_height"],
+            text_shadow=spec["text_shadow"],
+            name_shadow=spec["name_shadow"],
+            image_padding=spec["image_padding"],
+            name_plate=name_plate,
+            font=char_config.get("font"),
+        )
+
+    def scaled(self, factor: float) -> "LayoutTemplate":
+        """The same layout for an image factor times the current size."""
+        return self._replace(scale=self.scale * factor)
+
+    @property
+    def plate_key(self) -> str:
+        """Same for every template that renders the same name plate, whatever the background."""
+        return _key((self.character, self.name_plate, self.font, self.scale, self.name_shadow))
+
+    @property
+    def font_path(self) -> Optional[str]:
+        if not self.font:
+            return None
+        return get_resource_path(os.path.join("resources", "fonts", self.font))
+
+    def text_configs(self) -> Dict[str, List[Dict]]:
+        """The name plate in TEXT_CONFIGS form, for ImageProcessor."""
+        return {self.character: [
+            {"text": g.text, "position": g.position, "font_color": g.color, "font_size": g.size}
+            for g in self.name_plate
+        ]}
+
+    def _common_options(self) -> Dict:
+        return {
+            "top_left": self.text_box[0],
+            "bottom_right": self.text_box[1],
+            "role_name": self.character,
+            "text_configs_dict": self.text_configs(),
+            "font_path": self.font_path,
+            "layout_scale": self.scale,
+            "name_shadow": self.name_shadow,
+        }
+
+    def text_options(self) -> Dict:
+        """Keyword arguments for ImageProcessor.draw_text."""
+        options = self._common_options()
+        options.update(
+            color=self.text_color,
+            bracket_color=self.bracket_color,
+            max_font_height=self.max_font_height,
+            shadow=self.text_shadow,
+        )
+        return options
+
+    def image_options(self) -> Dict:
+        """Keyword arguments for ImageProcessor.paste_image."""
+        options = self._common_options()
+        options.update(padding=self.image_padding)
+        return options
+
+
+@lru_cache(maxsize=1024)
+def _key(fields: tuple) -> str:
+    return hashlib.sha1(repr(fields).encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,47 @@
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Union
+
+from src.config import QUALITY_PRESETS
+
+
+class QualityPreset(NamedTuple):
+    """
+    Speed/quality trade-offs of one render, compiled from QUALITY_PRESETS.
+
+    resample is the Pillow filter for every resize of the render, with
+    reducing_gap (None for a single pass) letting Pillow reduce() large
+    downscales by an integer factor first. png_compress_level is the zlib
+    effort of the encoded result. Without shadows, text and name plates are
+    composited without their drop shadow; without emoji, pilmoji is skipped
+    and emoji are drawn from the font like any other character.
+    """
+    name: str
+    resample: str = "lanczos"
+    reducing_gap: Optional[float] = None
+    png_compress_level: int = 6
+    shadows: bool = True
+    emoji: bool = True
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def get(name: str) -> "QualityPreset":
+        if name not in QUALITY_PRESETS:
+            raise ValueError(f"Unknown quality preset: {name} (choose from {', '.join(QUALITY_PRESETS)})")
+        return QualityPreset(name, **QUALITY_PRESETS[name])
+
+    @staticmethod
+    def resolve(preset: Union[str, "QualityPreset", None]) -> Optional["QualityPreset"]:
+        """A preset from its name; presets and None pass through."""
+        if isinstance(preset, str):
+            return QualityPreset.get(preset)
+        return preset
+
+    @staticmethod
+    def names() -> List[str]:
+        return list(QUALITY_PRESETS)
+
+    @property
+    def resampling(self):
+        """The Pillow Resampling filter."""
+        from PIL import Image
+        return Image.Resampling[self.resample.upper()]
@@ -0,0 +1,166 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Union
+
+from PIL import Image
+
+from src.core import base_image_format
+from src.core.image_processor import ImageProcessor, NamePlate
+from src.core.layout import LayoutTemplate
+from src.core.quality import QualityPreset
+
+logger = logging.getLogger(__name__)
+
+# How many decoded base images to keep in memory
+MAX_BASE_IMAGES = 32
+# Render options the name plate depends on
+NAME_PLATE_OPTIONS = ("role_name", "text_configs_dict", "font_path", "layout_scale", "name_shadow")
+
+
+class RenderJob(NamedTuple):
+    """
+    One image to render: text or a content image on a base image.
+
+    The layout template supplies geometry, colors and fonts; options are
+    passed through to ImageProcessor.draw_text / paste_image on top of it
+    (or instead of it, when there is no template).
+    """
+    base_image: Union[str, Image.Image]
+    text: Optional[str] = None
+    image: Optional[Image.Image] = None
+    options: Optional[Dict[str, Any]] = None
+    layout: Optional[LayoutTemplate] = None
+
+
+class RenderEngine:
+    """
+    Thread-safe front end for ImageProcessor.
+
+    Decoded base images and rendered name plates are shared between threads;
+    they are never modified after being cached (ImageProcessor copies the base
+    image into a per-thread canvas before drawing on it). Fonts live in a per-thread draw context (see
+    ImageProcessor.load_font). render_many() fans jobs out over a thread pool:
+    Pillow releases the GIL while resizing, compositing and encoding PNGs, so
+    a burst of renders uses several cores without pickling anything.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_base_images: int = MAX_BASE_IMAGES):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.max_base_images = max_base_images
+        self._lock = threading.Lock()
+        self._base_images: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+        self._name_plates: Dict[Any, Optional[NamePlate]] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def base_image(self, path: str) -> Image.Image:
+        """Decoded RGBA base image, shared and read-only."""
+        st = os.stat(path)
+        key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        with self._lock:
+            img = self._base_images.get(key)
+            if img is not None:
+                self._base_images.move_to_end(key)
+                return img
+
+        # Decode outside the lock so other threads keep rendering
+        img = base_image_format.load(path)
+
+        with self._lock:
+            self._base_images[key] = img
+            while len(self._base_images) > self.max_base_images:
+                self._base_images.popitem(last=False)
+        return img
+
+    def name_plate(self, role_name: str, text_configs_dict: Optional[Dict], font_path: Optional[str], layout_scale: float = 1.0, shadow: int = 2, key: Optional[str] = None) -> Optional[NamePlate]:
+        """Rendered name plate; key defaults to the arguments' contents (use a layout's plate_key when there is one)."""
+        key = key or (role_name, json.dumps(text_configs_dict, sort_keys=True), font_path, layout_scale, shadow)
+        with self._lock:
+            if key in self._name_plates:
+                return self._name_plates[key]
+
+        plate = ImageProcessor.render_name_plate(role_name, text_configs_dict, font_path, layout_scale, shadow)
+        with self._lock:
+            self._name_plates.setdefault(key, plate)
+        return plate
+
+    @staticmethod
+    def _options(job: RenderJob) -> Dict[str, Any]:
+        """The job's options on top of its layout template's."""
+        options = {}
+        if job.layout is not None:
+            options.update(job.layout.image_options() if job.image is not None else job.layout.text_options())
+        options.update(job.options or {})
+        if "quality" in options:
+            # Presets can be named per request ("fast", "balanced", "best")
+            options["quality"] = QualityPreset.resolve(options["quality"])
+        return options
+
+    def paginate(self, job: RenderJob) -> List[RenderJob]:
+        """
+        Split a text job whose options set min_font_height into one job per
+        page (see ImageProcessor.paginate_text). Other jobs, and text that
+        fits on one page, come back as a single job.
+        """
+        options = self._options(job)
+        if job.image is not None or not job.text or not options.get("min_font_height"):
+            return [job]
+        kwargs = {k: options[k] for k in ("font_path", "line_spacing", "layout_scale") if k in options}
+        pages = ImageProcessor.paginate_text(job.text, options["top_left"], options["bottom_right"],
+                                             options["min_font_height"], **kwargs)
+        if len(pages) == 1 and pages[0] == job.text:
+            return [job]
+        return [job._replace(text=page) for page in pages]
+
+    def render(self, job: RenderJob) -> bytes:
+        """Render one job to PNG bytes on the calling thread."""
+        options = self._options(job)
+        base = job.base_image
+        if isinstance(base, str):
+            base = self.base_image(base)
+
+        plate_key = None
+        if job.layout is not None and not any(k in (job.options or {}) for k in NAME_PLATE_OPTIONS):
+            plate_key = job.layout.plate_key
+        options["name_plate"] = self.name_plate(
+            options.get("role_name", "unknown"),
+            options.get("text_configs_dict"),
+            options.get("font_path"),
+            options.get("layout_scale", 1.0),
+            options.get("name_shadow", 2),
+            key=plate_key,
+        )
+
+        if job.image is not None:
+            return ImageProcessor.paste_image(image_source=base, content_image=job.image, **options)
+        if job.text:
+            return ImageProcessor.draw_text(image_source=base, text=job.text, **options)
+        raise ValueError("RenderJob needs text or an image.")
+
+    def render_many(self, jobs: Iterable[RenderJob]) -> List[bytes]:
+        """Render jobs in parallel; results are in job order."""
+        jobs = list(jobs)
+        if len(jobs) <= 1 or self.max_workers <= 1:
+            return [self.render(job) for job in jobs]
+        return list(self._pool().map(self.render, jobs))
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="render")
+            return self._executor
+
+    def clear(self):
+        """Drop cached base images and name plates (e.g. after fonts or assets change)."""
+        with self._lock:
+            self._base_images.clear()
+            self._name_plates.clear()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
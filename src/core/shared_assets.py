@@ -0,0 +1,118 @@
+import logging
+from multiprocessing import shared_memory
+from typing import Any, Dict, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# key -> (shared memory block name, mode, (width, height), raw mode, metadata)
+SharedIndex = Dict[str, Tuple[str, str, Tuple[int, int], str, Any]]
+
+# Pillow keeps RGB pixels in 4 bytes; storing them that way lets frombuffer
+# map the block instead of unpacking a copy (views of RGB images are RGBX)
+_RAW_MODES = {"RGB": "RGBX"}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    # Only the owner unlinks; attached processes must not track the block
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        pass
+    # Older versions register every attach with the resource tracker. Workers
+    # started by the owning process (multiprocessing, spawn or fork) share
+    # its tracker, where this is the owner's entry again, so nothing changes;
+    # unregistering here would drop the owner's entry instead. A process
+    # with its own tracker would unlink the blocks when it exits, so on these
+    # versions only attach from processes the owner started.
+    return shared_memory.SharedMemory(name=name)
+
+
+class SharedAssetStore:
+    """
+    Decoded images in shared memory, owned by one process.
+
+    put() copies an image's pixels into its own shared memory block once.
+    index is a small picklable dict to hand to worker processes, which open
+    it with SharedAssetView and get zero-copy, read-only Image views, so
+    adding workers does not add copies of the backgrounds and sprites.
+    close() frees the blocks; call it after the workers are done.
+    """
+
+    def __init__(self):
+        self._blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self.index: SharedIndex = {}
+
+    def put(self, key: str, image: "Image.Image", meta: Any = None):
+        if key in self.index:
+            return
+        rawmode = _RAW_MODES.get(image.mode, image.mode)
+        data = image.tobytes("raw", rawmode)
+        block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        block.buf[:len(data)] = data
+        self._blocks[key] = block
+        self.index[key] = (block.name, image.mode, image.size, rawmode, meta)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(block.size for block in self._blocks.values())
+
+    def close(self):
+        for block in self._blocks.values():
+            block.close()
+            try:
+                block.unlink()
+            except FileNotFoundError:
+                pass
+        self._blocks.clear()
+        self.index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SharedAssetView:
+    """
+    Worker-side, read-only access to a SharedAssetStore index. On Python
+    < 3.13 the worker must be a process the store's owner started (see
+    _attach).
+    """
+
+    def __init__(self, index: SharedIndex):
+        self.index = index
+        self._blocks: Dict[str, shared_memory.SharedMemory] = {}
+        self._images: Dict[str, "Image.Image"] = {}
+
+    def get(self, key: str) -> Optional[Tuple["Image.Image", Any]]:
+        """
+        (read-only image view, metadata) for key, or None if the store does
+        not have it. RGB images come back as RGBX views of the same pixels.
+        """
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        image = self._images.get(key)
+        if image is None:
+            from PIL import Image
+
+            name, mode, size, rawmode, _ = entry
+            block = self._blocks.get(key) or _attach(name)
+            self._blocks[key] = block
+            image = Image.frombuffer(mode, size, block.buf, "raw", rawmode, 0, 1)
+            self._images[key] = image
+        return image, entry[4]
+
+    def close(self):
+        """Detach; images returned by get() must no longer be used."""
+        self._images.clear()
+        for block in self._blocks.values():
+            try:
+                block.close()
+            except BufferError:
+                logger.debug("Shared asset still referenced; left mapped until exit")
+        self._blocks.clear()
@@ -7,24 +7,36 @@ import logging
 import getpass
 import argparse
 from typing import Optional
-import pyperclip
 
 # Add src to path to ensure imports work if run directly
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.utils.platform_utils import PlatformUtils
+# Imported first so --profile-startup can time every import below
+from src.utils.startup_profile import profiler
+from src.utils.platform_utils import PlatformUtils, load_backend
 from src.utils.resource_utils import get_resource_path
-from src.utils.kitty_utils import display_image
-from src.core.image_processor import ImageProcessor
-from src.config import CHARACTERS, TEXT_CONFIGS, WINDOW_WHITELIST, MAHOSHOJO_POSITION, MAHOSHOJO_OVER, OPERATION_TIMEOUT
+from src.core.layout import LayoutTemplate
+from src.core.asset_registry import AssetRegistry, INDEX_NAME
+from src.core.compositor import SpriteCompositor
+from src.core.quality import QualityPreset
+from src.core.generation_jobs import GenerationManager
+from src.core.image_cache import BaseImageCache, LEVELS, THUMBNAIL_SIZE
+from src.utils.session import SessionRecorder
+from src.config import CHARACTERS, TEXT_CONFIGS, WINDOW_WHITELIST, OPERATION_TIMEOUT, TOOL_VERSION, CACHE_BUDGET_MB, CANVAS_SIZE, BASE_IMAGE_FORMAT, QUALITY_PRESET, MIN_FONT_HEIGHT, SEND_RENDER_LEVEL, IMAGE_BLOCKS_MAX
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class Application:
-    def __init__(self, enable_hotkeys=True, enable_cmd=False, use_alt=False):
+    def __init__(self, enable_hotkeys=True, enable_cmd=False, use_alt=False, cache_budget_mb=CACHE_BUDGET_MB, base_format=BASE_IMAGE_FORMAT, quality=QUALITY_PRESET,
+                 seed: Optional[int] = None, data_dir: Optional[str] = None, recorder: Optional[SessionRecorder] = None, render_level=SEND_RENDER_LEVEL,
+                 platform=PlatformUtils, operation_timeout: float = OPERATION_TIMEOUT):
         self.running = True
+        # Clipboard, keyboard and window backend (a FakePlatform when replaying
+        # headless) and how long to wait for the target window to react
+        self.platform = platform
+        self.operation_timeout = operation_timeout
         self.enable_hotkeys = enable_hotkeys
         self.enable_cmd = enable_cmd
         self.use_alt = use_alt
@@ -36,6 +48,13 @@ class Application:
         self.background: Optional[int] = None
         self.last_image_index = -1
         self.last_generation_end_time = 0
+        # Random expressions and backgrounds come from a seeded generator, so a
+        # recorded session can be replayed with the same rolls
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.recorder = recorder
+        if recorder:
+            recorder.start(self.seed, quality=quality, base_format=base_format, render_level=render_level, version=TOOL_VERSION)
 
         # Setup paths
         username = getpass.getuser()
@@ -44,27 +63,37 @@ class Application:
         else:
             self.user_documents = os.path.expanduser('~/Documents')
         
-        self.magic_cut_folder = os.path.join(self.user_documents, '魔裁')
+        self.magic_cut_folder = data_dir or os.path.join(self.user_documents, '魔裁')
         os.makedirs(self.magic_cut_folder, exist_ok=True)
+        self.image_cache = BaseImageCache(self.magic_cut_folder, TOOL_VERSION, budget_bytes=int(cache_budget_mb * 1024 * 1024), image_format=base_format)
+        # Sprites and backgrounds on disk; emotion counts come from here
+        self.assets = AssetRegistry(get_resource_path("resources"), os.path.join(self.magic_cut_folder, INDEX_NAME))
+        self.assets.subscribe(self._on_assets_changed)
+        # One pre-generation job per character, run on a single worker
+        self.compositor = SpriteCompositor()
+        self.generation = GenerationManager(self._plan_generation, self._build_base_image, self._flush_generation)
         
         self.enable_whitelist = True
+        self.sheet_mode: Optional[str] = None # 'expr' / 'bg' shows a contact sheet instead of the preview
+        self.high_res = False # Render from the full-resolution level and skip compression
+        self.render_level = render_level # Level sends are drawn on, see SEND_RENDER_LEVEL
+        self.quality = QualityPreset.get(quality) # Render quality preset of the session
+        self._render_engine = None # Created on first render; importing Pillow is deferred
+        self._background_started = False
         
         # Initialize
         # self.show_current_character()
-        self.print_info()
         self._roll_next_randoms()
-        # We run generation in a separate thread to not block startup, 
-        # but original code did it synchronously. We'll do it in background.
-        threading.Thread(target=self.generate_and_save_images, args=(self.get_current_character(),)).start()
+        # The preview and pre-generation are heavy (PIL, pilmoji, JPEG encoding),
+        # so they are deferred until the hotkey listener and CLI are up.
+        # See _on_listener_ready.
 
     def get_current_character(self):
         return self.character_list[self.current_character_index]
 
     def get_current_font(self):
-        char_name = self.get_current_character()
-        font_name = CHARACTERS[char_name]["font"]
         # Fonts are now in resources/fonts/
-        return get_resource_path(os.path.join("resources", "fonts", font_name))
+        return LayoutTemplate.compile(self.get_current_character()).font_path
 
     # def show_current_character(self):
     #     logger.info(f"当前角色: {self.get_current_character()}")
@@ -86,16 +115,17 @@ class Application:
             char_name = self.get_current_character()
             logger.info(f"已切换到角色: {char_name}")
             self._roll_next_randoms()
-            threading.Thread(target=self.generate_and_save_images, args=(char_name,)).start()
+            self._queue_generation(char_name)
         else:
             logger.warning(f"Invalid character index: {index}")
 
     def switch_expression(self, index):
         char_name = self.get_current_character()
-        emotion_count = CHARACTERS[char_name]["emotion_count"]
+        emotion_count = self.assets.emotion_count(char_name)
         if 1 <= index <= emotion_count:
             logger.info(f"已切换至第{index}个表情")
             self.expression = index
+            self.generation.prioritize(char_name, self._next_img_num())
             self.print_info()
         else:
             logger.warning(f"Invalid expression index: {index}")
@@ -104,26 +134,33 @@ class Application:
         if 1 <= index <= 16:
             logger.info(f"已切换至第{index}个背景")
             self.background = index
+            self.generation.prioritize(self.get_current_character(), self._next_img_num())
             self.print_info()
         else:
             logger.warning(f"Invalid background index: {index}")
 
     def _roll_next_randoms(self):
         char_name = self.get_current_character()
-        emotion_count = CHARACTERS[char_name]["emotion_count"]
+        emotion_count = self.assets.emotion_count(char_name)
         
         # Roll expression
-        emotion_idx = random.randint(0, emotion_count - 1)
+        if emotion_count < 1:
+            # No "(1).png" sprite indexed: nothing to roll, and sends wait for images
+            logger.warning(f"No expressions found for {char_name}.")
+            emotion_idx = 0
+        else:
+            emotion_idx = self.rng.randint(0, emotion_count - 1)
         if self.last_image_index != -1 and emotion_count > 1:
              last_emotion = (self.last_image_index - 1) // 16
              for _ in range(5):
                  if emotion_idx != last_emotion:
                      break
-                 emotion_idx = random.randint(0, emotion_count - 1)
+                 emotion_idx = self.rng.randint(0, emotion_count - 1)
         self.next_expression = emotion_idx + 1
         
         # Roll background
-        self.next_background = random.randint(1, 16)
+        self.next_background = self.rng.randint(1, 16)
+        self.generation.prioritize(char_name, self._next_img_num())
 
     def print_help(self):
         if self.enable_cmd:
@@ -132,8 +169,13 @@ class Application:
             print("  expr / e [index]       切换表情。无参数则循环切换。'0' 或 'random' 表示随机。")
             print("  bg / b [index]         切换背景。无参数则循环切换。'0' 或 'random' 表示随机。")
             print("  info / i               显示当前设置和预览。")
+            print("  sheet / s [expr|bg|off] 以缩略图网格预览全部表情或背景，切换时自动刷新。")
+            print("  hires [on|off]         以原始分辨率输出图片 (不压缩)。")
+            print(f"  quality [{'|'.join(QualityPreset.names())}] 渲染质量预设。无参数则显示当前预设。")
             print("  help / h / ?           显示此帮助。")
             print("  list / ls / l          打印角色列表。")
+            print("  clear [name|index...]  清除生成的图片。无参数则清除全部。")
+            print("  jobs                   显示预生成任务的进度。")
             print("  exit / quit / q        退出")
 
         print("\n快捷键说明:")
@@ -164,21 +206,104 @@ class Application:
             if self.next_background is None: self._roll_next_randoms()
             bg_str = f"Random (Next: {self.next_background})"
         
-        print(f"\n=== Current Status ===")
-        print(f"Character:  {char_name} ({self.current_character_index + 1}/{len(self.character_list)})")
-        print(f"Expression: {expr_str}")
-        print(f"Background: {bg_str}")
+        usage = self.image_cache.usage()
+        budget_str = f"{usage['budget'] / 1048576:.0f} MB" if usage['budget'] else "unlimited"
+        lines = [
+            "",
+            "=== Current Status ===",
+            f"Character:  {char_name} ({self.current_character_index + 1}/{len(self.character_list)})",
+            f"Expression: {expr_str}",
+            f"Background: {bg_str}",
+            f"Cache:      {usage['bytes'] / 1048576:.1f} MB / {budget_str} ({usage['images']} images)",
+        ]
         
         # Preview
         # We generate a temporary path or just use get_random_base_image logic to find a file
         # that represents current state.
-        preview_path = self.get_random_base_image()
-        if os.path.exists(preview_path):
-            print("Preview:")
-            display_image(preview_path)
+        # The status and preview are written as one frame by a background writer,
+        # so a hotkey callback never waits on thumbnail encoding or the terminal.
+        from src.utils.kitty_utils import show_preview, terminal_preview_size
+        level = BaseImageCache.best_level(terminal_preview_size(), self.level_sizes())
+        preview_path = self.get_random_base_image(level)
+        if not os.path.exists(preview_path):
+            preview_path = self.get_random_base_image()
+        footer = "\n======================\n\n"
+        if self.sheet_mode:
+            self.show_sheet(before="\n".join(lines + [f"Sheet ({self.sheet_mode}):", ""]), after=footer)
+        elif os.path.exists(preview_path):
+            show_preview(preview_path, before="\n".join(lines + ["Preview:", ""]), after=footer)
         else:
-            print("(Preview not available - image not generated yet)")
-        print("======================\n")
+            lines.append("(Preview not available - image not generated yet)")
+            show_preview(None, before="\n".join(lines), after=footer)
+
+    def show_sheet(self, before="", after=""):
+        """
+        Show a contact sheet of every expression (for the current background)
+        or every background (for the current expression) of the character.
+        """
+        from src.utils.kitty_utils import show_image
+
+        char_name = self.get_current_character()
+        emotion_idx, bg_idx = self._current_indices()
+        if self.sheet_mode == 'bg':
+            img_nums = [emotion_idx * 16 + i + 1 for i in range(16)]
+            highlight = bg_idx
+        else:
+            emotion_count = self.assets.emotion_count(char_name)
+            img_nums = [i * 16 + bg_idx + 1 for i in range(emotion_count)]
+            highlight = emotion_idx
+        columns = 6 if len(img_nums) > 16 else min(len(img_nums), 4)
+
+        # The key changes whenever a tile is (re)generated, so a sheet that is
+        # already in the terminal is only placed again, not re-sent.
+        stamps = []
+        for n in img_nums:
+            try:
+                stamps.append(os.stat(self.image_cache.image_path(char_name, n)).st_mtime_ns)
+            except OSError:
+                stamps.append(None)
+        key = (char_name, self.sheet_mode, tuple(img_nums), highlight, tuple(stamps))
+
+        def make_sheet():
+            from src.core.image_processor import ImageProcessor
+            tiles = [self.image_cache.thumbnail(char_name, n) for n in img_nums]
+            return ImageProcessor.make_contact_sheet(tiles, columns, THUMBNAIL_SIZE, highlight=highlight)
+
+        show_image(key, make_sheet, before=before, after=after)
+
+    def handle_hires_cmd(self, args):
+        arg = args[0].lower() if args else ('off' if self.high_res else 'on')
+        if arg not in ['on', 'off']:
+            print("Invalid hires argument.")
+            return
+        self.high_res = arg == 'on'
+        logger.info(f"High-resolution export {'on' if self.high_res else 'off'}")
+
+    def handle_quality_cmd(self, args):
+        if not args:
+            print(f"Quality preset: {self.quality.name} (available: {', '.join(QualityPreset.names())})")
+            return
+        try:
+            self.quality = QualityPreset.get(args[0].lower())
+        except ValueError as e:
+            print(e)
+            return
+        logger.info(f"Quality preset: {self.quality.name}")
+
+    def handle_sheet_cmd(self, args):
+        arg = args[0].lower() if args else 'expr'
+        if arg in ['off', 'none']:
+            self.sheet_mode = None
+            logger.info("Contact sheet off")
+            return
+        if arg in ['expr', 'e']:
+            self.sheet_mode = 'expr'
+        elif arg in ['bg', 'b']:
+            self.sheet_mode = 'bg'
+        else:
+            print("Invalid sheet argument.")
+            return
+        self.print_info()
 
     def print_char_list(self):
         print("\nAvailable characters:")
@@ -209,10 +334,13 @@ class Application:
 
     def handle_expr_cmd(self, args):
         char_name = self.get_current_character()
-        emotion_count = CHARACTERS[char_name]["emotion_count"]
+        emotion_count = self.assets.emotion_count(char_name)
         
         if not args:
             # Cycle
+            if emotion_count < 1:
+                logger.warning(f"No expressions found for {char_name}.")
+                return
             current = self.expression if self.expression else 0
             new_expr = (current % emotion_count) + 1
             self.switch_expression(new_expr)
@@ -248,62 +376,174 @@ class Application:
         else:
             print("Invalid background argument.")
 
-    def clear_images(self):
-        logger.info("Clearing images...")
+    def clear_images(self, characters=None):
+        if characters:
+            logger.info(f"Clearing images for: {', '.join(characters)}...")
+        else:
+            logger.info("Clearing images...")
+        # Stop the jobs first so no image lands after the clear
+        self.generation.cancel(characters)
+        self.generation.wait(characters or self.character_list)
         try:
-            for filename in os.listdir(self.magic_cut_folder):
-                if filename.lower().endswith('.jpg'):
-                    os.remove(os.path.join(self.magic_cut_folder, filename))
-            logger.info("Images cleared.")
+            removed = self.image_cache.clear(characters)
+            logger.info(f"Images cleared ({removed} files).")
         except Exception as e:
             logger.error(f"Error clearing images: {e}")
 
-    def generate_and_save_images(self, character_name):
-        emotion_count = CHARACTERS[character_name]["emotion_count"]
-        
-        # Check if already generated (simple check)
-        # Original code checks if ANY file starts with character_name.
-        # I'll do the same.
-        for filename in os.listdir(self.magic_cut_folder):
-            if filename.startswith(character_name):
-                return
+    def handle_clear_cmd(self, args):
+        if not args:
+            self.clear_images()
+            return
 
-        logger.info(f"正在加载角色资源: {character_name}...")
-        try:
-            for i in range(16): # 16 backgrounds
-                for j in range(emotion_count):
-                    # Resources are now in resources/
-                    bg_path = get_resource_path(os.path.join("resources", "background", f"c{i+1}.png"))
-                    char_path = get_resource_path(os.path.join("resources", "char", character_name, f"{character_name} ({j+1}).png"))
-                    
-                    if not os.path.exists(bg_path):
-                        logger.warning(f"Background not found: {bg_path}")
-                        continue
-                    if not os.path.exists(char_path):
-                        logger.warning(f"Character image not found: {char_path}")
-                        continue
-
-                    # We use ImageProcessor to paste? No, this is pre-generation of base images.
-                    # Just use PIL directly or ImageProcessor helper if suitable.
-                    # Original code: paste overlay at (0, 134).
-                    
-                    from PIL import Image
-                    background = Image.open(bg_path).convert("RGBA")
-                    overlay = Image.open(char_path).convert("RGBA")
-                    
-                    result = background.copy()
-                    result.paste(overlay, (0, 134), overlay)
-                    
-                    img_num = j * 16 + i + 1
-                    save_path = os.path.join(self.magic_cut_folder, f"{character_name} ({img_num}).jpg")
-                    result.convert("RGB").save(save_path)
-            logger.info("加载完成")
-        except Exception as e:
-            logger.error(f"Error generating images: {e}", exc_info=True)
+        names = []
+        for arg in args:
+            if arg.isdigit() and 1 <= int(arg) <= len(self.character_list):
+                names.append(self.character_list[int(arg) - 1])
+            elif arg in self.character_list:
+                names.append(arg)
+            else:
+                print(f"Character '{arg}' not found.")
+                return
+        self.clear_images(names)
+
+    def _on_assets_changed(self, keys):
+        """
+        Called by the asset registry when sprites or backgrounds change on disk.
+
+        Only characters using a changed file are affected, and only their stale
+        base images are rebuilt (the manifest compares asset hashes). Other
+        characters catch up when switched to; in-memory caches are keyed by
+        file mtime and drop the old images by themselves.
+        """
+        characters = {AssetRegistry.character_of(key) for key in keys}
+        if None in characters:
+            # A background changed, which every character uses
+            characters = set(self.character_list)
+        logger.info(f"Assets changed: {', '.join(keys[:5])}{' ...' if len(keys) > 5 else ''}")
 
-    def get_random_base_image(self):
         char_name = self.get_current_character()
-        
+        if char_name not in characters:
+            return
+        if self.expression and self.expression > self.assets.emotion_count(char_name):
+            self.expression = None
+        self._roll_next_randoms()
+        self._queue_generation(char_name)
+
+    def _base_image_params(self, layout):
+        # Only what the pixels of a base image depend on; the rest of the layout
+        # (text box, colors, fonts) is drawn at send time
+        return {"sprite_offset": list(layout.sprite_offset), "format": self.image_cache.image_format, "levels": {k: list(v) for k, v in self.level_sizes().items()}}
+
+    @staticmethod
+    def _background_name(img_num):
+        """Background of a pre-generated image: numbers cycle through the 16 backgrounds."""
+        if img_num < 1:
+            return None
+        return f"c{(img_num - 1) % 16 + 1}"
+
+    def level_sizes(self):
+        """Pixel size of each pyramid level."""
+        from src.core.image_processor import ImageProcessor
+        return {
+            "full": CANVAS_SIZE,
+            "output": ImageProcessor.compressed_size(*CANVAS_SIZE),
+            "thumb": THUMBNAIL_SIZE,
+        }
+
+    @property
+    def render_engine(self):
+        if self._render_engine is None:
+            from src.core.render_engine import RenderEngine
+            self._render_engine = RenderEngine()
+        return self._render_engine
+
+    def level_scale(self, level):
+        """Size of a level relative to the full-resolution layout coordinates."""
+        return self.level_sizes()[level][0] / CANVAS_SIZE[0]
+
+    def _next_img_num(self):
+        emotion_idx, bg_idx = self._current_indices()
+        return emotion_idx * 16 + bg_idx + 1
+
+    def _queue_generation(self, character_name):
+        """Pre-generate character_name's base images, the next one to be sent first."""
+        self.generation.focus(character_name)
+        self.generation.submit(character_name, first=[self._next_img_num()])
+
+    def generate_and_save_images(self, character_name):
+        """Pre-generate character_name's base images and wait for them."""
+        self.generation.submit(character_name)
+        self.generation.wait()
+
+    def _plan_generation(self, character_name):
+        """Base images of character_name that are missing or stale, by image number."""
+        emotion_count = self.assets.emotion_count(character_name)
+
+        # Only missing or stale entries (per the manifest) are regenerated, so an
+        # interrupted run resumes where it stopped and changed assets are rebuilt.
+        pending = {}
+        for i in range(16): # 16 backgrounds
+            for j in range(emotion_count):
+                bg_key = self.assets.background_key(f"c{i+1}")
+                char_key = self.assets.sprite_key(character_name, j + 1)
+                bg_path = self.assets.path(bg_key)
+                char_path = self.assets.path(char_key)
+                bg_hash = self.assets.asset_hash(bg_key)
+                char_hash = self.assets.asset_hash(char_key)
+
+                if bg_hash is None:
+                    logger.warning(f"Background not found: {bg_path}")
+                    continue
+                if char_hash is None:
+                    logger.warning(f"Character image not found: {char_path}")
+                    continue
+
+                sources = {bg_key: bg_hash, char_key: char_hash}
+                img_num = j * 16 + i + 1
+                layout = LayoutTemplate.compile(character_name, self._background_name(img_num))
+                params = self._base_image_params(layout)
+                if not self.image_cache.is_fresh(character_name, img_num, sources, params):
+                    pending[img_num] = (bg_path, char_path, sources, layout, params)
+        return pending
+
+    def _build_base_image(self, character_name, img_num, payload):
+        from PIL import Image
+        from src.core import base_image_format
+
+        bg_path, char_path, sources, layout, params = payload
+        sizes = self.level_sizes()
+        bg_hash, char_hash = sources.values()
+        level_image = self.compositor.compose(bg_path, char_path, layout.sprite_offset, bg_hash, char_hash)
+
+        # Pyramid: full resolution, final output size and thumbnail, each
+        # level resampled from the one above it
+        for level in LEVELS:
+            if level_image.size != tuple(sizes[level]):
+                level_image = level_image.resize(sizes[level], Image.Resampling.LANCZOS)
+            save_path = self.image_cache.image_path(character_name, img_num, level)
+            # Write to a temporary file first so readers never see a partial image
+            tmp_path = save_path + ".tmp"
+            base_image_format.save(level_image, tmp_path, self.image_cache.image_format, level)
+            os.replace(tmp_path, save_path)
+        self.image_cache.record(character_name, img_num, sources, params)
+
+    def _flush_generation(self, character_name, final):
+        # Flush periodically so a crash only loses the last few entries
+        self.image_cache.save()
+        if final:
+            self.compositor.clear()
+            self.image_cache.enforce_budget(protect=(character_name, self.get_current_character()))
+
+    def handle_jobs_cmd(self, args):
+        jobs = self.generation.status()
+        if not jobs:
+            print("No generation jobs.")
+            return
+        for job in jobs:
+            print(f"  {job['character']:<8} {job['state']:<10} {job['done']}/{job['total']}")
+
+    def _current_indices(self):
+        """Return the (emotion, background) indices, 0-based, the next send will use."""
         # Determine emotion index (0-based)
         if self.expression:
             emotion_idx = self.expression - 1
@@ -320,43 +560,56 @@ class Application:
                 self._roll_next_randoms()
             bg_idx = self.next_background - 1
 
+        return emotion_idx, bg_idx
+
+    def get_random_base_image(self, level="full"):
+        char_name = self.get_current_character()
+        emotion_idx, bg_idx = self._current_indices()
+
         # Calculate image number (1-based)
         img_num = emotion_idx * 16 + bg_idx + 1
+        self.image_cache.touch(char_name, img_num)
         
-        return os.path.join(self.magic_cut_folder, f"{char_name} ({img_num}).jpg")
+        return self.image_cache.image_path(char_name, img_num, level)
     
     def process_generate_and_send(self):
         # Check whitelist
         if self.enable_whitelist:
-            active_window = PlatformUtils.get_active_window_process_name()
+            active_window = self.platform.get_active_window_process_name()
             if active_window and active_window not in WINDOW_WHITELIST:
                 logger.info(f"当前窗口 {active_window} 不在白名单内")
-                PlatformUtils.simulate_enter()
+                self.platform.simulate_enter()
                 return
 
         if time.time() - self.last_generation_end_time < 0.5:
             logger.debug("Ignoring trigger due to cooldown.")
             return
         
-        PlatformUtils.simulate_Ctrl_('a')
-        time.sleep(OPERATION_TIMEOUT)
+        self.platform.simulate_Ctrl_('a')
+        time.sleep(self.operation_timeout)
         
         if self.process_generation():
-            time.sleep(OPERATION_TIMEOUT)
-            PlatformUtils.simulate_enter()
+            time.sleep(self.operation_timeout)
+            self.platform.simulate_enter()
 
     def process_generation(self) -> bool:
         logger.info("Start generate...")
 
         # Simulate Cut
-        PlatformUtils.simulate_Ctrl_('c')
+        self.platform.simulate_Ctrl_('c')
 
         # Sleep
-        time.sleep(OPERATION_TIMEOUT)
+        time.sleep(self.operation_timeout)
 
         logger.debug("Start generating task")
         try:
-            base_image_path = self.get_random_base_image()
+            # The output-size level already matches the final image; full size
+            # is used for an explicit high-resolution export, or drawn and then
+            # downscaled with render_level "full".
+            level = "full" if self.high_res else self.render_level
+            compress = level == "full" and not self.high_res
+            layout_scale = self.level_scale(level)
+            base_image_path = self.get_random_base_image(level)
             if not os.path.exists(base_image_path):
                 logger.warning(f"Base image not found: {base_image_path}. Please wait for loading.")
                 return False
@@ -370,70 +623,55 @@ class Application:
             except:
                 current_img_num = -1
 
+            from src.core.render_engine import RenderJob
+
             char_name = self.get_current_character()
             
             # Get content from clipboard
-            text = pyperclip.paste()
-            image = PlatformUtils.get_image_from_clipboard()
+            text = self.platform.get_text_from_clipboard()
+            image = self.platform.get_image_from_clipboard()
+            if self.recorder:
+                self.recorder.clipboard(text, image)
             
             if not text and image is None:
                 logger.info("No text or image in clipboard.")
                 return False
 
-            png_bytes = None
+            pages = []
             
-            top_left = (MAHOSHOJO_POSITION[0], MAHOSHOJO_POSITION[1])
-            bottom_right = (MAHOSHOJO_OVER[0], MAHOSHOJO_OVER[1])
+            layout = LayoutTemplate.compile(char_name, self._background_name(current_img_num)).scaled(layout_scale)
 
             if image is not None:
                 logger.info("Processing image...")
-                png_bytes = ImageProcessor.paste_image(
-                    image_source=base_image_path,
-                    top_left=top_left,
-                    bottom_right=bottom_right,
-                    content_image=image,
-                    align="center",
-                    valign="middle",
-                    padding=12,
-                    allow_upscale=True,
-                    role_name=char_name,
-                    text_configs_dict=TEXT_CONFIGS,
-                    font_path=self.get_current_font()
-                )
+                options = {"align": "center", "valign": "middle", "allow_upscale": True, "compress": compress, "quality": self.quality}
+                pages = [self.render_engine.render(RenderJob(base_image_path, image=image, options=options, layout=layout))]
             elif text:
                 preview_text = text[:20].replace('\n', ' ')
                 logger.info(f"Processing text: {preview_text}...")
-                highlight_args = {}
-                if char_name == "anan":
-                    highlight_args = {"bracket_color": (159, 145, 251)}
-                
-                bracket_color = highlight_args.get("bracket_color", (137, 177, 251))
-                
-                png_bytes = ImageProcessor.draw_text(
-                    image_source=base_image_path,
-                    top_left=top_left,
-                    bottom_right=bottom_right,
-                    text=text,
-                    align="left",
-                    valign="top",
-                    color=(255, 255, 255),
-                    max_font_height=145,
-                    font_path=self.get_current_font(),
-                    role_name=char_name,
-                    text_configs_dict=TEXT_CONFIGS,
-                    bracket_color=bracket_color
-                )
-
-            if png_bytes:
-                logger.debug("Start copying image to clipboard")
-                PlatformUtils.copy_image_to_clipboard(png_bytes)
-                logger.debug("Finished copying image to clipboard")
-                time.sleep(OPERATION_TIMEOUT)
-                PlatformUtils.simulate_paste()
+                options = {"align": "left", "valign": "top", "compress": compress, "quality": self.quality,
+                           "min_font_height": MIN_FONT_HEIGHT}
+                # Text too long to stay readable is sent as several images
+                jobs = self.render_engine.paginate(RenderJob(base_image_path, text=text, options=options, layout=layout))
+                if len(jobs) > 1:
+                    logger.info(f"Text split into {len(jobs)} images.")
+                pages = self.render_engine.render_many(jobs)
+
+            if pages and all(pages):
+                for i, png_bytes in enumerate(pages):
+                    if i:
+                        time.sleep(self.operation_timeout)
+                    logger.debug("Start copying image to clipboard")
+                    self.platform.copy_image_to_clipboard(png_bytes)
+                    logger.debug("Finished copying image to clipboard")
+                    time.sleep(self.operation_timeout)
+                    self.platform.simulate_paste()
                 logger.info("Done.")
+                if self.recorder:
+                    self.recorder.sent(char_name, current_img_num, len(pages))
                 # Update state
                 self.last_image_index = current_img_num
                 self._roll_next_randoms()
+                self.image_cache.save()
                 self.last_generation_end_time = time.time()
                 return True
             else:
@@ -448,7 +686,7 @@ class Application:
     def _start_hotkey_service(self):
         logger.info("Starting hotkey service...")
 
-        platform_name = PlatformUtils.get_platform()
+        platform_name = self.platform.get_platform()
 
         if platform_name == 'windows':
             try:
@@ -476,7 +714,7 @@ class Application:
 
                 def on_activate_gen():
                     if self.use_alt:
-                        time.sleep(4 * OPERATION_TIMEOUT)
+                        time.sleep(4 * self.operation_timeout)
                     self._run_with_clear(self.process_generate_and_send)
 
                 keyboard.add_hotkey(f'{"alt+" if self.use_alt else ""}enter', lambda: on_activate_gen(),
@@ -488,6 +726,7 @@ class Application:
                     os._exit(0)
 
                 if not self.enable_cmd:
+                    self._on_listener_ready()
                     keyboard.wait('alt+esc')
                 else:
                     keyboard.add_hotkey('alt+esc', on_exit)
@@ -536,6 +775,7 @@ class Application:
 
                 if not self.enable_cmd:
                     with keyboard.GlobalHotKeys(hotkeys) as h:
+                        self._on_listener_ready()
                         h.join()
                 else:
                     self.listener = keyboard.GlobalHotKeys(hotkeys)
@@ -544,46 +784,87 @@ class Application:
             except ImportError:
                 logger.error("pynput module not found. Please install it.")
 
+    def _on_listener_ready(self):
+        """Start the deferred startup work once hotkeys are being received."""
+        if self._background_started:
+            return
+        self._background_started = True
+        profiler.mark("listener ready")
+        threading.Thread(target=self._background_startup, daemon=True).start()
+
+    def _background_startup(self):
+        with profiler.phase("warm-up imports"):
+            # Load the rendering stack now so the first send does not pay for it
+            load_backend()
+            self.render_engine
+            from src.utils.kitty_utils import show_preview  # noqa: F401
+        with profiler.phase("initial preview"):
+            self.print_info()
+        profiler.mark("startup work done")
+        self._queue_generation(self.get_current_character())
+        self.assets.watch()
+
+        if profiler.enabled:
+            profiler.disable()
+            print(profiler.report())
+
+    def handle_command(self, cmd_input):
+        cmd_line = cmd_input.strip().split()
+        if not cmd_line:
+            return
+        if self.recorder:
+            self.recorder.command(cmd_input.strip())
+
+        cmd = cmd_line[0].lower()
+        args = cmd_line[1:]
+
+        if cmd in ['help', '?', 'h']:
+            self.print_help()
+        elif cmd in ['ls', 'list', 'l']:
+            self.print_char_list()
+        elif cmd in ['char', 'c']:
+            self.handle_char_cmd(args)
+        elif cmd in ['expr', 'e']:
+            self.handle_expr_cmd(args)
+        elif cmd in ['bg', 'b']:
+            self.handle_bg_cmd(args)
+        elif cmd in ['info', 'i']:
+            self.print_info()
+        elif cmd in ['sheet', 's']:
+            self.handle_sheet_cmd(args)
+        elif cmd == 'hires':
+            self.handle_hires_cmd(args)
+        elif cmd == 'quality':
+            self.handle_quality_cmd(args)
+        elif cmd == 'clear':
+            self.handle_clear_cmd(args)
+        elif cmd == 'jobs':
+            self.handle_jobs_cmd(args)
+        elif cmd in ['exit', 'quit', 'q']:
+            self.running = False
+            logger.info("Exiting...")
+            os._exit(0)
+        else:
+            print("Unknown command. Type 'help' for list.")
+
     def run(self):
         logger.info("Starting application...")
 
-        self.print_help()
-
-        self.print_char_list()
+        with profiler.phase("help text"):
+            self.print_help()
+            self.print_char_list()
         
-        self._start_hotkey_service()
+        with profiler.phase("hotkey listener"):
+            self._start_hotkey_service()
+
+        # Command mode (or a missing keyboard backend) returns here without blocking
+        self._on_listener_ready()
 
         if self.enable_cmd:
             while self.running:
                 try:
                     # Use input() for command loop
-                    cmd_input = input("> ")
-                    cmd_line = cmd_input.strip().split()
-                    if not cmd_line: continue
-                    
-                    cmd = cmd_line[0].lower()
-                    args = cmd_line[1:]
-                    
-                    if cmd in ['help', '?', 'h']:
-                        self.print_help()
-                    elif cmd in ['ls', 'list', 'l']:
-                        self.print_char_list()
-                    elif cmd in ['char', 'c']:
-                        self.handle_char_cmd(args)
-                    elif cmd in ['expr', 'e']:
-                        self.handle_expr_cmd(args)
-                    elif cmd in ['bg', 'b']:
-                        self.handle_bg_cmd(args)
-                    elif cmd in ['info', 'i']:
-                        self.print_info()
-                    elif cmd == 'clear':
-                        self.clear_images()
-                    elif cmd in ['exit', 'quit', 'q']:
-                        self.running = False
-                        logger.info("Exiting...")
-                        os._exit(0)
-                    else:
-                        print("Unknown command. Type 'help' for list.")
+                    self.handle_command(input("> "))
                 except (EOFError, KeyboardInterrupt):
                     self.running = False
                     print("\nExiting...")
@@ -604,8 +885,12 @@ class Application:
             pass
 
     def _run_with_clear(self, func, *args, **kwargs):
+        if self.recorder:
+            self.recorder.hotkey(func.__name__, args)
         self.clear_input()
-        return func(*args, **kwargs)
+        # Hotkey actions are foreground work: hold background generation off
+        with self.generation.foreground():
+            return func(*args, **kwargs)
 
     def _unused_start_hotkey_listener(self):
         # Kept for reference or removal
@@ -619,11 +904,41 @@ if __name__ == "__main__":
     parser.add_argument('--cmd', action='store_true', default=False, help='Enable command line interface (default: False)')
     if PlatformUtils.get_platform() == 'windows':
         parser.add_argument('--use-alt', dest='use_alt', action='store_true', default=False, help='Use Alt+Enter instead of Enter (default: False)')
+    parser.add_argument('--profile-startup', action='store_true', default=False, help='Print an import-time and init-time breakdown of startup')
+    parser.add_argument('--cache-budget', dest='cache_budget', type=float, default=CACHE_BUDGET_MB, help=f'Disk budget for generated images in MB, 0 for unlimited (default: {CACHE_BUDGET_MB})')
+    parser.add_argument('--base-format', dest='base_format', choices=['jpg', 'png', 'raw'], default=BASE_IMAGE_FORMAT, help=f'Storage format of pre-generated images; png and raw are lossless but larger (default: {BASE_IMAGE_FORMAT})')
+    parser.add_argument('--render-level', choices=['output', 'full'], default=SEND_RENDER_LEVEL, help=f'Draw sends on the output-size base image, or at full resolution and downscale them (slower; how sends looked before the base-image pyramid) (default: {SEND_RENDER_LEVEL})')
+    parser.add_argument('--quality', choices=QualityPreset.names(), default=QUALITY_PRESET, help=f'Render quality preset: resampling, PNG effort, shadows and emoji (default: {QUALITY_PRESET})')
+    parser.add_argument('--no-glyph-atlas', dest='glyph_atlas', action='store_false', default=True, help='Rasterize every glyph with ImageDraw.text instead of reusing cached glyphs')
+    parser.add_argument('--no-content-cache', dest='content_cache', action='store_false', default=True, help='Resize every pasted image instead of reusing the resize of an identical earlier paste')
+    parser.add_argument('--image-blocks', dest='image_blocks', type=int, default=IMAGE_BLOCKS_MAX, help=f'Freed image buffers Pillow keeps for the next render to reuse, 0 to free them at once; PILLOW_BLOCKS_MAX overrides (default: {IMAGE_BLOCKS_MAX})')
+    parser.add_argument('--profile-render', action='store_true', default=False, help='Log a per-stage time and allocation report of every render')
+    parser.add_argument('--record', metavar='PATH', default=None, help='Record hotkeys, commands and clipboard payloads of the session to PATH (JSON lines) for bench/replay_session.py')
+    parser.add_argument('--seed', type=int, default=None, help='Seed of the random expression and background choices')
     args = parser.parse_args()
 
+    if not args.glyph_atlas:
+        from src.core.glyph_atlas import glyph_atlas
+        glyph_atlas.enabled = False
+
+    if args.profile_render:
+        from src.utils.render_profile import render_profiler
+        render_profiler.enable()
+
+    if not args.content_cache:
+        from src.core.content_cache import content_cache
+        content_cache.enabled = False
+
+    # Layers, shadows and resize outputs of a render then reuse the buffers
+    # of the previous one. Pillow is not imported yet (it is deferred to keep
+    # startup short) and applies this when it is
+    os.environ.setdefault("PILLOW_BLOCKS_MAX", str(args.image_blocks))
+
     if args.debug:
         logging.getLogger().setLevel(logging.DEBUG)
         logger.info("Debug mode enabled")
 
-    app = Application(enable_hotkeys=args.key, enable_cmd=args.cmd, use_alt=args.use_alt if PlatformUtils.get_platform() == 'windows' else True)
+    with profiler.phase("Application.__init__"):
+        app = Application(enable_hotkeys=args.key, enable_cmd=args.cmd, use_alt=args.use_alt if PlatformUtils.get_platform() == 'windows' else True, cache_budget_mb=args.cache_budget, base_format=args.base_format, quality=args.quality,
+                          seed=args.seed, render_level=args.render_level, recorder=SessionRecorder(args.record) if args.record else None)
     app.run()
@@ -1,6 +1,10 @@
 import sys
 import os
+import shutil
+import tempfile
+import threading
 from base64 import standard_b64encode
+from collections import OrderedDict
 from io import BytesIO
 
 from PIL import Image
@@ -10,6 +14,15 @@ ESC = b'\x1b'   # escape
 ST  = b'\x1b\\' # ESC backslash (string terminator used by the protocol)
 CHUNK_SIZE = 4096  # 每片最大 4096 字节 (kitty 要求)
 
+# 预览缩略图的最大尺寸 (像素)，实际尺寸还会受终端大小限制
+PREVIEW_MAX_SIZE = (960, 320)
+# 默认 cell 像素尺寸，终端不报告像素大小时使用
+DEFAULT_CELL_SIZE = (10, 20)
+# 传输方式: 'd' 内联 base64 (可跨 SSH)，'t' 临时文件 (仅本地终端)
+PREVIEW_TRANSMISSION = os.environ.get("KITTY_PREVIEW_TRANSMISSION", "d")
+# 终端中最多保留多少张已传输的图片，超出后按 LRU 删除
+MAX_TRANSMITTED_IMAGES = 64
+
 
 def serialize_gr_command(cmd_dict, payload=None):
     """
@@ -28,13 +41,14 @@ def serialize_gr_command(cmd_dict, payload=None):
     return b''.join(parts)
 
 
-def write_chunked_to_stdout(data_bytes, **cmd):
+def build_chunked_sequence(data_bytes, **cmd):
     """
-    将二进制图像数据 base64 编码后按 CHUNK_SIZE 分片发送到 stdout（终端）。
+    将二进制图像数据 base64 编码后按 CHUNK_SIZE 分片，拼成一个完整的 bytes 序列。
     cmd 中包含要发送的控制参数（例如 a='T', f=100 等）。
     """
     b64 = standard_b64encode(data_bytes)
     # 按 CHUNK_SIZE 分片。除了最后一片外，其他片的长度需为 4 的倍数 (base64 要求)
+    parts = []
     pos = 0
     first = True
     # We will reuse cmd for the first chunk; subsequent chunks only have m=1 (or m=0 for last)
@@ -48,25 +62,95 @@ def write_chunked_to_stdout(data_bytes, **cmd):
             cmd_chunk = dict(cmd)
             # m=1 表示还有后续片；最后一片 m=0
             cmd_chunk['m'] = 1 if more else 0
-            payload = chunk
             first = False
         else:
             # subsequent chunks: only m (and optionally q) are required
             cmd_chunk = {'m': 1 if more else 0}
-            payload = chunk
 
-        seq = serialize_gr_command(cmd_chunk, payload=payload)
-        # 写到 stdout 的二进制缓冲区并 flush
-        sys.stdout.buffer.write(seq)
-        sys.stdout.buffer.flush()
+        parts.append(serialize_gr_command(cmd_chunk, payload=chunk))
+    return b''.join(parts)
+
+
+def write_chunked_to_stdout(data_bytes, **cmd):
+    """
+    将二进制图像数据分片后一次性写到 stdout（终端），在调用者线程上同步完成。
+    """
+    write_to_stdout(build_chunked_sequence(data_bytes, **cmd))
+
+
+def write_to_stdout(seq):
+    # 先刷新文本缓冲，避免 print 的内容和图片乱序
+    sys.stdout.flush()
+    sys.stdout.buffer.write(seq)
+    sys.stdout.buffer.flush()
+
+
+class TerminalWriter:
+    """
+    Background writer for terminal frames.
+
+    A frame is either bytes or a callable producing bytes; producing and
+    writing both happen on the writer thread, so the caller (usually a hotkey
+    callback) returns immediately. Only the newest pending frame is kept: a
+    frame submitted while another is waiting replaces it, so a rapid series
+    of previews drops the stale ones.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._thread = None
+
+    def submit(self, frame):
+        with self._cond:
+            self._pending = frame
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="terminal-writer", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+    def cancel(self):
+        """Drop the pending frame, if any."""
+        with self._cond:
+            self._pending = None
+            self._cond.notify_all()
 
+    def wait_idle(self, timeout=None):
+        """Block until every submitted frame has been written."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._busy, timeout)
 
-def image_to_png_bytes(path):
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None)
+                frame, self._pending = self._pending, None
+                self._busy = True
+            try:
+                data = frame() if callable(frame) else frame
+                if data:
+                    write_to_stdout(data)
+            except Exception as e:
+                sys.stderr.write(f"Preview failed: {e}\n")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+
+def image_to_png_bytes(path, max_size=None):
     """
     使用 Pillow 将任意图片格式转换为 PNG 并返回 PNG 的 bytes。
     如果输入已经是 PNG，也会重新编码（保证一致）。
+    指定 max_size 时先缩放为缩略图 (JPEG 会用 draft 直接以低分辨率解码)。
     """
-    with Image.open(path) as im:
+    from src.core.base_image_format import open_image
+
+    # Base images may be stored raw, which Pillow cannot open itself
+    with open_image(path) as im:
+        if max_size:
+            im.thumbnail(max_size, Image.Resampling.LANCZOS)
         # 保证转换为 RGBA 或 RGB 根据需要；这里我们保存为 PNG（f=100）
         buf = BytesIO()
         # 若图片有透明度则保留
@@ -78,13 +162,168 @@ def image_to_png_bytes(path):
         return buf.getvalue()
 
 
-def display_image(image_path):
+def terminal_preview_size():
+    """
+    Return the largest preview size (pixels) that fits the terminal width,
+    capped at PREVIEW_MAX_SIZE.
+    """
+    cols, rows = shutil.get_terminal_size()
+    width_px = cols * DEFAULT_CELL_SIZE[0]
+    height_px = rows * DEFAULT_CELL_SIZE[1]
+    try:
+        import fcntl
+        import struct
+        import termios
+        packed = fcntl.ioctl(sys.stdout.fileno(), termios.TIOCGWINSZ, b'\0' * 8)
+        _, _, xpixel, ypixel = struct.unpack('HHHH', packed)
+        if xpixel and ypixel:
+            width_px, height_px = xpixel, ypixel
+    except Exception:
+        pass
+    return (max(1, min(PREVIEW_MAX_SIZE[0], width_px)),
+            max(1, min(PREVIEW_MAX_SIZE[1], height_px // 2)))
+
+
+class PreviewCache:
+    """
+    Thumbnail cache keyed by (path, mtime, size, preview size).
+
+    Each thumbnail is encoded once and transmitted to the terminal once under
+    a kitty image id; later previews of the same image only send a placement
+    command (a=p,i=<id>), which is a few bytes instead of the whole PNG.
+    """
+
+    def __init__(self, max_images=MAX_TRANSMITTED_IMAGES):
+        self.max_images = max_images
+        self._lock = threading.Lock()
+        self._ids = OrderedDict()
+        self._next_id = 1
+
+    @staticmethod
+    def _key(image_path, max_size):
+        st = os.stat(image_path)
+        return (os.path.abspath(image_path), st.st_mtime_ns, st.st_size, tuple(max_size))
+
+    def _allocate(self, key):
+        """Reserve an image id for key; returns (id, evicted ids)."""
+        image_id = self._next_id
+        self._next_id += 1
+        self._ids[key] = image_id
+        evicted = []
+        while len(self._ids) > self.max_images:
+            _, old_id = self._ids.popitem(last=False)
+            evicted.append(old_id)
+        return image_id, evicted
+
+    def sequence(self, image_path, max_size=None, transmission=None):
+        """
+        Return the escape sequence that shows image_path: a placement if the
+        terminal already has the thumbnail, otherwise a full transmission.
+        """
+        max_size = max_size or terminal_preview_size()
+        key = self._key(image_path, max_size)
+        return self._sequence(key, lambda: image_to_png_bytes(image_path, max_size), transmission)
+
+    def image_sequence(self, key, make_image, max_size=None, transmission=None):
+        """
+        Like sequence() for an in-memory image identified by key. make_image
+        is only called when the terminal does not have that image yet.
+        """
+        max_size = max_size or terminal_preview_size()
+
+        def make_png():
+            im = make_image()
+            im.thumbnail(max_size, Image.Resampling.LANCZOS)
+            buf = BytesIO()
+            im.save(buf, format="PNG")
+            return buf.getvalue()
+
+        return self._sequence(("image", key, tuple(max_size)), make_png, transmission)
+
+    def _sequence(self, key, make_png, transmission=None):
+        transmission = transmission or PREVIEW_TRANSMISSION
+        with self._lock:
+            image_id = self._ids.get(key)
+            if image_id is not None:
+                # 终端已经有这张图，只需放置
+                self._ids.move_to_end(key)
+                return serialize_gr_command({'a': 'p', 'i': image_id, 'q': 2})
+
+            image_id, evicted = self._allocate(key)
+            # 删除终端里不再使用的图片数据
+            parts = [serialize_gr_command({'a': 'd', 'd': 'I', 'i': old_id, 'q': 2}) for old_id in evicted]
+
+            try:
+                png_bytes = make_png()
+            except Exception:
+                self._ids.pop(key, None)
+                raise
+            cmd = {'a': 'T', 'f': 100, 'i': image_id, 'q': 2}
+            if transmission == 't':
+                parts.append(temp_file_sequence(png_bytes, **cmd))
+            else:
+                parts.append(build_chunked_sequence(png_bytes, t='d', **cmd))
+            return b''.join(parts)
+
+
+def temp_file_sequence(png_bytes, **cmd):
+    """
+    通过临时文件传输 (t=t)：终端直接读取文件并在读取后删除它。
+    文件名需包含 tty-graphics-protocol，kitty 才会删除它。
+    """
+    fd, path = tempfile.mkstemp(prefix='tty-graphics-protocol-', suffix='.png')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(png_bytes)
+    cmd = dict(cmd, t='t')
+    return serialize_gr_command(cmd, payload=standard_b64encode(path.encode()))
+
+
+_preview_cache = PreviewCache()
+_writer = TerminalWriter()
+
+
+def _encode_text(text):
+    return text.encode(sys.stdout.encoding or 'utf-8', errors='replace')
+
+
+def show_preview(image_path, before="", after="", max_size=None):
+    """
+    Asynchronously print before, the image (if it exists) and after as one
+    frame. Returns immediately; a newer preview replaces one not yet shown.
+    """
+    def frame():
+        parts = [_encode_text(before)]
+        if image_path and os.path.exists(image_path):
+            parts.append(_preview_cache.sequence(image_path, max_size))
+        parts.append(_encode_text(after))
+        return b''.join(parts)
+
+    _writer.submit(frame)
+
+
+def show_image(key, make_image, before="", after="", max_size=None):
+    """
+    Asynchronously show an in-memory image built by make_image (called on the
+    writer thread). Images with the same key are transmitted only once.
+    """
+    def frame():
+        parts = [_encode_text(before)]
+        parts.append(_preview_cache.image_sequence(key, make_image, max_size))
+        parts.append(_encode_text(after))
+        return b''.join(parts)
+
+    _writer.submit(frame)
+
+
+def display_image(image_path, max_size=None):
     """
     Display an image in the terminal using the Kitty graphics protocol.
+
+    The image is shown as a thumbnail sized to the terminal; repeated previews
+    of the same file reuse the image already transmitted to the terminal.
+    Writing happens on a background thread.
     """
     if not os.path.exists(image_path):
         return
 
-    cmd = {'a': 'T', 'f': 100, 't': 'd'}
-    png_bytes = image_to_png_bytes(image_path)
-    write_chunked_to_stdout(png_bytes, **cmd)
+    show_preview(image_path, max_size=max_size)
@@ -7,9 +7,11 @@ import subprocess
 import tempfile
 import logging
 import shutil
-from typing import Optional, Union
-from PIL import Image
-import pyperclip
+import threading
+from typing import Optional, Union, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,24 +26,44 @@ HAS_PYNPUT = False
 
 from src.config import OPERATION_TIMEOUT
 
-if PLATFORM == 'windows':
-    try:
-        import win32clipboard
-        import win32gui
-        import win32process
-        import psutil
-        import keyboard as win_keyboard
-        HAS_WIN32 = True
-    except ImportError:
-        logger.warning("Windows specific modules (pywin32, psutil, keyboard) not found.")
+_backend_loaded = False
+_backend_lock = threading.Lock()
+
 
-if PLATFORM != 'windows':
-    try:
-        from pynput import keyboard as pynput_keyboard
-        from pynput.keyboard import Key, Controller
-        HAS_PYNPUT = True
-    except ImportError:
-        logger.warning("pynput not found. Keyboard simulation may not work.")
+def load_backend():
+    """
+    Import the platform backend modules on first use.
+
+    They are not needed to parse arguments or bring up the CLI, so deferring
+    them keeps cold start short; the app warms them up once the listener runs.
+    """
+    global _backend_loaded, HAS_WIN32, HAS_PYNPUT
+    global win32clipboard, win32gui, win32process, psutil, win_keyboard
+    global pynput_keyboard, Key, Controller
+    if _backend_loaded:
+        return
+    with _backend_lock:
+        if _backend_loaded:
+            return
+        if PLATFORM == 'windows':
+            try:
+                import win32clipboard
+                import win32gui
+                import win32process
+                import psutil
+                import keyboard as win_keyboard
+                HAS_WIN32 = True
+            except ImportError:
+                logger.warning("Windows specific modules (pywin32, psutil, keyboard) not found.")
+
+        if PLATFORM != 'windows':
+            try:
+                from pynput import keyboard as pynput_keyboard
+                from pynput.keyboard import Key, Controller
+                HAS_PYNPUT = True
+            except ImportError:
+                logger.warning("pynput not found. Keyboard simulation may not work.")
+        _backend_loaded = True
 
 class PlatformUtils:
     """
@@ -59,6 +81,7 @@ class PlatformUtils:
         """
         Copy PNG image bytes to the system clipboard.
         """
+        load_backend()
         if PLATFORM == 'windows' and HAS_WIN32:
             return PlatformUtils._copy_image_windows(png_bytes)
         elif PLATFORM == 'darwin':
@@ -71,6 +94,7 @@ class PlatformUtils:
 
     @staticmethod
     def _copy_image_windows(png_bytes: bytes) -> bool:
+        from PIL import Image
         logger.debug("Start copying image to clipboard (windows)")
         try:
             image = Image.open(io.BytesIO(png_bytes))
@@ -154,10 +178,17 @@ class PlatformUtils:
         return False
 
     @staticmethod
-    def get_image_from_clipboard() -> Optional[Image.Image]:
+    def get_text_from_clipboard() -> str:
+        """Retrieve text from the clipboard ("" if there is none)."""
+        import pyperclip
+        return pyperclip.paste() or ""
+
+    @staticmethod
+    def get_image_from_clipboard() -> Optional["Image.Image"]:
         """
         Retrieve an image from the clipboard. Returns PIL Image or None.
         """
+        load_backend()
         if PLATFORM == 'windows' and HAS_WIN32:
             return PlatformUtils._get_image_windows()
         elif PLATFORM == 'linux':
@@ -168,7 +199,8 @@ class PlatformUtils:
         return None
 
     @staticmethod
-    def _get_image_windows() -> Optional[Image.Image]:
+    def _get_image_windows() -> Optional["Image.Image"]:
+        from PIL import Image
         try:
             win32clipboard.OpenClipboard()
             try:
@@ -187,7 +219,8 @@ class PlatformUtils:
         return None
 
     @staticmethod
-    def _get_image_linux() -> Optional[Image.Image]:
+    def _get_image_linux() -> Optional["Image.Image"]:
+        from PIL import Image
         # Try xclip
         if shutil.which('xclip'):
             try:
@@ -225,7 +258,8 @@ class PlatformUtils:
         return None
 
     @staticmethod
-    def _get_image_macos() -> Optional[Image.Image]:
+    def _get_image_macos() -> Optional["Image.Image"]:
+        from PIL import Image
         # Use pngpaste if available? Or osascript.
         # osascript is standard.
         try:
@@ -258,6 +292,7 @@ class PlatformUtils:
         """
         Get the process name of the currently active window (Windows only).
         """
+        load_backend()
         if PLATFORM == 'windows' and HAS_WIN32:
             try:
                 hwnd = win32gui.GetForegroundWindow()
@@ -271,6 +306,7 @@ class PlatformUtils:
     @staticmethod
     def simulate_Ctrl_(key: str):
         """Simulate Ctrl+?."""
+        load_backend()
         logger.debug(f"Start simulate Ctrl+{key}")
         if PLATFORM == 'windows' and HAS_WIN32:
             win_keyboard.send(f'ctrl+{key}')
@@ -285,6 +321,7 @@ class PlatformUtils:
     @staticmethod
     def simulate_cut():
         """Simulate Ctrl+A, Ctrl+X to cut text."""
+        import pyperclip
         # Clear clipboard first
         pyperclip.copy("")
         __class__.simulate_Ctrl_('a')
@@ -300,9 +337,31 @@ class PlatformUtils:
     @staticmethod
     def simulate_enter():
         """Simulate Enter key press."""
+        load_backend()
         if PLATFORM == 'windows' and HAS_WIN32:
             win_keyboard.send('enter')
         elif HAS_PYNPUT:
             c = Controller()
             c.press(Key.enter)
             c.release(Key.enter)
+
+    @staticmethod
+    def lower_thread_priority(niceness: int = 10) -> bool:
+        """
+        Lower the CPU (and on Windows, I/O) priority of the calling thread only.
+        Returns False where that is not supported (macOS has no per-thread nice).
+        """
+        try:
+            if PLATFORM == 'windows':
+                import ctypes
+                kernel32 = ctypes.windll.kernel32
+                THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+                return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN))
+            if PLATFORM == 'linux':
+                # On Linux the nice value is per thread, addressed by its native id
+                tid = threading.get_native_id()
+                os.setpriority(os.PRIO_PROCESS, tid, min(19, os.getpriority(os.PRIO_PROCESS, tid) + niceness))
+                return True
+        except (OSError, AttributeError) as e:
+            logger.debug(f"Cannot lower thread priority: {e}")
+        return False
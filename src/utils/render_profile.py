@@ -0,0 +1,129 @@
+import gc
+import time
+import logging
+import threading
+import tracemalloc
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# (stage, seconds, Python bytes still allocated, Python peak, images created,
+#  image blocks newly allocated, image blocks reused)
+Stage = Tuple[str, float, int, int, int, int, int]
+
+
+def _pillow_stats() -> Dict[str, int]:
+    from PIL import Image
+    return Image.core.get_stats()
+
+
+def _gc_runs() -> int:
+    return sum(generation["collections"] for generation in gc.get_stats())
+
+
+class _Stages:
+    """Stage marks of one render; see RenderProfiler.begin."""
+
+    def __init__(self, profiler: "RenderProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.stages: List[Stage] = []
+        self._gc = _gc_runs()
+        self._start = self._last = time.perf_counter()
+        self._pillow = _pillow_stats()
+        self._traced = self._base = tracemalloc.get_traced_memory()[0]
+        self.peak = 0
+        tracemalloc.reset_peak()
+
+    def mark(self, stage: str):
+        """Close the stage that ends here (everything since the previous mark)."""
+        now = time.perf_counter()
+        traced, peak = tracemalloc.get_traced_memory()
+        pillow = _pillow_stats()
+        self.stages.append((
+            stage,
+            now - self._last,
+            traced - self._traced,
+            max(0, peak - self._traced),
+            pillow["new_count"] - self._pillow["new_count"],
+            pillow["allocated_blocks"] - self._pillow["allocated_blocks"],
+            pillow["reused_blocks"] - self._pillow["reused_blocks"],
+        ))
+        self.peak = max(self.peak, peak - self._base)
+        self._last, self._traced, self._pillow = now, traced, pillow
+        tracemalloc.reset_peak()
+
+    def end(self):
+        self.profiler._finish(self, time.perf_counter() - self._start, self.peak, _gc_runs() - self._gc)
+
+
+class _NoStages:
+    def mark(self, stage: str):
+        pass
+
+    def end(self):
+        pass
+
+
+_NO_STAGES = _NoStages()
+
+
+class RenderProfiler:
+    """
+    Allocation report per render stage, enabled with --profile-render.
+
+    ImageProcessor marks the end of each stage of a render (base canvas,
+    layout, drawing, compression, PNG encoding...). For every stage the
+    report shows the time, the Python memory it left allocated and its peak
+    (tracemalloc: PNG buffers, bytes), and the images Pillow created, with
+    how many of their buffers were freshly allocated rather than reused.
+    Image buffers live in Pillow's own allocator, which tracemalloc does not
+    see, hence the block counts. Stages of concurrent renders overlap, so
+    profile one render at a time.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        # (render, seconds, Python peak above the start, GC runs, stages)
+        self.last: Optional[Tuple[str, float, int, int, List[Stage]]] = None
+        self._lock = threading.Lock()
+
+    def enable(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def begin(self, name: str):
+        """Stage marker for one render; a no-op unless enabled."""
+        return _Stages(self, name) if self.enabled else _NO_STAGES
+
+    def _finish(self, stages: _Stages, seconds: float, peak: int, gc_runs: int):
+        with self._lock:
+            self.last = (stages.name, seconds, peak, gc_runs, stages.stages)
+        logger.info(self.report())
+
+    def report(self) -> str:
+        if self.last is None:
+            return "No render profiled."
+        name, seconds, render_peak, gc_runs, stages = self.last
+        mb = 1024 * 1024
+        lines = [
+            f"=== Render Profile: {name} ===",
+            f"  {'stage':<16}{'time':>10}{'py alloc':>11}{'py peak':>10}{'images':>8}{'new':>6}{'reused':>8}",
+        ]
+        for stage, t, alloc, peak, images, new, reused in stages:
+            lines.append(f"  {stage:<16}{t * 1000:>7.1f} ms{alloc / mb:>8.2f} MB{peak / mb:>7.2f} MB{images:>8}{new:>6}{reused:>8}")
+        lines.append(
+            f"  {'(total)':<16}{seconds * 1000:>7.1f} ms{'':>11}{render_peak / mb:>7.2f} MB"
+            f"{sum(s[4] for s in stages):>8}{sum(s[5] for s in stages):>6}{sum(s[6] for s in stages):>8}"
+        )
+        lines.append(f"  GC runs: {gc_runs}")
+        return "\n".join(lines)
+
+
+render_profiler = RenderProfiler()
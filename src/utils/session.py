@@ -0,0 +1,274 @@
+import io
+import json
+import base64
+import logging
+import shutil
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+from src.utils.platform_utils import PlatformUtils
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Hotkey actions the replayer repeats; sends are replayed from their
+# clipboard events instead, since a send hotkey can be ignored (cooldown,
+# window whitelist) without reading the clipboard
+REPLAYED_ACTIONS = ("switch_character", "switch_expression", "switch_background")
+EXIT_COMMANDS = ("exit", "quit", "q")
+# Commands the replayer leaves out: they delete files in the data folder
+SKIPPED_COMMANDS = ("clear",)
+
+
+class SessionRecorder:
+    """
+    Records a usage session of Application as JSON lines.
+
+    Events are written as they happen, each with "t", the seconds since the
+    recorder was created:
+      start      RNG seed and session settings
+      hotkey     action name and arguments of a hotkey
+      command    a CLI command line
+      clipboard  text and image (base64 PNG) read by a send
+      sent       character, image number and page count of a completed send
+    Without a path, events are only kept in memory (events).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.events: List[Dict[str, Any]] = []
+        self._file = open(path, "w", encoding="utf-8") if path else None
+        self._lock = threading.Lock()
+        self._t0 = time.perf_counter()
+
+    def _write(self, event: str, **fields):
+        record = {"t": round(time.perf_counter() - self._t0, 4), "event": event, **fields}
+        with self._lock:
+            if self._file is not None:
+                # One flushed line per event, so a session killed with os._exit is kept
+                self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                self._file.flush()
+            else:
+                self.events.append(record)
+
+    def start(self, seed: int, **settings):
+        self._write("start", seed=seed, **settings)
+
+    def hotkey(self, action: str, args=()):
+        self._write("hotkey", action=action, args=list(args))
+
+    def command(self, line: str):
+        self._write("command", line=line)
+
+    def clipboard(self, text: Optional[str], image: Optional["Image.Image"]):
+        data = None
+        if image is not None:
+            with io.BytesIO() as buf:
+                # Fast PNG: recording should not slow the send it records much
+                image.save(buf, "PNG", compress_level=1)
+                data = base64.b64encode(buf.getvalue()).decode("ascii")
+        self._write("clipboard", text=text or "", image=data)
+
+    def sent(self, character: str, img_num: int, pages: int):
+        self._write("sent", character=character, image=img_num, pages=pages)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def load_session(path: str) -> List[Dict[str, Any]]:
+    """Events of a session recorded by SessionRecorder."""
+    with open(path, "r", encoding="utf-8") as f:
+        events = [json.loads(line) for line in f if line.strip()]
+    if not events or events[0].get("event") != "start":
+        raise ValueError(f"Not a recorded session: {path}")
+    return events
+
+
+class FakePlatform:
+    """
+    In-memory stand-in for PlatformUtils, for running Application headless.
+
+    Clipboard payloads queued with load() are what the user had selected:
+    the next simulated Ctrl+C/X puts one on the clipboard. Pasted images are
+    collected in pasted and Enter presses counted in enters.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.image: Optional[bytes] = None
+        self.pending = deque()
+        self.pasted: List[bytes] = []
+        self.enters = 0
+
+    def load(self, text: str = "", image: Optional[bytes] = None):
+        self.pending.append((text, image))
+
+    def get_platform(self) -> str:
+        return "linux"
+
+    def copy_image_to_clipboard(self, png_bytes: bytes) -> bool:
+        self.text, self.image = "", png_bytes
+        return True
+
+    def get_text_from_clipboard(self) -> str:
+        return self.text
+
+    def get_image_from_clipboard(self) -> Optional["Image.Image"]:
+        if self.image is None:
+            return None
+        from PIL import Image
+        return Image.open(io.BytesIO(self.image))
+
+    def get_active_window_process_name(self) -> Optional[str]:
+        return None
+
+    def simulate_Ctrl_(self, key: str):
+        if key in ("c", "x") and self.pending:
+            self.text, self.image = self.pending.popleft()
+
+    def simulate_cut(self):
+        self.simulate_Ctrl_("x")
+
+    def simulate_paste(self):
+        if self.image is not None:
+            self.pasted.append(self.image)
+
+    def simulate_enter(self):
+        self.enters += 1
+
+    def lower_thread_priority(self, niceness: int = 10) -> bool:
+        return PlatformUtils.lower_thread_priority(niceness)
+
+
+class ReplayReport(NamedTuple):
+    latencies: List[float]  # Seconds per send, in order
+    succeeded: int
+    wall: float  # Seconds from the first to the last replayed event
+    pregeneration: float  # Seconds spent pre-generating base images first
+    mismatches: int  # Sends that used another base image than recorded
+    skipped: Tuple[str, ...] = ()  # Recorded commands that were not replayed
+
+    def summary(self) -> str:
+        ms = sorted(t * 1000 for t in self.latencies)
+        if not ms:
+            return "No sends replayed."
+
+        def pct(p):
+            return ms[min(len(ms) - 1, int(round(p / 100 * (len(ms) - 1))))]
+
+        throughput = len(ms) / self.wall if self.wall > 0 else float("inf")
+        return "\n".join([
+            f"Sends:        {len(ms)} ({self.succeeded} succeeded, {self.mismatches} mismatched)",
+            f"Latency:      mean {sum(ms) / len(ms):.1f} ms, p50 {pct(50):.1f} ms, p95 {pct(95):.1f} ms, max {ms[-1]:.1f} ms",
+            f"Throughput:   {throughput:.2f} sends/s over {self.wall:.2f} s",
+            f"Pre-generate: {self.pregeneration:.2f} s",
+        ] + ([f"Skipped:      {', '.join(self.skipped)}"] if self.skipped else []))
+
+
+class SessionReplayer:
+    """
+    Replays a recorded session against Application with a FakePlatform.
+
+    The application is created with the recorded seed and settings, so the
+    same expressions and backgrounds are rolled. Base images of the sent
+    characters are pre-generated first and timed separately, into data_dir
+    if given (where they persist between replays), else into a temporary
+    folder removed afterwards; the user's folder is never used by default.
+    Commands that delete files (SKIPPED_COMMANDS) are not replayed and are
+    listed in the report instead.
+    Sends then run through Application.process_generation as fast as
+    possible, or at the recorded pace with realtime. operation_timeout is
+    passed to the application instead of OPERATION_TIMEOUT: the waits for the
+    target window to react are nothing to wait for here.
+    """
+
+    def __init__(self, events: List[Dict[str, Any]], data_dir: Optional[str] = None,
+                 operation_timeout: float = 0.0, realtime: bool = False):
+        self.events = events
+        self.data_dir = data_dir
+        self.operation_timeout = operation_timeout
+        self.realtime = realtime
+        # Of the last replay: what the application pasted and what it sent
+        self.platform: Optional[FakePlatform] = None
+        self.recorder: Optional[SessionRecorder] = None
+
+    def replay(self) -> ReplayReport:
+        from src import main
+
+        start = self.events[0]
+        platform = self.platform = FakePlatform()
+        recorder = self.recorder = SessionRecorder()
+        data_dir = self.data_dir or tempfile.mkdtemp(prefix="replay-")
+        skipped = []
+        app = None
+        try:
+            app = main.Application(
+                enable_hotkeys=False,
+                seed=start["seed"],
+                data_dir=data_dir,
+                quality=start.get("quality", main.QUALITY_PRESET),
+                base_format=start.get("base_format", main.BASE_IMAGE_FORMAT),
+                render_level=start.get("render_level", main.SEND_RENDER_LEVEL),
+                recorder=recorder,
+                platform=platform,
+                operation_timeout=self.operation_timeout,
+            )
+            # No terminal to show the status and preview on
+            app.print_info = lambda: None
+
+            t0 = time.perf_counter()
+            characters = [app.get_current_character()] + [e["character"] for e in self.events if e["event"] == "sent"]
+            for character in dict.fromkeys(characters):
+                app.generate_and_save_images(character)
+            pregeneration = time.perf_counter() - t0
+
+            latencies = []
+            t0 = time.perf_counter()
+            for event in self.events[1:]:
+                if self.realtime:
+                    time.sleep(max(0.0, t0 + event["t"] - start["t"] - time.perf_counter()))
+                kind = event["event"]
+                with app.generation.foreground():
+                    if kind == "hotkey" and event["action"] in REPLAYED_ACTIONS:
+                        getattr(app, event["action"])(*event["args"])
+                    elif kind == "command":
+                        cmd = event["line"].split()[0].lower() if event["line"].strip() else ""
+                        if cmd in SKIPPED_COMMANDS:
+                            skipped.append(event["line"])
+                        elif cmd and cmd not in EXIT_COMMANDS:
+                            app.handle_command(event["line"])
+                    elif kind == "clipboard":
+                        image = base64.b64decode(event["image"]) if event["image"] else None
+                        platform.load(event["text"], image)
+                        t = time.perf_counter()
+                        app.process_generation()
+                        latencies.append(time.perf_counter() - t)
+            wall = time.perf_counter() - t0
+        finally:
+            if app is not None:
+                app.generation.cancel()
+                app.render_engine.shutdown()
+            if not self.data_dir:
+                if app is not None:
+                    app.generation.wait(timeout=10)  # The worker may still be writing there
+                shutil.rmtree(data_dir, ignore_errors=True)
+
+        expected = [(e["character"], e["image"]) for e in self.events if e["event"] == "sent"]
+        actual = [(e["character"], e["image"]) for e in recorder.events if e["event"] == "sent"]
+        mismatches = 0
+        if expected:  # Hand-written sessions may leave the expected sends out
+            mismatches = sum(a != b for a, b in zip(expected, actual)) + abs(len(expected) - len(actual))
+        if mismatches:
+            logger.warning(f"{mismatches} sends differ from the recording.")
+        if skipped:
+            logger.info(f"Not replayed: {', '.join(skipped)}")
+        return ReplayReport(latencies, len(actual), wall, pregeneration, mismatches, tuple(skipped))
@@ -0,0 +1,124 @@
+import sys
+import time
+import builtins
+import threading
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+# Time budget from process entry until the hotkey listener is up.
+STARTUP_BUDGET_MS = 300
+
+
+class StartupProfiler:
+    """
+    Records an import-time and init-time breakdown of application startup.
+
+    When enabled, top-level ``import`` statements are timed through an
+    ``__import__`` hook (nested imports are attributed to the outermost one),
+    and named init phases are timed with ``phase()``. Works the same for source
+    runs and the PyInstaller onefile build, where the bootloader unpack time is
+    reported separately.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.start = time.perf_counter()
+        self.imports: List[Tuple[str, float]] = []
+        self.phases: List[Tuple[str, float]] = []
+        self.marks: List[Tuple[str, float]] = []
+        self._depth = threading.local()
+        self._original_import = None
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def disable(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if getattr(self._depth, "value", 0):
+            return self._original_import(name, globals, locals, fromlist, level)
+
+        self._depth.value = 1
+        t0 = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth.value = 0
+            self.imports.append((name or ", ".join(fromlist or ()), time.perf_counter() - t0))
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                self.phases.append((name, time.perf_counter() - t0))
+
+    def mark(self, name: str):
+        """Record a point in time relative to process entry."""
+        if self.enabled:
+            self.marks.append((name, time.perf_counter() - self.start))
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.start) * 1000
+
+    def _bootloader_ms(self) -> Optional[float]:
+        """Time spent before Python started (onefile unpack + interpreter init)."""
+        try:
+            import psutil
+        except ImportError:
+            return None
+        try:
+            proc = psutil.Process()
+            created = proc.create_time()
+            # The onefile bootloader is the parent process that unpacks the archive
+            if getattr(sys, "frozen", False) and proc.parent() is not None:
+                parent = proc.parent()
+                if parent.name() == proc.name():
+                    created = parent.create_time()
+            return max(0.0, (time.time() - created) * 1000 - self.elapsed_ms())
+        except Exception:
+            return None
+
+    def report(self) -> str:
+        lines = ["", "=== Startup Profile ==="]
+        lines.append(f"Build:       {'onefile (frozen)' if getattr(sys, 'frozen', False) else 'source'}")
+        boot = self._bootloader_ms()
+        if boot is not None:
+            lines.append(f"Pre-main:    {boot:8.1f} ms")
+
+        lines.append("Imports:")
+        for name, seconds in sorted(self.imports, key=lambda item: -item[1]):
+            if seconds * 1000 >= 0.5:
+                lines.append(f"  {name:<36}{seconds * 1000:8.1f} ms")
+
+        total_imports = sum(seconds for _, seconds in self.imports)
+        lines.append(f"  {'(total)':<36}{total_imports * 1000:8.1f} ms")
+
+        lines.append("Init phases:")
+        for name, seconds in self.phases:
+            lines.append(f"  {name:<36}{seconds * 1000:8.1f} ms")
+
+        lines.append("Milestones:")
+        for name, seconds in self.marks:
+            flag = ""
+            if name == "listener ready" and seconds * 1000 > STARTUP_BUDGET_MS:
+                flag = f"  (over {STARTUP_BUDGET_MS} ms budget)"
+            lines.append(f"  {name:<36}{seconds * 1000:8.1f} ms{flag}")
+        lines.append("=======================")
+        return "\n".join(lines)
+
+
+profiler = StartupProfiler()
+
+# Imports happen before argparse runs, so the flag is picked up here directly.
+if "--profile-startup" in sys.argv:
+    profiler.enable()
@@ -0,0 +1,35 @@
+import sys
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.asset_registry import AssetRegistry
+from src.main import Application
+
+
+class TestApplication(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_character_without_sprites(self):
+        with mock.patch.object(AssetRegistry, "emotion_count", return_value=0):
+            with self.assertLogs("src.main", level="WARNING"):
+                app = Application(enable_hotkeys=False, seed=1, data_dir=self.tmp.name)
+            self.assertEqual(app.next_expression, 1)
+            self.assertTrue(1 <= app.next_background <= 16)
+
+            with self.assertLogs("src.main", level="WARNING") as logs:
+                app.handle_expr_cmd([])
+            self.assertIn("No expressions found", logs.output[-1])
+            self.assertIsNone(app.expression)
+
+
+if __name__ == '__main__':
+    unittest.main()
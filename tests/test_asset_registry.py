@@ -0,0 +1,106 @@
+import sys
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.core.asset_registry import AssetRegistry
+
+
+class TestAssetRegistry(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "resources")
+        os.makedirs(os.path.join(self.root, "background"))
+        os.makedirs(os.path.join(self.root, "char", "anan"))
+        for n in (1, 2, 3):
+            self._sprite("anan", n)
+        Image.new("RGB", (16, 8), (0, 0, 255)).save(os.path.join(self.root, "background", "c1.png"))
+        self.index_path = os.path.join(self.tmp.name, "assets.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _sprite(self, character, n, box=(2, 3, 6, 7)):
+        im = Image.new("RGBA", (10, 10), (0, 0, 0, 0))
+        im.paste((255, 0, 0, 255), box)
+        path = os.path.join(self.root, "char", character, f"{character} ({n}).png")
+        im.save(path)
+        return path
+
+    def test_index(self):
+        registry = AssetRegistry(self.root, self.index_path)
+        self.assertEqual(registry.characters(), ["anan"])
+        self.assertEqual(registry.emotion_count("anan"), 3)
+        self.assertEqual(registry.backgrounds(), ["c1"])
+
+        info = registry.info(registry.sprite_key("anan", 2))
+        self.assertEqual(info["size"], [10, 10])
+        self.assertEqual(info["bbox"], [2, 3, 6, 7])
+        self.assertIsNone(registry.info(registry.background_key("c1"))["bbox"])
+        self.assertIsNone(registry.info(registry.sprite_key("anan", 4)))
+
+    def test_refresh_reports_only_changed_files(self):
+        registry = AssetRegistry(self.root, self.index_path)
+        registry.refresh()
+        old_hash = registry.asset_hash(registry.sprite_key("anan", 1))
+
+        seen = []
+        registry.subscribe(seen.append)
+        self.assertEqual(registry.refresh(), [])
+
+        path = self._sprite("anan", 1, box=(0, 0, 4, 4))
+        os.utime(path, (1, 1))
+        self._sprite("anan", 4)
+        changed = registry.refresh()
+        self.assertEqual(changed, [registry.sprite_key("anan", 1), registry.sprite_key("anan", 4)])
+        self.assertEqual(seen, [changed])
+        self.assertEqual(registry.emotion_count("anan"), 4)
+        self.assertNotEqual(registry.asset_hash(registry.sprite_key("anan", 1)), old_hash)
+        self.assertEqual(AssetRegistry.character_of(changed[0]), "anan")
+
+    def test_index_is_persisted(self):
+        registry = AssetRegistry(self.root, self.index_path)
+        registry.info(registry.sprite_key("anan", 3))
+        registry.save()
+        self.assertTrue(os.path.exists(self.index_path))
+
+        reloaded = AssetRegistry(self.root, self.index_path)
+        self.assertEqual(reloaded.refresh(details=False), [])
+        with mock.patch.object(AssetRegistry, "_describe") as describe:
+            self.assertIn("hash", reloaded.info(reloaded.sprite_key("anan", 3)))
+        describe.assert_not_called()
+
+    def test_refresh_describes_only_changed_files(self):
+        registry = AssetRegistry(self.root, self.index_path)
+        path = self._sprite("anan", 2, box=(0, 0, 4, 4))
+        os.utime(path, (1, 1))
+        with mock.patch.object(AssetRegistry, "_describe", wraps=AssetRegistry._describe) as describe:
+            registry.refresh()
+        self.assertEqual([c.args[0] for c in describe.call_args_list], [registry.path(registry.sprite_key("anan", 2))])
+
+    def test_watch_polls_without_details(self):
+        registry = AssetRegistry(self.root, self.index_path)
+        polled = threading.Event()
+        calls = []
+
+        def refresh(details=True):
+            calls.append(details)
+            polled.set()
+            return []
+
+        with mock.patch.object(registry, "refresh", side_effect=refresh):
+            registry.watch(interval=0.01)
+            self.assertTrue(polled.wait(5))
+            registry.stop()
+        self.assertFalse(any(calls))
+
+
+if __name__ == '__main__':
+    unittest.main()
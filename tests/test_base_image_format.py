@@ -0,0 +1,63 @@
+import sys
+import os
+import tempfile
+import unittest
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops
+
+from src.core import base_image_format
+from src.core.image_cache import BaseImageCache, LEVELS
+
+
+class TestBaseImageFormat(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.image = Image.radial_gradient("L").resize((64, 32)).convert("RGB")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_is_rgba(self):
+        for fmt, spec in base_image_format.FORMATS.items():
+            path = os.path.join(self.tmp.name, "base" + spec["ext"])
+            base_image_format.save(self.image, path, fmt)
+            self.assertEqual(base_image_format.format_of(path), fmt)
+
+            loaded = base_image_format.load(path)
+            self.assertEqual(loaded.mode, "RGBA")
+            self.assertEqual(loaded.size, self.image.size)
+            if spec["lossless"]:
+                self.assertIsNone(ImageChops.difference(loaded.convert("RGB"), self.image).getbbox(), fmt)
+            with base_image_format.open_image(path) as im:
+                self.assertEqual(im.size, self.image.size)
+
+    def test_truncated_raw_file_is_rejected(self):
+        path = os.path.join(self.tmp.name, "base.rgba")
+        base_image_format.save(self.image, path, "raw")
+        with open(path, "r+b") as f:
+            f.truncate(100)
+        with self.assertRaises(OSError):
+            base_image_format.load(path)
+
+    def test_cache_names_follow_format(self):
+        cache = BaseImageCache(self.tmp.name, "1.0", image_format="raw")
+        self.assertTrue(cache.image_path("ema", 3, "thumb").endswith("ema (3).thumb.rgba"))
+
+        for level in LEVELS:
+            base_image_format.save(self.image, cache.image_path("ema", 3, level), "raw", level)
+        cache.record("ema", 3, {}, {"format": "raw"})
+        self.assertTrue(cache.is_fresh("ema", 3, {}, {"format": "raw"}))
+        self.assertEqual(cache.thumbnail("ema", 3).size[0], 64)
+
+        # Files left over from another format are cleared too
+        jpg_path = os.path.join(self.tmp.name, BaseImageCache.image_name("ema", 1))
+        base_image_format.save(self.image, jpg_path, "jpg")
+        self.assertEqual(cache.clear(["ema"]), len(LEVELS) + 1)
+        self.assertEqual(os.listdir(self.tmp.name), ["manifest.json"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import sys
+import os
+import tempfile
+import unittest
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops
+
+from src.core.compositor import SpriteCompositor
+
+
+class TestSpriteCompositor(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.bg_path = os.path.join(self.tmp.name, "bg.png")
+        self.sprite_path = os.path.join(self.tmp.name, "sprite.png")
+        Image.radial_gradient("L").resize((120, 80)).convert("RGB").save(self.bg_path)
+        sprite = Image.new("RGBA", (40, 40), (0, 0, 0, 0))
+        sprite.paste((255, 0, 0, 128), (5, 8, 30, 35))
+        sprite.paste((0, 255, 0, 255), (10, 12, 20, 20))
+        sprite.save(self.sprite_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_matches_rgba_paste(self):
+        expected = Image.open(self.bg_path).convert("RGBA")
+        sprite = Image.open(self.sprite_path).convert("RGBA")
+        expected.paste(sprite, (50, 30), sprite)
+
+        result = SpriteCompositor().compose(self.bg_path, self.sprite_path, (50, 30))
+        self.assertEqual(result.mode, "RGB")
+        self.assertIsNone(ImageChops.difference(result, expected.convert("RGB")).getbbox())
+
+    def test_sources_decoded_once_per_hash(self):
+        compositor = SpriteCompositor()
+        first = compositor.background(self.bg_path, "a")
+        self.assertIs(compositor.background(self.bg_path, "a"), first)
+        self.assertIsNot(compositor.background(self.bg_path, "b"), first)
+
+        sprite, offset = compositor.sprite(self.sprite_path, "a")
+        self.assertEqual((sprite.size, offset), ((25, 27), (5, 8)))
+        compositor.clear()
+        self.assertIsNot(compositor.background(self.bg_path, "a"), first)
+
+
+if __name__ == '__main__':
+    unittest.main()
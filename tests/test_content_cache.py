@@ -0,0 +1,87 @@
+import sys
+import os
+import io
+import unittest
+from unittest import mock
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.core import content_cache as content_cache_module
+from src.core.content_cache import ContentCache, content_cache, content_digest
+from src.core.image_processor import ImageProcessor
+
+
+def png_bytes(image):
+    buf = io.BytesIO()
+    image.save(buf, "PNG")
+    return buf.getvalue()
+
+
+class TestContentCache(unittest.TestCase):
+    def test_digest_of_file_and_pixels(self):
+        image = Image.radial_gradient("L").resize((40, 30)).convert("RGB")
+        data = png_bytes(image)
+        self.assertEqual(content_digest(Image.open(io.BytesIO(data))), content_digest(Image.open(io.BytesIO(data))))
+        self.assertEqual(content_digest(image), content_digest(image.copy()))
+        other = image.copy()
+        other.putpixel((0, 0), (1, 2, 3))
+        self.assertNotEqual(content_digest(image), content_digest(other))
+
+        # A decoded image is hashed by its pixels, not a stale file
+        opened = Image.open(io.BytesIO(data))
+        opened.load()
+        self.assertEqual(content_digest(opened), content_digest(image))
+
+    def test_digest_in_bands(self):
+        image = Image.radial_gradient("L").resize((64, 50)).convert("RGB")
+        whole = content_digest(image)
+        # A band of 5 rows at a time hashes the same bytes
+        with mock.patch.object(content_cache_module, "DIGEST_CHUNK_BYTES", 64 * 3 * 5), \
+                mock.patch.object(Image.Image, "tobytes", autospec=True, side_effect=Image.Image.tobytes) as tobytes:
+            self.assertEqual(content_digest(image), whole)
+        self.assertEqual(tobytes.call_count, 10)
+        self.assertTrue(all(call.args[0].height == 5 for call in tobytes.call_args_list))
+
+    def test_image_at_size_is_not_cached(self):
+        cache = ContentCache()
+        image = Image.open(io.BytesIO(png_bytes(Image.new("RGB", (30, 20), (1, 2, 3)))))
+        resize = mock.Mock(side_effect=lambda im, size, resample, gap: im)
+        self.assertIs(cache.resized(image, (30, 20), Image.Resampling.LANCZOS, 2.0, resize), image)
+        self.assertEqual((cache.nbytes, cache.hits + cache.misses), (0, 0))
+
+        # Nor is a resize that hands back its input
+        self.assertIs(cache.resized(image, (15, 10), Image.Resampling.LANCZOS, 2.0, resize), image)
+        self.assertEqual(cache.nbytes, 0)
+
+    def test_repeated_paste_reuses_resize(self):
+        data = png_bytes(Image.radial_gradient("L").resize((300, 200)).convert("RGBA"))
+        base = Image.new("RGBA", (400, 200), (20, 30, 40, 255))
+        options = {"top_left": (50, 20), "bottom_right": (350, 180), "compress": False}
+
+        content_cache.enabled = False
+        try:
+            expected = ImageProcessor.paste_image(base, content_image=Image.open(io.BytesIO(data)), **options)
+        finally:
+            content_cache.enabled = True
+        content_cache.clear()
+        hits = content_cache.hits
+        results = [ImageProcessor.paste_image(base, content_image=Image.open(io.BytesIO(data)), **options) for _ in range(3)]
+        self.assertEqual(results, [expected] * 3)
+        self.assertEqual(content_cache.hits - hits, 2)
+
+    def test_bounded_by_bytes(self):
+        cache = ContentCache(max_bytes=3 * 10 * 10 * 4)
+        for i in range(5):
+            cache.put(("k", i), Image.new("RGBA", (10, 10)))
+        self.assertEqual(cache.nbytes, 3 * 400)
+        self.assertIsNone(cache.get(("k", 0)))
+        self.assertIsNotNone(cache.get(("k", 4)))
+        cache.put(("big",), Image.new("RGBA", (100, 100)))
+        self.assertIsNone(cache.get(("big",)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import sys
+import os
+import threading
+import unittest
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.generation_jobs import GenerationManager
+
+
+class TestGenerationManager(unittest.TestCase):
+    def setUp(self):
+        self.built = []
+        self.flushed = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.manager = GenerationManager(self._plan, self._build, self._flush)
+
+    def _plan(self, character):
+        # Like the real planner, only images not built yet
+        return {n: f"{character}-{n}" for n in range(1, 6) if (character, n) not in self.built}
+
+    def _build(self, character, img_num, payload):
+        self.gate.wait(5)
+        self.built.append((character, img_num))
+
+    def _flush(self, character, final):
+        if final:
+            self.flushed.append(character)
+
+    def test_urgent_image_first_and_duplicates_merged(self):
+        self.manager.focus("ema")
+        job = self.manager.submit("ema", first=[4])
+        self.assertIs(self.manager.submit("ema"), job)
+        self.assertTrue(self.manager.wait(timeout=5))
+
+        self.assertEqual(self.built[0], ("ema", 4))
+        self.assertEqual(sorted(self.built), [("ema", n) for n in range(1, 6)])
+        self.assertEqual(job.status(), {"character": "ema", "state": "done", "done": 5, "total": 5})
+        self.assertIn("ema", self.flushed)
+
+    def test_switching_cancels_other_characters(self):
+        self.gate.clear()
+        self.manager.focus("ema")
+        ema = self.manager.submit("ema")
+        self.manager.focus("hiro")
+        hiro = self.manager.submit("hiro")
+        self.gate.set()
+        self.assertTrue(self.manager.wait(timeout=5))
+
+        self.assertEqual(ema.state, "cancelled")
+        self.assertEqual(hiro.state, "done")
+        # At most the image in flight when the switch happened was built for ema
+        self.assertLessEqual(len([b for b in self.built if b[0] == "ema"]), 1)
+        self.assertEqual(len([b for b in self.built if b[0] == "hiro"]), 5)
+        self.assertEqual([s["character"] for s in self.manager.status()], ["ema", "hiro"])
+
+    def test_foreground_pauses_generation(self):
+        manager = GenerationManager(self._plan, self._build, self._flush, resume_delay=0.05)
+        with manager.foreground():
+            manager.submit("ema")
+            self.assertFalse(manager.wait(timeout=0.2))
+            self.assertEqual(self.built, [])
+        self.assertTrue(manager.wait(timeout=5))
+        self.assertEqual(len(self.built), 5)
+
+    def test_failed_build_ends_job(self):
+        manager = GenerationManager(self._plan, lambda c, n, p: 1 / 0, self._flush)
+        job = manager.submit("ema")
+        self.assertTrue(manager.wait(timeout=5))
+        self.assertEqual(job.state, "failed")
+        self.assertEqual(self.flushed, ["ema"])
+
+
+if __name__ == '__main__':
+    unittest.main()
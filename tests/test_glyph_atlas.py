@@ -0,0 +1,76 @@
+import sys
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from src.core.glyph_atlas import GlyphAtlas
+
+
+class TestGlyphAtlas(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The atlas only caches fonts loaded from a file: save Pillow's default font to one
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.font_path = os.path.join(cls.tmp.name, "default.ttf")
+        with open(cls.font_path, "wb") as f:
+            f.write(ImageFont.load_default(12).path.getvalue())
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def font(self, size):
+        return ImageFont.truetype(self.font_path, size)
+
+    def test_matches_imagedraw_text(self):
+        atlas = GlyphAtlas()
+        for size in (9, 13, 40):
+            font = self.font(size)
+            for text in ("Hello, World!", "AVATAR To.", "  x  ", "jj_fff{yj}/W"):
+                expected = Image.new("RGBA", (400, 70), (0, 0, 0, 0))
+                ImageDraw.Draw(expected).text((7, 5), text, font=font, fill=(255, 200, 0))
+                actual = Image.new("RGBA", (400, 70), (0, 0, 0, 0))
+                self.assertTrue(atlas.draw(actual, (7, 5), text, font, (255, 200, 0)))
+                self.assertIsNone(ImageChops.difference(expected, actual).getbbox(), (size, text))
+        self.assertGreater(atlas.hits, 0)
+
+    def test_complex_runs_fall_back(self):
+        font = self.font(20)
+        atlas = GlyphAtlas()
+        layer = Image.new("RGBA", (100, 30))
+        self.assertFalse(atlas.draw(layer, (0, 0), "e\u0301", font, (255, 255, 255)))
+        self.assertFalse(atlas.draw(layer, (0, 0), "hi \U0001F600", font, (255, 255, 255)))
+        self.assertFalse(atlas.draw(layer, (0, 0), "مرحبا", font, (255, 255, 255)))
+        # Sub-pixel positions and fonts without a file are left to ImageDraw.text
+        self.assertFalse(atlas.draw(layer, (0.5, 0), "plain", font, (255, 255, 255)))
+        self.assertFalse(atlas.draw(layer, (0, 0), "plain", ImageFont.load_default(20), (255, 255, 255)))
+        atlas.enabled = False
+        self.assertFalse(atlas.draw(layer, (0, 0), "plain", font, (255, 255, 255)))
+        self.assertIsNone(layer.getbbox())
+
+    def test_font_that_differs_is_not_used(self):
+        font = self.font(20)
+        atlas = GlyphAtlas()
+        layer = Image.new("RGBA", (100, 30))
+        with mock.patch.object(GlyphAtlas, "_matches", return_value=False) as matches:
+            self.assertFalse(atlas.draw(layer, (0, 0), "plain", font, (255, 255, 255)))
+            self.assertFalse(atlas.draw(layer, (0, 0), "other", font, (255, 255, 255)))
+        self.assertEqual(matches.call_count, 1)
+        self.assertIsNone(layer.getbbox())
+        self.assertTrue(atlas.draw(layer, (0, 0), "plain", self.font(21), (255, 255, 255)))
+
+    def test_lru_is_bounded(self):
+        font = self.font(12)
+        atlas = GlyphAtlas(max_glyphs=4)
+        atlas.draw(Image.new("RGBA", (200, 20)), (0, 0), "abcdefgh", font, (255, 255, 255))
+        self.assertEqual(len(atlas._glyphs), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
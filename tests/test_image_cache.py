@@ -0,0 +1,94 @@
+import sys
+import os
+import tempfile
+import unittest
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.image_cache import BaseImageCache, LEVELS
+
+
+class TestBaseImageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _touch(self, character, img_num, levels=("full",)):
+        for level in levels:
+            with open(os.path.join(self.folder, BaseImageCache.image_name(character, img_num, level)), "wb") as f:
+                f.write(b"x")
+
+    def test_fresh_only_when_inputs_match(self):
+        cache = BaseImageCache(self.folder, "1.0")
+        sources = {"bg": "a", "char": "b"}
+        params = {"format": "jpg"}
+        self.assertFalse(cache.is_fresh("ema", 1, sources, params))
+
+        self._touch("ema", 1)
+        cache.record("ema", 1, sources, params)
+        self.assertFalse(cache.is_fresh("ema", 1, sources, params))
+
+        self._touch("ema", 1, LEVELS)
+        cache.record("ema", 1, sources, params)
+        cache.save()
+        self.assertTrue(cache.is_fresh("ema", 1, sources, params))
+        self.assertFalse(cache.is_fresh("ema", 1, {"bg": "a", "char": "c"}, params))
+
+        reloaded = BaseImageCache(self.folder, "1.0")
+        self.assertTrue(reloaded.is_fresh("ema", 1, sources, params))
+        self.assertFalse(BaseImageCache(self.folder, "2.0").is_fresh("ema", 1, sources, params))
+
+    def test_clear_is_selective(self):
+        cache = BaseImageCache(self.folder, "1.0")
+        for name in ("ema", "hiro"):
+            self._touch(name, 1, LEVELS)
+            cache.record(name, 1, {}, {})
+
+        self.assertEqual(cache.clear(["ema"]), len(LEVELS))
+        self.assertEqual(cache.characters(), ["hiro"])
+        self.assertTrue(os.path.exists(cache.image_path("hiro", 1)))
+        self.assertFalse(os.path.exists(cache.image_path("ema", 1)))
+
+    def test_clear_keeps_other_files(self):
+        cache = BaseImageCache(self.folder, "1.0")
+        self._touch("ema", 1, LEVELS)
+        cache.record("ema", 1, {}, {})
+        # Left over from another storage format, not in the manifest
+        with open(os.path.join(self.folder, BaseImageCache.image_name("hiro", 2, "thumb", "png")), "wb") as f:
+            f.write(b"x")
+        kept = ["photo.png", "notes (1).txt", "ema (1).draft.jpg", "manifest.json"]
+        for name in kept:
+            with open(os.path.join(self.folder, name), "wb") as f:
+                f.write(b"x")
+
+        self.assertEqual(cache.clear(), len(LEVELS) + 1)
+        self.assertEqual(sorted(os.listdir(self.folder)), sorted(kept))
+
+    def test_enforce_budget_evicts_least_recently_used(self):
+        cache = BaseImageCache(self.folder, "1.0", budget_bytes=2)
+        for name in ("ema", "hiro", "noa"):
+            self._touch(name, 1)
+            cache.record(name, 1, {}, {})
+        cache._entries[cache.image_name("ema", 1)]["last_used"] = 0
+        cache._entries[cache.image_name("hiro", 1)]["last_used"] = 1
+        cache._entries[cache.image_name("noa", 1)]["last_used"] = 2
+        cache.touch("ema", 1)
+
+        self.assertEqual(cache.usage()["bytes"], 3)
+        self.assertEqual(cache.enforce_budget(protect=["noa"]), 1)
+        self.assertEqual(cache.characters(), ["ema", "noa"])
+        self.assertFalse(os.path.exists(cache.image_path("hiro", 1)))
+
+    def test_best_level_is_smallest_covering_size(self):
+        sizes = {"full": (2560, 834), "output": (1200, 390), "thumb": (320, 104)}
+        self.assertEqual(BaseImageCache.best_level((300, 100), sizes), "thumb")
+        self.assertEqual(BaseImageCache.best_level((960, 320), sizes), "output")
+        self.assertEqual(BaseImageCache.best_level((2000, 320), sizes), "full")
+
+
+if __name__ == '__main__':
+    unittest.main()
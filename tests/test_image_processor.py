@@ -0,0 +1,131 @@
+import sys
+import os
+import unittest
+from unittest import mock
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops, ImageDraw, ImageFont
+
+from src.core import image_processor
+from src.core.image_processor import ImageProcessor, _fit_text
+
+
+class TestImageProcessor(unittest.TestCase):
+    def test_layered_shadow_matches_double_draw(self):
+        font = ImageFont.load_default(40)
+        base = Image.new("RGBA", (300, 80), (200, 50, 50, 255))
+
+        expected = base.copy()
+        draw = ImageDraw.Draw(expected)
+        draw.text((14, 14), "Hello", font=font, fill=(0, 0, 0))
+        draw.text((10, 10), "Hello", font=font, fill=(255, 255, 0))
+
+        layer = Image.new("RGBA", base.size, (0, 0, 0, 0))
+        ImageDraw.Draw(layer).text((10, 10), "Hello", font=font, fill=(255, 255, 0))
+        actual = base.copy()
+        ImageProcessor._composite_with_shadow(actual, layer, (0, 0), (4, 4))
+
+        self.assertIsNone(ImageChops.difference(expected, actual).getbbox())
+
+    def test_oversized_content_is_reduced_first(self):
+        content = Image.radial_gradient("L").resize((1000, 700)).convert("RGB")
+        with mock.patch.object(image_processor, "MAX_CONTENT_PIXELS", 500_000), \
+                mock.patch.object(Image.Image, "reduce", autospec=True, side_effect=Image.Image.reduce) as reduce:
+            fitted = ImageProcessor._fit_content(content, (90, 60))
+        self.assertEqual(fitted.size, (90, 60))
+        # 1000 // 90 = 11, 700 // 60 = 11: still at least the target size after reducing
+        reduce.assert_called_once_with(content, 11)
+        expected = content.resize((90, 60), Image.Resampling.LANCZOS)
+        self.assertLess(max(ImageChops.difference(fitted, expected).getextrema())[1], 16)
+
+        with mock.patch.object(image_processor, "MAX_CONTENT_PIXELS", 500_000):
+            base = Image.new("RGBA", (400, 200), (20, 30, 40, 255))
+            png = ImageProcessor.paste_image(base, (50, 20), (350, 180), content, compress=False)
+        self.assertTrue(png.startswith(b"\x89PNG"))
+
+    def test_contact_sheet_grid(self):
+        tiles = [Image.new("RGB", (32, 10), (255, 0, 0)), None, Image.new("RGB", (32, 10), (0, 255, 0))]
+        sheet = ImageProcessor.make_contact_sheet(tiles, columns=2, tile_size=(32, 10), spacing=4)
+        self.assertEqual(sheet.size, (2 * 36 + 4, 2 * 14 + 4))
+        self.assertEqual(sheet.getpixel((30, 12)), (255, 0, 0))
+        self.assertEqual(sheet.getpixel((66, 12)), (64, 64, 64))
+        self.assertEqual(sheet.getpixel((30, 26)), (0, 255, 0))
+
+    def test_bracket_segments_carry_state(self):
+        segs, in_bracket = ImageProcessor._bracket_segments("a【b", False)
+        self.assertEqual(segs, [("a", False), ("【", True), ("b", True)])
+        self.assertTrue(in_bracket)
+
+        segs, in_bracket = ImageProcessor._bracket_segments("c】d", in_bracket)
+        self.assertEqual(segs, [("c", True), ("】", True), ("d", False)])
+        self.assertFalse(in_bracket)
+
+        # Text before a stray closing bracket is highlighted too
+        segs, _ = ImageProcessor._bracket_segments("x]y", False)
+        self.assertEqual(segs, [("x", True), ("]", True), ("y", False)])
+
+    def test_fit_text_runs_span_lines(self):
+        layout = ImageProcessor.fit_text("【one\ntwo】 three", (400, 200), None, 0.15, 30)
+        self.assertEqual(len(layout.runs), 2)
+        first, second = layout.runs
+        self.assertEqual([(t, h) for _, t, h in first], [("【", True), ("one", True)])
+        self.assertEqual([(t, h) for _, t, h in second], [("two", True), ("】", True), (" three", False)])
+        self.assertEqual(first[0][0], 0)
+        self.assertGreater(first[1][0], 0)
+
+    def test_fit_text_is_cached_across_base_images(self):
+        _fit_text.cache_clear()
+        layout = ImageProcessor.fit_text("some words to wrap around", (120, 90), None, 0.15, 40)
+        self.assertTrue(0 < layout.font_size <= 40)
+        self.assertEqual(len(layout.lines), len(layout.widths))
+        self.assertTrue(all(w <= 120 for w in layout.widths))
+        self.assertEqual(layout.block_height, layout.line_height * len(layout.lines))
+
+        for color in ((10, 10, 10), (200, 200, 200)):
+            ImageProcessor.draw_text(Image.new("RGB", (200, 150), color), (40, 30), (160, 120), "some words to wrap around",
+                                     max_font_height=40, compress=False)
+        info = _fit_text.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 2))
+
+    def test_fit_text_keeps_minimum_size(self):
+        text = "far too many words for such a small box " * 10
+        self.assertLess(ImageProcessor.fit_text(text, (120, 90), None, 0.15, 40).font_size, 16)
+        layout = ImageProcessor.fit_text(text, (120, 90), None, 0.15, 40, min_font_height=16)
+        self.assertEqual(layout.font_size, 16)
+
+    def test_paginate_text_breaks_between_sentences(self):
+        sentences = [f"Sentence {i} is here." for i in range(40)]
+        text = " ".join(sentences)
+        pages = ImageProcessor.paginate_text(text, (0, 0), (300, 100), 20)
+        self.assertGreater(len(pages), 1)
+        self.assertEqual(" ".join(pages), text)
+        for page in pages:
+            self.assertTrue(page.endswith("."))
+            layout = ImageProcessor.fit_text(page, (300, 100), None, 0.15, 20, 20)
+            self.assertLessEqual(layout.block_height, 100)
+            self.assertTrue(all(w <= 300 for w in layout.widths))
+
+        self.assertEqual(ImageProcessor.paginate_text("Short.", (0, 0), (300, 100), 20), ["Short."])
+
+    def test_paginate_text_keeps_text_that_fits(self):
+        for text in ("  indented\ncode  ", "  \n", ""):
+            self.assertEqual(ImageProcessor.paginate_text(text, (0, 0), (300, 100), 20), [text])
+        # Whitespace is only stripped where pages were split
+        text = "  " + " ".join(f"Sentence {i} is here." for i in range(40)) + "\n"
+        pages = ImageProcessor.paginate_text(text, (0, 0), (300, 100), 20)
+        self.assertTrue(pages[0].startswith("  Sentence 0"))
+        self.assertTrue(pages[-1].endswith(".\n"))
+        self.assertTrue(all(page == page.strip() for page in pages[1:-1]))
+
+    def test_paginate_text_caps_pages(self):
+        text = "这句话会一直重复下去。" * 10000
+        pages = ImageProcessor.paginate_text(text, (0, 0), (300, 100), 20, max_pages=3)
+        self.assertEqual(len(pages), 3)
+        self.assertTrue(pages[-1].endswith("…"))
+        self.assertTrue(text.startswith("".join(pages)[:-1]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import sys
+import os
+import io
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.utils import kitty_utils
+
+
+class _FakeStdout(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.buffer = io.BytesIO()
+
+
+class TestPreviewCache(unittest.TestCase):
+    def test_repeated_preview_only_places_image(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "preview.jpg")
+            Image.new("RGB", (2560, 834), (10, 20, 30)).save(path)
+            cache = kitty_utils.PreviewCache()
+
+            first = cache.sequence(path, max_size=(320, 120))
+            self.assertIn(b"a=T", first)
+            self.assertIn(b"i=1", first)
+
+            second = cache.sequence(path, max_size=(320, 120))
+            self.assertEqual(second, b"\x1b_Ga=p,i=1,q=2\x1b\\")
+
+    def test_evicted_images_are_deleted_from_terminal(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = kitty_utils.PreviewCache(max_images=1)
+            paths = []
+            for i in range(2):
+                paths.append(os.path.join(tmp, f"{i}.png"))
+                Image.new("RGB", (8, 8)).save(paths[-1])
+
+            cache.sequence(paths[0], max_size=(8, 8))
+            self.assertIn(b"a=d,d=I,i=1", cache.sequence(paths[1], max_size=(8, 8)))
+
+
+class TestTerminalWriter(unittest.TestCase):
+    def test_pending_frame_is_replaced_by_newer_one(self):
+        writer = kitty_utils.TerminalWriter()
+        release = threading.Event()
+
+        def slow_frame():
+            release.wait(5)
+            return b"first"
+
+        with mock.patch.object(sys, "stdout", _FakeStdout()) as out:
+            writer.submit(slow_frame)
+            time.sleep(0.05)
+            writer.submit(b"stale")
+            writer.submit(b"latest")
+            release.set()
+            self.assertTrue(writer.wait_idle(5))
+        self.assertEqual(out.buffer.getvalue(), b"firstlatest")
+
+
+if __name__ == '__main__':
+    unittest.main()
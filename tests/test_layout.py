@@ -0,0 +1,39 @@
+import sys
+import os
+import unittest
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import LAYOUT_DEFAULTS, TEXT_CONFIGS
+from src.core.layout import LayoutTemplate
+
+
+class TestLayoutTemplate(unittest.TestCase):
+    def test_character_overrides_defaults(self):
+        self.assertEqual(LayoutTemplate.compile("anan").bracket_color, (159, 145, 251))
+        self.assertEqual(LayoutTemplate.compile("sherri").bracket_color, LAYOUT_DEFAULTS["bracket_color"])
+
+    def test_name_plate_skips_placeholders(self):
+        layout = LayoutTemplate.compile("sherri")
+        self.assertEqual(len(layout.name_plate), 3)
+        self.assertEqual(layout.text_configs()["sherri"][0]["text"], TEXT_CONFIGS["sherri"][0]["text"])
+
+    def test_compiled_once_and_plate_keyed_by_content(self):
+        layout = LayoutTemplate.compile("ema", "c1")
+        self.assertIs(layout, LayoutTemplate.compile("ema", "c1"))
+        # One name plate per character and scale, not per background or text style
+        self.assertEqual(layout.plate_key, LayoutTemplate.compile("ema", "c2").plate_key)
+        self.assertEqual(layout.plate_key, layout._replace(text_box=((0, 0), (10, 10)), text_color=(0, 0, 0)).plate_key)
+        self.assertNotEqual(layout.plate_key, LayoutTemplate.compile("hiro", "c1").plate_key)
+        self.assertNotEqual(layout.plate_key, layout._replace(name_shadow=5).plate_key)
+
+    def test_scaled(self):
+        layout = LayoutTemplate.compile("ema").scaled(0.5)
+        self.assertEqual(layout.scale, 0.5)
+        self.assertEqual(layout.text_options()["layout_scale"], 0.5)
+        self.assertNotEqual(layout.plate_key, LayoutTemplate.compile("ema").plate_key)
+
+
+if __name__ == '__main__':
+    unittest.main()
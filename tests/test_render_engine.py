@@ -0,0 +1,104 @@
+import sys
+import os
+import tempfile
+import unittest
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.core.render_engine import RenderEngine, RenderJob
+
+
+TEXT_CONFIGS = {
+    "test": [
+        {"text": "N", "position": (10, 5), "font_color": (255, 0, 0), "font_size": 20},
+        {"text": "ame", "position": (30, 10), "font_color": (255, 255, 255), "font_size": 12},
+    ]
+}
+
+
+class TestRenderEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base_path = os.path.join(self.tmp.name, "base.png")
+        Image.new("RGB", (200, 80), (30, 60, 90)).save(self.base_path)
+        self.options = {
+            "top_left": (20, 30),
+            "bottom_right": (190, 75),
+            "color": (255, 255, 255),
+            "role_name": "test",
+            "text_configs_dict": TEXT_CONFIGS,
+            "compress": False,
+        }
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_render_many_matches_sequential_renders(self):
+        jobs = [RenderJob(self.base_path, text=f"line {i}", options=self.options) for i in range(6)]
+        image_options = {k: v for k, v in self.options.items() if k != "color"}
+        jobs.append(RenderJob(self.base_path, image=Image.new("RGB", (40, 20), (0, 255, 0)), options=image_options))
+
+        engine = RenderEngine(max_workers=3)
+        try:
+            parallel = engine.render_many(jobs)
+        finally:
+            engine.shutdown()
+        sequential = [RenderEngine(max_workers=1).render(job) for job in jobs]
+        self.assertEqual(parallel, sequential)
+
+    def test_base_images_and_name_plates_are_shared(self):
+        engine = RenderEngine(max_workers=1)
+        self.assertIs(engine.base_image(self.base_path), engine.base_image(self.base_path))
+        plate = engine.name_plate("test", TEXT_CONFIGS, None)
+        self.assertIsNotNone(plate)
+        self.assertIs(plate, engine.name_plate("test", TEXT_CONFIGS, None))
+        # Keyed on the contents of the name config, not on the dict object
+        self.assertIs(plate, engine.name_plate("test", {"test": [dict(cfg) for cfg in TEXT_CONFIGS["test"]]}, None))
+        self.assertIsNot(plate, engine.name_plate("test", {"test": TEXT_CONFIGS["test"][:1]}, None))
+
+        # Rendering must not draw on the shared base image
+        before = engine.base_image(self.base_path).tobytes()
+        engine.render(RenderJob(self.base_path, text="hello", options=self.options))
+        self.assertEqual(engine.base_image(self.base_path).tobytes(), before)
+
+    def test_quality_preset_per_request(self):
+        engine = RenderEngine(max_workers=1)
+        default = engine.render(RenderJob(self.base_path, text="hello", options=self.options))
+        best = engine.render(RenderJob(self.base_path, text="hello", options=dict(self.options, quality="best")))
+        fast = engine.render(RenderJob(self.base_path, text="hello", options=dict(self.options, quality="fast")))
+        self.assertEqual(best, default)
+        self.assertNotEqual(fast, default)
+        with self.assertRaises(ValueError):
+            engine.render(RenderJob(self.base_path, text="hello", options=dict(self.options, quality="ultra")))
+
+    def test_long_text_is_paginated(self):
+        engine = RenderEngine(max_workers=1)
+        short = RenderJob(self.base_path, text="hello", options=dict(self.options, min_font_height=12))
+        self.assertEqual(engine.paginate(short), [short])
+        for text in ("  \n", "  indented\ncode  "):
+            job = RenderJob(self.base_path, text=text, options=dict(self.options, min_font_height=12))
+            self.assertEqual(engine.paginate(job), [job])
+        self.assertEqual(engine.paginate(RenderJob(self.base_path, text="hello " * 50, options=self.options))[0].text, "hello " * 50)
+
+        text = " ".join(f"Line {i}." for i in range(30))
+        pages = engine.paginate(RenderJob(self.base_path, text=text, options=dict(self.options, min_font_height=12)))
+        self.assertGreater(len(pages), 1)
+        self.assertEqual(" ".join(job.text for job in pages), text)
+        self.assertEqual(len(engine.render_many(pages)), len(pages))
+
+    def test_jobs_do_not_share_options(self):
+        job = RenderJob(self.base_path, text="hello")
+        self.assertIsNone(job.options)
+        self.assertIsNone(RenderJob(self.base_path).options)
+        self.assertEqual(RenderEngine._options(job), {})
+
+    def test_job_without_content_is_rejected(self):
+        with self.assertRaises(ValueError):
+            RenderEngine(max_workers=1).render(RenderJob(self.base_path, options=self.options))
+
+
+if __name__ == '__main__':
+    unittest.main()
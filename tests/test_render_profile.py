@@ -0,0 +1,56 @@
+import sys
+import os
+import unittest
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src.core.image_processor import ImageProcessor
+from src.utils.render_profile import render_profiler
+
+
+class TestRenderProfile(unittest.TestCase):
+    def tearDown(self):
+        render_profiler.disable()
+
+    def test_profiler_records_render_stages(self):
+        base = Image.new("RGBA", (200, 150), (20, 30, 40, 255))
+        content = Image.new("RGB", (50, 40), (200, 100, 0))
+        self.assertIs(render_profiler.begin("a"), render_profiler.begin("b"))
+
+        render_profiler.enable()
+        with self.assertLogs("src.utils.render_profile", level="INFO") as logs:
+            ImageProcessor.draw_text(base, (40, 30), (160, 120), "profiled", max_font_height=40)
+        name, seconds, _, gc_runs, stages = render_profiler.last
+        self.assertEqual(name, "draw_text")
+        self.assertEqual([s[0] for s in stages], ["base", "layout", "text", "name plate", "compress", "encode"])
+        self.assertGreaterEqual(seconds, sum(s[1] for s in stages))
+        self.assertGreaterEqual(gc_runs, 0)
+        self.assertIn("=== Render Profile: draw_text ===", logs.output[0])
+
+        ImageProcessor.paste_image(base, (40, 30), (160, 120), content)
+        self.assertEqual(render_profiler.last[0], "paste_image")
+        self.assertEqual([s[0] for s in render_profiler.last[4]],
+                         ["base", "name plate", "compress", "fit content", "paste", "encode"])
+
+    def test_canvas_reuse_keeps_output_and_base(self):
+        base = Image.new("RGB", (200, 150), (20, 30, 40))
+        other = Image.new("RGBA", (200, 150), (90, 10, 10, 255))
+        pixels = base.tobytes()
+        options = {"max_font_height": 40, "compress": False}
+
+        first = ImageProcessor.draw_text(base, (40, 30), (160, 120), "same text", **options)
+        ImageProcessor.draw_text(other, (40, 30), (160, 120), "other text", **options)
+        self.assertEqual(ImageProcessor.draw_text(base, (40, 30), (160, 120), "same text", **options), first)
+        self.assertEqual(base.tobytes(), pixels)
+
+        canvas = ImageProcessor._canvas(base)
+        self.assertIs(ImageProcessor._canvas(other), canvas)
+        self.assertEqual(canvas.mode, "RGBA")
+        self.assertEqual(canvas.getpixel((0, 0)), (90, 10, 10, 255))
+
+
+if __name__ == '__main__':
+    unittest.main()
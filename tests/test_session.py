@@ -0,0 +1,118 @@
+import sys
+import os
+import io
+import base64
+import tempfile
+import unittest
+from unittest import mock
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from src import main
+from src.core.asset_registry import AssetRegistry
+from src.utils.platform_utils import PlatformUtils
+from src.utils.session import FakePlatform, ReplayReport, SessionRecorder, SessionReplayer, load_session
+
+
+class TestSession(unittest.TestCase):
+    def test_recorded_session_round_trips(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "session.jsonl")
+            recorder = SessionRecorder(path)
+            recorder.start(42, quality="fast")
+            recorder.hotkey("switch_character", (3,))
+            recorder.command("bg 2")
+            recorder.clipboard("你好", None)
+            recorder.clipboard("", Image.new("RGB", (4, 3), (1, 2, 3)))
+            recorder.sent("sherri", 17, 1)
+            recorder.close()
+
+            events = load_session(path)
+            self.assertEqual([e["event"] for e in events], ["start", "hotkey", "command", "clipboard", "clipboard", "sent"])
+            self.assertEqual((events[0]["seed"], events[0]["quality"]), (42, "fast"))
+            self.assertEqual(events[1]["args"], [3])
+            self.assertEqual((events[3]["text"], events[3]["image"]), ("你好", None))
+            self.assertEqual(events[5]["image"], 17)
+            self.assertEqual(sorted(e["t"] for e in events), [e["t"] for e in events])
+
+            with open(path, "w", encoding="utf-8") as f:
+                f.write('{"t": 0, "event": "sent"}\n')
+            with self.assertRaises(ValueError):
+                load_session(path)
+
+    def test_in_memory_recorder(self):
+        recorder = SessionRecorder()
+        recorder.start(1)
+        recorder.sent("sherri", 1, 2)
+        self.assertEqual([e["event"] for e in recorder.events], ["start", "sent"])
+
+    def test_fake_platform_clipboard(self):
+        platform = FakePlatform()
+        png = io.BytesIO()
+        Image.new("RGB", (2, 2)).save(png, "PNG")
+        platform.load("first")
+        platform.load("", png.getvalue())
+
+        self.assertEqual(platform.get_text_from_clipboard(), "")
+        platform.simulate_Ctrl_("c")
+        self.assertEqual(platform.get_text_from_clipboard(), "first")
+        self.assertIsNone(platform.get_image_from_clipboard())
+        platform.simulate_Ctrl_("c")
+        self.assertEqual(platform.get_image_from_clipboard().size, (2, 2))
+
+        platform.copy_image_to_clipboard(b"rendered")
+        platform.simulate_paste()
+        platform.simulate_enter()
+        self.assertEqual((platform.pasted, platform.enters), ([b"rendered"], 1))
+
+    def test_replay_headless(self):
+        photo = io.BytesIO()
+        Image.new("RGB", (40, 30), (200, 10, 10)).save(photo, "PNG")
+        photo = base64.b64encode(photo.getvalue()).decode("ascii")
+        events = [
+            {"t": 0.0, "event": "start", "seed": 7},
+            {"t": 0.0, "event": "clipboard", "text": "hello", "image": None},
+            {"t": 0.0, "event": "command", "line": "clear"},
+            {"t": 0.0, "event": "clipboard", "text": "", "image": photo},
+            {"t": 0.0, "event": "clipboard", "text": "", "image": None},
+        ]
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(AssetRegistry, "emotion_count", return_value=1):
+            replayer = SessionReplayer(events, data_dir=tmp)
+            report = replayer.replay()
+            self.assertEqual((len(report.latencies), report.succeeded, report.mismatches), (3, 2, 0))
+            self.assertEqual(len(replayer.platform.pasted), 2)
+            for png in replayer.platform.pasted:
+                self.assertEqual(Image.open(io.BytesIO(png)).format, "PNG")
+            sent = [e for e in replayer.recorder.events if e["event"] == "sent"]
+            self.assertEqual([e["character"] for e in sent], ["sherri", "sherri"])
+            # The real backend was never swapped out
+            self.assertIs(main.PlatformUtils, PlatformUtils)
+            # clear was not replayed: the generated images are still there
+            self.assertEqual(report.skipped, ("clear",))
+            self.assertIn("Skipped:      clear", report.summary())
+            self.assertTrue(any(name.endswith(".jpg") for name in os.listdir(tmp)))
+
+            # The same rolls again, against a recording whose last send used another
+            # image, in a temporary data folder that is removed afterwards
+            sent[-1] = dict(sent[-1], image=sent[-1]["image"] % 16 + 1)
+            scratch = os.path.join(tmp, "scratch")
+            os.mkdir(scratch)
+            with mock.patch("src.utils.session.tempfile.mkdtemp", return_value=scratch):
+                report = SessionReplayer(events + sent).replay()
+            self.assertEqual((report.succeeded, report.mismatches), (2, 1))
+            self.assertFalse(os.path.exists(scratch))
+
+    def test_report_summary(self):
+        report = ReplayReport([0.1, 0.3, 0.2], 3, 1.5, 0.0, 0)
+        summary = report.summary()
+        self.assertIn("p50 200.0 ms", summary)
+        self.assertIn("2.00 sends/s", summary)
+        self.assertEqual(ReplayReport([], 0, 0.0, 0.0, 0).summary(), "No sends replayed.")
+
+
+if __name__ == '__main__':
+    unittest.main()
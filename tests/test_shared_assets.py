@@ -0,0 +1,60 @@
+import sys
+import os
+import pickle
+import tempfile
+import unittest
+
+# Add src to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageChops
+
+from src.core.compositor import SpriteCompositor
+from src.core.shared_assets import SharedAssetStore, SharedAssetView
+
+
+class TestSharedAssets(unittest.TestCase):
+    def test_views_share_pixels(self):
+        rgb = Image.radial_gradient("L").resize((64, 32)).convert("RGB")
+        rgba = Image.new("RGBA", (8, 4), (1, 2, 3, 4))
+        with SharedAssetStore() as store:
+            store.put("bg", rgb)
+            store.put("sprite", rgba, (5, 6))
+            # Worker processes receive the index pickled
+            view = SharedAssetView(pickle.loads(pickle.dumps(store.index)))
+
+            image, meta = view.get("bg")
+            self.assertEqual(image.mode, "RGBX")
+            self.assertTrue(image.readonly)
+            self.assertIsNone(ImageChops.difference(image.convert("RGB"), rgb).getbbox())
+            self.assertIsNone(meta)
+            image, meta = view.get("sprite")
+            self.assertEqual((image.getpixel((0, 0)), meta), ((1, 2, 3, 4), (5, 6)))
+            self.assertIsNone(view.get("missing"))
+            del image
+            view.close()
+        self.assertEqual(store.index, {})
+
+    def test_compositor_uses_published_sources(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bg_path = os.path.join(tmp, "bg.png")
+            sprite_path = os.path.join(tmp, "sprite.png")
+            Image.radial_gradient("L").resize((120, 80)).convert("RGB").save(bg_path)
+            sprite = Image.new("RGBA", (40, 40), (0, 0, 0, 0))
+            sprite.paste((255, 0, 0, 128), (5, 8, 30, 35))
+            sprite.save(sprite_path)
+
+            expected = SpriteCompositor().compose(bg_path, sprite_path, (50, 30), "b", "s")
+            with SharedAssetStore() as store:
+                SpriteCompositor().publish(store, [(bg_path, "b")], [(sprite_path, "s")])
+                os.remove(bg_path)
+                os.remove(sprite_path)
+
+                worker = SpriteCompositor(shared=store.index)
+                result = worker.compose(bg_path, sprite_path, (50, 30), "b", "s")
+                self.assertIsNone(ImageChops.difference(result, expected).getbbox())
+                worker.close()
+
+
+if __name__ == '__main__':
+    unittest.main()